@@ -4,6 +4,7 @@ Django settings for CareerCoach project.
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -115,6 +116,171 @@ AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY') or os.getenv('VITE_AZUR
 AZURE_OPENAI_DEPLOYMENT = os.getenv('AZURE_OPENAI_DEPLOYMENT') or os.getenv('VITE_AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-4o')
 AZURE_OPENAI_API_VERSION = os.getenv('AZURE_OPENAI_API_VERSION') or os.getenv('VITE_AZURE_OPENAI_API_VERSION', '2024-12-01-preview')
 
+# CV analysis mode: "full" waits for the LLM analysis, "tiered" returns the fast
+# local analysis immediately and upgrades it with the LLM result in the background
+CV_ANALYSIS_MODE = os.getenv('CV_ANALYSIS_MODE', 'full')
+CV_ENRICHMENT_WORKERS = int(os.getenv('CV_ENRICHMENT_WORKERS', '2'))
+
+# Uploaded CVs are validated while streaming (type sniffing, size limit) and
+# kept in memory only up to FILE_UPLOAD_MAX_MEMORY_SIZE; extraction is capped
+CV_UPLOAD_MAX_BYTES = int(os.getenv('CV_UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+CV_TEXT_MAX_CHARS = int(os.getenv('CV_TEXT_MAX_CHARS', '200000'))
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(1024 * 1024)))
+FILE_UPLOAD_HANDLERS = [
+    'cv_analysis.upload_validation.CVUploadValidationHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Batch analysis (api/analyze/batch/): files per request and the worker threads
+# analyzing them; results stream back as NDJSON lines as each file finishes
+CV_BATCH_MAX_FILES = int(os.getenv('CV_BATCH_MAX_FILES', '50'))
+CV_BATCH_WORKERS = int(os.getenv('CV_BATCH_WORKERS', '4'))
+# Packed batch analysis (cv_analysis/cv_packing.py): up to CV_PACK_SIZE CVs of at most
+# CV_PACK_MAX_CV_CHARS characters (CV_PACK_MAX_CHARS together) share one LLM call;
+# CV_BATCH_PACKING makes it the default mode of the batch endpoint
+CV_BATCH_PACKING = os.getenv('CV_BATCH_PACKING', 'False') == 'True'
+CV_PACK_SIZE = int(os.getenv('CV_PACK_SIZE', '5'))
+CV_PACK_MAX_CV_CHARS = int(os.getenv('CV_PACK_MAX_CV_CHARS', '6000'))
+CV_PACK_MAX_CHARS = int(os.getenv('CV_PACK_MAX_CHARS', '24000'))
+
+# CVs longer than CV_LONG_DOCUMENT_CHARS are analyzed map-reduce style: section-aligned
+# chunks of about CV_CHUNK_CHARS characters, up to CV_CHUNK_MAX_WORKERS at a time
+CV_LONG_DOCUMENT_CHARS = int(os.getenv('CV_LONG_DOCUMENT_CHARS', '24000'))
+CV_CHUNK_CHARS = int(os.getenv('CV_CHUNK_CHARS', '8000'))
+CV_CHUNK_MAX_WORKERS = int(os.getenv('CV_CHUNK_MAX_WORKERS', '6'))
+
+# Re-uploaded CVs are analyzed incrementally unless more than this share of the text changed
+CV_INCREMENTAL_MAX_CHANGED_RATIO = float(os.getenv('CV_INCREMENTAL_MAX_CHANGED_RATIO', '0.6'))
+
+# Near-duplicate CVs (MinHash/LSH over extracted text) reuse the same user's existing LLM analysis
+CV_NEAR_DUPLICATE_REUSE = os.getenv('CV_NEAR_DUPLICATE_REUSE', 'True') == 'True'
+CV_NEAR_DUPLICATE_THRESHOLD = float(os.getenv('CV_NEAR_DUPLICATE_THRESHOLD', '0.85'))
+
+# Lifetime (seconds since last use) of public analysis sessions
+ANALYSIS_SESSION_TTL = int(os.getenv('ANALYSIS_SESSION_TTL', str(24 * 60 * 60)))
+
+# Single-flight coalescing of identical concurrent analyses: lock/result file
+# directory shared by the workers, and how long a finished result is served
+SINGLE_FLIGHT_DIR = os.getenv('SINGLE_FLIGHT_DIR')
+SINGLE_FLIGHT_RESULT_TTL = float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '30'))
+
+# Idempotency-Key support on the analysis and plan POST endpoints (cv_analysis/idempotency.py):
+# how long keys and their stored responses are kept, how long a retry waits for the
+# attempt in flight, and after how long an unfinished attempt's key is taken over
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '60'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '300'))
+
+# End-to-end request deadlines (cv_analysis/deadlines.py): default budget of the
+# public analysis endpoints (clients may send a shorter or longer one in the
+# X-Request-Budget header, up to the maximum) and the minimum time a stage
+# needs before it is replaced by its cheaper variant
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '25'))
+REQUEST_DEADLINE_MAX_SECONDS = float(os.getenv('REQUEST_DEADLINE_MAX_SECONDS', '60'))
+REQUEST_STAGE_MIN_SECONDS = {
+    'extraction': float(os.getenv('REQUEST_STAGE_MIN_EXTRACTION', '0.5')),
+    'llm_analysis': float(os.getenv('REQUEST_STAGE_MIN_LLM_ANALYSIS', '6')),
+    'job_profile': float(os.getenv('REQUEST_STAGE_MIN_JOB_PROFILE', '3')),
+    'course_search': float(os.getenv('REQUEST_STAGE_MIN_COURSE_SEARCH', '4')),
+    'course_rerank': float(os.getenv('REQUEST_STAGE_MIN_COURSE_RERANK', '2')),
+}
+
+# Course recommendations come from the Course catalog (load_courses command);
+# optionally the LLM re-ranks a shortlist of the most similar courses
+COURSE_LLM_RERANK = os.getenv('COURSE_LLM_RERANK', 'False') == 'True'
+COURSE_RERANK_SHORTLIST = int(os.getenv('COURSE_RERANK_SHORTLIST', '20'))
+
+# Job profiles (required skills and canonical courses per normalized target job)
+# are cached for this long; prewarm_job_profiles refreshes the most requested ones
+JOB_PROFILE_CACHE_TTL = int(os.getenv('JOB_PROFILE_CACHE_TTL', str(7 * 24 * 60 * 60)))
+
+# Career plans (cv_analysis/career_planner.py): 'llm' writes the plan with the LLM and
+# uses the local skill-graph planner as fallback, 'refine' has the LLM refine the
+# local plan, 'local' skips the LLM
+CAREER_PLAN_MODE = os.getenv('CAREER_PLAN_MODE', 'llm')
+# Plan versions (career_planning/versioning.py): compact_career_plans archives versions
+# superseded this many days ago and keeps this many versions per user
+CAREER_PLAN_ARCHIVE_AFTER_DAYS = int(os.getenv('CAREER_PLAN_ARCHIVE_AFTER_DAYS', '30'))
+CAREER_PLAN_KEEP_VERSIONS = int(os.getenv('CAREER_PLAN_KEEP_VERSIONS', '5'))
+
+# Cache shared by the workers of a host (job profiles)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'careercoach-cache')),
+    }
+}
+
+# Per-worker metrics snapshots read by /metrics/ (see cv_analysis/metrics_export.py)
+METRICS_EXPORT_DIR = os.getenv('METRICS_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'careercoach-metrics'))
+METRICS_EXPORT_INTERVAL = float(os.getenv('METRICS_EXPORT_INTERVAL', '15'))
+
+# LLM gateway: timeout, adaptive concurrency limits, retries and circuit breaker
+# applied to every Azure OpenAI call (see cv_analysis/llm_gateway.py)
+LLM_GATEWAY = {
+    'TIMEOUT': float(os.getenv('LLM_TIMEOUT', '30')),
+    'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', '2')),
+    'BACKOFF_BASE': float(os.getenv('LLM_BACKOFF_BASE', '0.5')),
+    'BACKOFF_MAX': float(os.getenv('LLM_BACKOFF_MAX', '8')),
+    'INITIAL_CONCURRENCY': int(os.getenv('LLM_INITIAL_CONCURRENCY', '4')),
+    'MIN_CONCURRENCY': int(os.getenv('LLM_MIN_CONCURRENCY', '1')),
+    'MAX_CONCURRENCY': int(os.getenv('LLM_MAX_CONCURRENCY', '16')),
+    'LATENCY_TARGET': float(os.getenv('LLM_LATENCY_TARGET', '15')),
+    'QUEUE_TIMEOUT': float(os.getenv('LLM_QUEUE_TIMEOUT', '5')),
+    'WORKER_SLOTS': int(os.getenv('LLM_WORKER_SLOTS', '8')),
+    'SLOT_DIR': os.getenv('LLM_SLOT_DIR'),
+    'FAILURE_THRESHOLD': int(os.getenv('LLM_FAILURE_THRESHOLD', '5')),
+    'RESET_TIMEOUT': float(os.getenv('LLM_RESET_TIMEOUT', '30')),
+}
+
+# Named Azure OpenAI deployments. Each one gets its own gateway (overriding the
+# LLM_GATEWAY values above), costs are USD per 1K tokens for the per-route cost
+# report, and FALLBACK is the deployment tried when this one is unavailable
+LLM_DEPLOYMENTS = {
+    'full': {
+        'DEPLOYMENT': AZURE_OPENAI_DEPLOYMENT,
+        'TIMEOUT': float(os.getenv('LLM_FULL_TIMEOUT', os.getenv('LLM_TIMEOUT', '30'))),
+        'MAX_CONCURRENCY': int(os.getenv('LLM_FULL_MAX_CONCURRENCY', os.getenv('LLM_MAX_CONCURRENCY', '16'))),
+        'WORKER_SLOTS': int(os.getenv('LLM_FULL_WORKER_SLOTS', os.getenv('LLM_WORKER_SLOTS', '8'))),
+        'PROMPT_COST_PER_1K': float(os.getenv('LLM_FULL_PROMPT_COST_PER_1K', '0.0025')),
+        'COMPLETION_COST_PER_1K': float(os.getenv('LLM_FULL_COMPLETION_COST_PER_1K', '0.01')),
+        'FALLBACK': os.getenv('LLM_FULL_FALLBACK', 'fast') or None,
+    },
+    'fast': {
+        'DEPLOYMENT': os.getenv('LLM_FAST_DEPLOYMENT') or AZURE_OPENAI_DEPLOYMENT,
+        'TIMEOUT': float(os.getenv('LLM_FAST_TIMEOUT', '12')),
+        'INITIAL_CONCURRENCY': int(os.getenv('LLM_FAST_INITIAL_CONCURRENCY', '8')),
+        'MAX_CONCURRENCY': int(os.getenv('LLM_FAST_MAX_CONCURRENCY', '32')),
+        'LATENCY_TARGET': float(os.getenv('LLM_FAST_LATENCY_TARGET', '6')),
+        'WORKER_SLOTS': int(os.getenv('LLM_FAST_WORKER_SLOTS', '16')),
+        'PROMPT_COST_PER_1K': float(os.getenv('LLM_FAST_PROMPT_COST_PER_1K', '0.00015')),
+        'COMPLETION_COST_PER_1K': float(os.getenv('LLM_FAST_COMPLETION_COST_PER_1K', '0.0006')),
+        'FALLBACK': os.getenv('LLM_FAST_FALLBACK', 'full') or None,
+    },
+}
+
+# Deployment per LLM task (see cv_analysis/llm_routing.py for the defaults);
+# e.g. LLM_ROUTES=career_plan:fast,cv_synthesis:fast
+LLM_ROUTES = {
+    task.strip(): deployment.strip()
+    for task, deployment in (route.split(':', 1) for route in os.getenv('LLM_ROUTES', '').split(',') if ':' in route)
+}
+# CVs up to this many characters are analyzed by the fast deployment
+LLM_SHORT_CV_CHARS = int(os.getenv('LLM_SHORT_CV_CHARS', '6000'))
+
+# Hedged LLM requests (cv_analysis/llm_hedging.py): a call still running after
+# the route's PERCENTILE latency gets a second identical request, capped at
+# BUDGET hedges per call; DEPLOYMENT sends the hedge to another deployment
+LLM_HEDGING = {
+    'ENABLED': os.getenv('LLM_HEDGING', 'False') == 'True',
+    'DEPLOYMENT': os.getenv('LLM_HEDGE_DEPLOYMENT') or None,
+    'PERCENTILE': float(os.getenv('LLM_HEDGE_PERCENTILE', '95')),
+    'MIN_DELAY': float(os.getenv('LLM_HEDGE_MIN_DELAY', '1')),
+    'MAX_DELAY': float(os.getenv('LLM_HEDGE_MAX_DELAY', '20')),
+    'BUDGET': float(os.getenv('LLM_HEDGE_BUDGET', '0.05')),
+}
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -166,4 +332,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-request-budget',
+    'idempotency-key',
 ]
+CORS_EXPOSE_HEADERS = ['idempotent-replayed', 'retry-after']
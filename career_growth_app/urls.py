@@ -5,8 +5,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from cv_analysis import health_views
 
 urlpatterns = [
+    path('healthz/', health_views.liveness, name='liveness'),
+    path('readyz/', health_views.readiness, name='readiness'),
+    path('metrics/', health_views.metrics_report, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/cv/', include('cv_analysis.urls')),
     path('api/career/', include('career_planning.urls')),
@@ -4,10 +4,10 @@ from .models import CareerPlan, LearningItem, SkillGap, CareerMilestone
 
 @admin.register(CareerPlan)
 class CareerPlanAdmin(admin.ModelAdmin):
-    list_display = ['user', 'title', 'created_at', 'is_active']
-    list_filter = ['created_at', 'is_active']
+    list_display = ['user', 'title', 'version', 'created_at', 'is_active', 'is_archived']
+    list_filter = ['created_at', 'is_active', 'is_archived']
     search_fields = ['user__username', 'title']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'superseded_at', 'previous_version', 'changes']
 
 
 @admin.register(LearningItem)
@@ -0,0 +1,44 @@
+"""
+Async (ASGI) variant of career plan generation.
+
+The LLM call is awaited on the shared AsyncAzureOpenAI client; the ORM reads
+and writes around it run in worker threads.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from cv_analysis.idempotency import idempotent
+from cv_analysis.services import AIAnalysisService
+from .views import career_plan_inputs, create_career_plan
+
+
+@require_POST
+@idempotent
+async def generate_career_plan_async(request):
+    """Generate and store a career plan from the user's latest CV analysis and responses"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+    
+    try:
+        latest_cv, cv_analysis, responses_data = await sync_to_async(career_plan_inputs)(user)
+        if not latest_cv:
+            return JsonResponse({
+                'success': False,
+                'error': 'Please upload your CV first.'
+            }, status=400)
+        
+        plan_data = await AIAnalysisService().agenerate_career_plan(cv_analysis, responses_data)
+        career_plan = await sync_to_async(create_career_plan)(user, latest_cv, plan_data)
+        
+        return JsonResponse({
+            'success': True,
+            'plan_id': career_plan.id,
+            'plan': plan_data
+        })
+    
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from career_planning.versioning import (
+    archive_after_days, archive_superseded_plans, keep_versions, prune_superseded_plans
+)
+
+
+class Command(BaseCommand):
+    help = 'Archive old superseded career plan versions and delete versions beyond the kept history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None,
+                            help='Versions to keep per user, the active one included (default CAREER_PLAN_KEEP_VERSIONS)')
+        parser.add_argument('--archive-after-days', type=int, default=None,
+                            help='Archive versions superseded this many days ago (default CAREER_PLAN_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report, do not change anything')
+
+    def handle(self, *args, **options):
+        keep = options['keep'] if options['keep'] is not None else keep_versions()
+        days = options['archive_after_days'] if options['archive_after_days'] is not None else archive_after_days()
+
+        # Prune first so versions about to be deleted are not archived
+        pruned = prune_superseded_plans(keep, dry_run=options['dry_run'])
+        archived = archive_superseded_plans(timedelta(days=days), dry_run=options['dry_run'])
+
+        prefix = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {pruned} career plan versions beyond the latest {keep} per user and '
+            f'{"archive" if options["dry_run"] else "archived"} {archived} versions superseded over {days} days ago'
+        ))
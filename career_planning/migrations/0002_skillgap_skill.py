@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_planning', '0001_initial'),
+        ('cv_analysis', '0009_skill_dimension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skillgap',
+            name='skill',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='skill_gaps', to='cv_analysis.skill'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_plan_versions(apps, schema_editor):
+    """Chain each user's existing plans into versions; only the newest stays active"""
+    CareerPlan = apps.get_model('career_planning', 'CareerPlan')
+    user_ids = CareerPlan.objects.values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        previous = None
+        plans = list(CareerPlan.objects.filter(user_id=user_id).order_by('created_at', 'id'))
+        for version, plan in enumerate(plans, start=1):
+            plan.version = version
+            plan.previous_version = previous
+            if plan is not plans[-1]:
+                plan.is_active = False
+                plan.superseded_at = plans[version].created_at
+            plan.save(update_fields=['version', 'previous_version', 'is_active', 'superseded_at'])
+            previous = plan
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career_planning', '0002_skillgap_skill'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='careerplan',
+            name='changes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='careerplan',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='careerplan',
+            name='previous_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next_versions', to='career_planning.careerplan'),
+        ),
+        migrations.AddField(
+            model_name='careerplan',
+            name='superseded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='careerplan',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='careerplan',
+            index=models.Index(fields=['user', '-version'], name='career_plan_user_version_idx'),
+        ),
+        migrations.RunPython(number_plan_versions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='careerplan',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='one_active_career_plan_per_user'),
+        ),
+    ]
@@ -11,6 +11,16 @@ class CareerPlan(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    # Versioning: each generated plan supersedes the user's active plan (see versioning.py)
+    version = models.PositiveIntegerField(default=1)
+    previous_version = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                         related_name='next_versions')
+    superseded_at = models.DateTimeField(null=True, blank=True)
+    # Compact diff against previous_version
+    changes = models.JSONField(default=dict, blank=True)
+    # Archived versions keep their JSON content but no longer have item rows
+    is_archived = models.BooleanField(default=False)
+    
     # AI-generated content
     career_goals = models.JSONField(default=list, blank=True)
     skill_gaps = models.JSONField(default=list, blank=True)
@@ -20,6 +30,14 @@ class CareerPlan(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # Also the index that makes reading a user's active plan a single lookup
+            models.UniqueConstraint(fields=['user'], condition=models.Q(is_active=True),
+                                    name='one_active_career_plan_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-version'], name='career_plan_user_version_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -69,6 +87,9 @@ class SkillGap(models.Model):
     """Model to track skill gaps and development progress"""
     career_plan = models.ForeignKey(CareerPlan, on_delete=models.CASCADE, related_name='skill_gap_objects')
     skill_name = models.CharField(max_length=100)
+    # Canonical skill resolved from skill_name on save
+    skill = models.ForeignKey('cv_analysis.Skill', on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='skill_gaps', editable=False)
     current_level = models.CharField(max_length=20, choices=[
         ('beginner', 'Beginner'),
         ('intermediate', 'Intermediate'),
@@ -94,6 +115,15 @@ class SkillGap(models.Model):
     
     def __str__(self):
         return f"{self.skill_name} ({self.current_level} → {self.target_level})"
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.skill_id is None or update_fields is None or 'skill_name' in update_fields:
+            from cv_analysis.skills import resolve_skill
+            self.skill = resolve_skill(self.skill_name)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'skill'}
+        super().save(*args, **kwargs)
 
 
 class CareerMilestone(models.Model):
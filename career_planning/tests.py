@@ -0,0 +1,70 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase
+
+from cv_analysis.models import CVUpload
+from cv_analysis.services import AIAnalysisService
+from .models import CareerPlan
+from .versioning import active_plan
+from .views import create_career_plan
+
+
+PLAN_DATA = {'career_goals': ['Lead a team'], 'skill_gaps': [], 'learning_path': [], 'timeline': {}, 'recommendations': []}
+
+
+class GenerateCareerPlanIdempotencyTests(TestCase):
+    """Only a successful generation is replayed for an Idempotency-Key"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('planner', 'planner@example.com', 'password')
+        CVUpload.objects.create(user=self.user, file='cvs/cv.txt', original_filename='cv.txt', skills=['Python'])
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _post(self):
+        return self.client.post('/api/career/generate/', HTTP_IDEMPOTENCY_KEY='plan-attempt-1')
+
+    def test_failed_generation_is_retried(self):
+        with mock.patch.object(AIAnalysisService, 'generate_career_plan',
+                               side_effect=[RuntimeError('LLM error'), PLAN_DATA]) as generate:
+            failed = self._post()
+            self.assertRedirects(failed, '/api/career/', fetch_redirect_response=False)
+
+            retried = self._post()
+            self.assertEqual(generate.call_count, 2)
+            plan = CareerPlan.objects.get(user=self.user)
+            self.assertRedirects(retried, f'/api/career/plan/{plan.id}/', fetch_redirect_response=False)
+            self.assertNotIn('Idempotent-Replayed', retried)
+
+            replayed = self._post()
+            self.assertEqual(generate.call_count, 2)
+            self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+            self.assertEqual(replayed['Location'], f'/api/career/plan/{plan.id}/')
+
+
+class CareerPlanVersioningTests(TestCase):
+    """A new plan supersedes the active one and keeps the progress made on it"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('versions', 'versions@example.com', 'password')
+        self.cv = CVUpload.objects.create(user=self.user, file='cvs/cv.txt', original_filename='cv.txt')
+        self.plan_data = {**PLAN_DATA, 'learning_path': [{'title': 'Kubernetes Fundamentals', 'type': 'course'}]}
+
+    def test_new_version_supersedes_the_active_plan(self):
+        first = create_career_plan(self.user, self.cv, self.plan_data)
+        first.learning_items.update(status='in_progress')
+
+        second = create_career_plan(self.user, self.cv, self.plan_data)
+
+        first.refresh_from_db()
+        self.assertFalse(first.is_active)
+        self.assertIsNotNone(first.superseded_at)
+        self.assertEqual((second.version, second.previous_version_id), (2, first.id))
+        self.assertEqual(active_plan(self.user), second)
+        self.assertEqual(second.learning_items.get().status, 'in_progress')
+
+    def test_only_one_plan_per_user_can_be_active(self):
+        plan = create_career_plan(self.user, self.cv, self.plan_data)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CareerPlan.objects.create(user=self.user, title='Duplicate', description='', version=plan.version + 1)
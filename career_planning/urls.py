@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     # Web views
@@ -11,4 +11,7 @@ urlpatterns = [
     path('api/learning-item/<int:item_id>/status/', views.update_learning_item_status, name='update_learning_item_status'),
     path('api/skill-gap/<int:skill_id>/progress/', views.update_skill_progress, name='update_skill_progress'),
     path('api/plan/<int:plan_id>/', views.get_career_plan_api, name='get_career_plan_api'),
+    
+    # Async (ASGI) endpoints
+    path('api/generate/async/', async_views.generate_career_plan_async, name='generate_career_plan_async'),
 ]
@@ -0,0 +1,167 @@
+"""
+Career plan versions.
+
+A user has at most one active CareerPlan (a partial unique constraint, which
+is also the index behind active_plan()), so reading the current plan is one
+lookup however many plans were generated before it. Generating a plan
+creates the next version: in one transaction, holding a lock on the user
+row so concurrent generations queue up, the previous active plan is
+superseded, the status and dates of its learning items and the progress and
+notes of its skill gaps carry over to the matching items of the new version
+(same title / same canonical skill), its milestones move over, and a compact
+diff against it is stored in CareerPlan.changes.
+
+Superseded versions are compacted by compact_career_plans: versions
+superseded more than CAREER_PLAN_ARCHIVE_AFTER_DAYS ago are archived (their
+item rows are deleted, the plan's JSON content is kept) and versions beyond
+the CAREER_PLAN_KEEP_VERSIONS most recent of a user are deleted.
+"""
+import re
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from cv_analysis.skills import canonical_skill_name
+
+from .models import CareerMilestone, CareerPlan, LearningItem, SkillGap
+
+
+def keep_versions() -> int:
+    return max(1, getattr(settings, 'CAREER_PLAN_KEEP_VERSIONS', 5))
+
+
+def archive_after_days() -> int:
+    return getattr(settings, 'CAREER_PLAN_ARCHIVE_AFTER_DAYS', 30)
+
+
+def active_plan(user) -> Optional[CareerPlan]:
+    return CareerPlan.objects.filter(user=user, is_active=True).first()
+
+
+def supersede_active_plan(user) -> Optional[CareerPlan]:
+    """Deactivate the user's active plan so a new version can be created; returns it
+
+    Must run inside a transaction: the user row stays locked until it ends.
+    """
+    list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+    previous = active_plan(user)
+    if previous is not None:
+        previous.is_active = False
+        previous.superseded_at = timezone.now()
+        previous.save(update_fields=['is_active', 'superseded_at', 'updated_at'])
+    return previous
+
+
+def title_key(title: str) -> str:
+    return re.sub(r'\s+', ' ', str(title or '').strip().lower())
+
+
+def carried_progress(previous: Optional[CareerPlan]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Progress made on a plan: learning items by title key and skill gaps by canonical skill"""
+    if previous is None:
+        return {}, {}
+    items = {}
+    for item in previous.learning_items.all():
+        if item.status != 'not_started' or item.start_date or item.end_date:
+            items.setdefault(title_key(item.title), {
+                'status': item.status,
+                'start_date': item.start_date,
+                'end_date': item.end_date,
+            })
+    gaps = {}
+    for gap in previous.skill_gap_objects.all():
+        if gap.progress_percentage or gap.notes:
+            gaps.setdefault(canonical_skill_name(gap.skill_name), {
+                'progress_percentage': gap.progress_percentage,
+                'notes': gap.notes,
+            })
+    return items, gaps
+
+
+def _goal_texts(goals: List[Any]) -> List[str]:
+    texts = []
+    for goal in goals or []:
+        if isinstance(goal, dict):
+            goal = goal.get('goal') or goal.get('title') or goal.get('description') or ''
+        if str(goal).strip():
+            texts.append(str(goal).strip())
+    return texts
+
+
+def _gap_priorities(gaps: List[Any]) -> Dict[str, str]:
+    return {
+        canonical_skill_name(gap.get('skill', '')): gap.get('priority', 'medium')
+        for gap in gaps or [] if isinstance(gap, dict) and gap.get('skill')
+    }
+
+
+def _item_titles(items: List[Any]) -> Dict[str, str]:
+    return {
+        title_key(item.get('title')): item.get('title')
+        for item in items or [] if isinstance(item, dict) and item.get('title')
+    }
+
+
+def plan_diff(previous: Optional[CareerPlan], plan_data: Dict[str, Any], carried: Dict[str, int]) -> Dict[str, Any]:
+    """What a new version changed against the previous one, in names only"""
+    if previous is None:
+        return {}
+    old_goals, new_goals = _goal_texts(previous.career_goals), _goal_texts(plan_data.get('career_goals'))
+    old_gaps, new_gaps = _gap_priorities(previous.skill_gaps), _gap_priorities(plan_data.get('skill_gaps'))
+    old_items, new_items = _item_titles(previous.learning_path), _item_titles(plan_data.get('learning_path'))
+    return {
+        'previous_version': previous.version,
+        'goals_added': [goal for goal in new_goals if goal not in old_goals],
+        'goals_removed': [goal for goal in old_goals if goal not in new_goals],
+        'skills_added': sorted(new_gaps.keys() - old_gaps.keys()),
+        'skills_removed': sorted(old_gaps.keys() - new_gaps.keys()),
+        'priority_changes': {
+            skill: [old_gaps[skill], new_gaps[skill]]
+            for skill in sorted(new_gaps.keys() & old_gaps.keys()) if old_gaps[skill] != new_gaps[skill]
+        },
+        'learning_items_added': [new_items[key] for key in new_items.keys() - old_items.keys()],
+        'learning_items_removed': [old_items[key] for key in old_items.keys() - new_items.keys()],
+        'carried_over': carried,
+    }
+
+
+def move_milestones(previous: Optional[CareerPlan], plan: CareerPlan) -> int:
+    if previous is None:
+        return 0
+    return CareerMilestone.objects.filter(career_plan=previous).update(career_plan=plan)
+
+
+def archive_superseded_plans(older_than: timedelta, dry_run: bool = False) -> int:
+    """Drop the item rows of versions superseded before now - older_than; returns the number archived"""
+    plans = CareerPlan.objects.filter(
+        is_active=False, is_archived=False, superseded_at__lt=timezone.now() - older_than
+    )
+    plan_ids = list(plans.values_list('id', flat=True))
+    if dry_run or not plan_ids:
+        return len(plan_ids)
+    with transaction.atomic():
+        LearningItem.objects.filter(career_plan_id__in=plan_ids).delete()
+        SkillGap.objects.filter(career_plan_id__in=plan_ids).delete()
+        CareerPlan.objects.filter(id__in=plan_ids).update(is_archived=True, updated_at=timezone.now())
+    return len(plan_ids)
+
+
+def prune_superseded_plans(keep: int, dry_run: bool = False) -> int:
+    """Delete all but the keep most recent versions of each user (the active one always stays)"""
+    keep = max(1, keep)
+    users = (CareerPlan.objects.values('user_id').annotate(plans=Count('id'))
+             .filter(plans__gt=keep).values_list('user_id', flat=True))
+    plan_ids = []
+    for user_id in users:
+        plan_ids.extend(
+            CareerPlan.objects.filter(user_id=user_id, is_active=False)
+            .order_by('-version', '-created_at').values_list('id', flat=True)[keep - 1:]
+        )
+    if dry_run or not plan_ids:
+        return len(plan_ids)
+    CareerPlan.objects.filter(id__in=plan_ids).delete()
+    return len(plan_ids)
@@ -2,31 +2,43 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.db import transaction
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .models import CareerPlan, LearningItem, SkillGap, CareerMilestone
+from .versioning import (
+    active_plan, carried_progress, move_milestones, plan_diff, supersede_active_plan, title_key
+)
 from cv_analysis.models import CVUpload, UserResponse
+from cv_analysis.idempotency import idempotent, replayable
 from cv_analysis.services import AIAnalysisService
+from cv_analysis.skills import canonical_skill_name
 import json
 
 
+PLAN_HISTORY_LIMIT = 10
+
+
 @login_required
 def career_planning_dashboard(request):
     """Main career planning dashboard"""
-    user_plans = CareerPlan.objects.filter(user=request.user, is_active=True)
-    latest_plan = user_plans.first() if user_plans.exists() else None
+    latest_plan = active_plan(request.user)
+    # Recent versions, newest first; older ones are compacted by compact_career_plans
+    plan_versions = CareerPlan.objects.filter(user=request.user).order_by('-version', '-created_at').only(
+        'id', 'title', 'description', 'version', 'is_active', 'created_at'
+    )[:PLAN_HISTORY_LIMIT]
     
     context = {
-        'career_plans': user_plans,
+        'career_plans': plan_versions,
         'latest_plan': latest_plan,
     }
     
     if latest_plan:
         context.update({
             'learning_items': latest_plan.learning_items.all()[:5],
-            'skill_gaps': latest_plan.skill_gaps.all()[:5],
+            'skill_gaps': latest_plan.skill_gap_objects.all()[:5],
             'milestones': latest_plan.milestones.all()[:5],
         })
     
@@ -34,6 +46,7 @@ def career_planning_dashboard(request):
 
 
 @login_required
+@idempotent
 def generate_career_plan(request):
     """Generate a new career plan based on CV analysis and user responses"""
     # Check prerequisites
@@ -42,71 +55,20 @@ def generate_career_plan(request):
     
     if request.method == 'POST':
         try:
-            # Get user's latest CV analysis
-            latest_cv = CVUpload.objects.filter(user=request.user).order_by('-uploaded_at').first()
+            # Get user's latest CV analysis and responses to career questions
+            latest_cv, cv_analysis, responses_data = career_plan_inputs(request.user)
             if not latest_cv:
                 messages.error(request, 'Please upload your CV first.')
                 return redirect('upload_cv')
             
-            # Get user's responses to career questions
-            user_responses = UserResponse.objects.filter(user=request.user)
-            responses_data = []
-            for response in user_responses:
-                responses_data.append({
-                    'question_type': response.question.question_type,
-                    'response_text': response.response_text
-                })
-            
-            # Prepare CV analysis data
-            cv_analysis = {
-                'skills': latest_cv.skills,
-                'experience_years': latest_cv.experience_years,
-                'education_level': latest_cv.education_level,
-                'current_role': latest_cv.current_role,
-                'industries': latest_cv.industries,
-                'strengths': latest_cv.strengths,
-                'areas_for_improvement': latest_cv.areas_for_improvement,
-            }
-            
             # Generate career plan using AI
             ai_service = AIAnalysisService()
             plan_data = ai_service.generate_career_plan(cv_analysis, responses_data)
             
-            # Create career plan
-            career_plan = CareerPlan.objects.create(
-                user=request.user,
-                title=f"Career Development Plan - {latest_cv.current_role or 'Professional'}",
-                description="AI-generated career development plan based on your CV analysis and responses.",
-                career_goals=plan_data.get('career_goals', []),
-                skill_gaps=plan_data.get('skill_gaps', []),
-                learning_path=plan_data.get('learning_path', []),
-                timeline=plan_data.get('timeline', {}),
-                recommendations=plan_data.get('recommendations', [])
-            )
-            
-            # Create learning items
-            for item_data in plan_data.get('learning_path', []):
-                LearningItem.objects.create(
-                    career_plan=career_plan,
-                    title=item_data.get('title', ''),
-                    description=item_data.get('description', ''),
-                    item_type=item_data.get('type', 'course'),
-                    duration=item_data.get('duration', ''),
-                    priority=item_data.get('priority', 'medium')
-                )
-            
-            # Create skill gaps
-            for gap_data in plan_data.get('skill_gaps', []):
-                SkillGap.objects.create(
-                    career_plan=career_plan,
-                    skill_name=gap_data.get('skill', ''),
-                    current_level=gap_data.get('current_level', 'beginner'),
-                    target_level=gap_data.get('target_level', 'intermediate'),
-                    priority=gap_data.get('priority', 'medium')
-                )
+            career_plan = create_career_plan(request.user, latest_cv, plan_data)
             
             messages.success(request, 'Your career plan has been generated successfully!')
-            return redirect('career_plan_detail', plan_id=career_plan.id)
+            return replayable(redirect('career_plan_detail', plan_id=career_plan.id))
             
         except Exception as e:
             messages.error(request, f'Error generating career plan: {str(e)}')
@@ -126,7 +88,7 @@ def career_plan_detail(request, plan_id):
     context = {
         'plan': plan,
         'learning_items': plan.learning_items.all(),
-        'skill_gaps': plan.skill_gaps.all(),
+        'skill_gaps': plan.skill_gap_objects.all(),
         'milestones': plan.milestones.all(),
     }
     
@@ -204,6 +166,11 @@ def get_career_plan_api(request, plan_id):
             'id': plan.id,
             'title': plan.title,
             'description': plan.description,
+            'version': plan.version,
+            'is_active': plan.is_active,
+            'is_archived': plan.is_archived,
+            'previous_version_id': plan.previous_version_id,
+            'changes': plan.changes,
             'career_goals': plan.career_goals,
             'learning_items': [
                 {
@@ -228,7 +195,7 @@ def get_career_plan_api(request, plan_id):
                     'priority': gap.priority,
                     'progress_percentage': gap.progress_percentage,
                 }
-                for gap in plan.skill_gaps.all()
+                for gap in plan.skill_gap_objects.all()
             ],
             'timeline': plan.timeline,
             'recommendations': plan.recommendations,
@@ -241,3 +208,86 @@ def get_career_plan_api(request, plan_id):
             'success': False,
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def career_plan_inputs(user):
+    """Return the user's latest CVUpload, its analysis and the user's question responses"""
+    latest_cv = CVUpload.objects.filter(user=user).order_by('-uploaded_at').first()
+    if not latest_cv:
+        return None, {}, []
+    
+    responses_data = []
+    for response in UserResponse.objects.filter(user=user).select_related('question'):
+        responses_data.append({
+            'question_type': response.question.question_type,
+            'response_text': response.response_text
+        })
+    
+    cv_analysis = {
+        'skills': latest_cv.skills,
+        'experience_years': latest_cv.experience_years,
+        'education_level': latest_cv.education_level,
+        'current_role': latest_cv.current_role,
+        'industries': latest_cv.industries,
+        'strengths': latest_cv.strengths,
+        'areas_for_improvement': latest_cv.areas_for_improvement,
+    }
+    return latest_cv, cv_analysis, responses_data
+
+
+def create_career_plan(user, latest_cv, plan_data: dict) -> CareerPlan:
+    """Store a generated plan with its learning items and skill gaps as the user's new active version
+    
+    The previous active plan is superseded in the same transaction and its
+    progress carried over (see versioning.py).
+    """
+    with transaction.atomic():
+        previous = supersede_active_plan(user)
+        carried_items, carried_gaps = carried_progress(previous)
+        career_plan = CareerPlan.objects.create(
+            user=user,
+            title=f"Career Development Plan - {latest_cv.current_role or 'Professional'}",
+            description="AI-generated career development plan based on your CV analysis and responses.",
+            version=previous.version + 1 if previous else 1,
+            previous_version=previous,
+            career_goals=plan_data.get('career_goals', []),
+            skill_gaps=plan_data.get('skill_gaps', []),
+            learning_path=plan_data.get('learning_path', []),
+            timeline=plan_data.get('timeline', {}),
+            recommendations=plan_data.get('recommendations', [])
+        )
+        carried = {'learning_items': 0, 'skill_gaps': 0}
+        
+        # Create learning items
+        for item_data in plan_data.get('learning_path', []):
+            progress = carried_items.pop(title_key(item_data.get('title', '')), {})
+            carried['learning_items'] += bool(progress)
+            LearningItem.objects.create(
+                career_plan=career_plan,
+                title=item_data.get('title', ''),
+                description=item_data.get('description', ''),
+                item_type=item_data.get('type', 'course'),
+                duration=item_data.get('duration', ''),
+                priority=item_data.get('priority', 'medium'),
+                url=item_data.get('url') or None,
+                **progress
+            )
+        
+        # Create skill gaps
+        for gap_data in plan_data.get('skill_gaps', []):
+            progress = carried_gaps.pop(canonical_skill_name(gap_data.get('skill', '')), {})
+            carried['skill_gaps'] += bool(progress)
+            SkillGap.objects.create(
+                career_plan=career_plan,
+                skill_name=gap_data.get('skill', ''),
+                current_level=gap_data.get('current_level', 'beginner'),
+                target_level=gap_data.get('target_level', 'intermediate'),
+                priority=gap_data.get('priority', 'medium'),
+                **progress
+            )
+        
+        carried['milestones'] = move_milestones(previous, career_plan)
+        if previous is not None:
+            career_plan.changes = plan_diff(previous, plan_data, carried)
+            career_plan.save(update_fields=['changes'])
+    return career_plan
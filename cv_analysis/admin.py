@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import CVUpload, CareerQuestion, UserResponse
+from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.urls import path
+from .models import CVUpload, CVBlob, Course, Skill, SkillAlias, CareerQuestion, UserResponse
+from .near_duplicates import near_duplicate_pairs
 
 
 @admin.register(CVUpload)
@@ -8,6 +12,75 @@ class CVUploadAdmin(admin.ModelAdmin):
     list_filter = ['uploaded_at', 'experience_years', 'education_level']
     search_fields = ['user__username', 'original_filename', 'current_role']
     readonly_fields = ['uploaded_at', 'extracted_text', 'ai_analysis']
+    change_list_template = 'admin/cv_analysis/cvupload/change_list.html'
+    
+    def get_urls(self):
+        urls = [
+            path(
+                'near-duplicates/',
+                self.admin_site.admin_view(self.near_duplicates_view),
+                name='cv_analysis_cvupload_near_duplicates'
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def near_duplicates_view(self, request):
+        """List pairs of near-duplicate CVs found through the MinHash/LSH index"""
+        try:
+            threshold = float(request.GET.get('threshold', ''))
+        except ValueError:
+            threshold = None
+        pairs = near_duplicate_pairs(threshold=threshold)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Near-duplicate CVs',
+            'pairs': pairs,
+            'threshold': threshold,
+        }
+        return TemplateResponse(request, 'admin/cv_analysis/cvupload/near_duplicates.html', context)
+
+
+@admin.register(CVBlob)
+class CVBlobAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'codec', 'size', 'created_at']
+    list_filter = ['codec']
+    search_fields = ['digest']
+    readonly_fields = ['digest', 'codec', 'size', 'created_at']
+    exclude = ['data']
+
+
+class SkillAliasInline(admin.TabularInline):
+    model = SkillAlias
+    extra = 0
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ['display_name', 'name', 'user_count', 'gap_count']
+    search_fields = ['name', 'display_name', 'aliases__alias']
+    inlines = [SkillAliasInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            user_count=Count('cv_links__cv_upload__user', distinct=True),
+            gap_count=Count('skill_gaps', distinct=True),
+        )
+    
+    @admin.display(ordering='user_count', description='Users')
+    def user_count(self, obj):
+        return obj.user_count
+    
+    @admin.display(ordering='gap_count', description='Skill gaps')
+    def gap_count(self, obj):
+        return obj.gap_count
+
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ['title', 'provider', 'level', 'is_free', 'is_active', 'updated_at']
+    list_filter = ['provider', 'level', 'is_free', 'is_active']
+    search_fields = ['external_id', 'title', 'description']
 
 
 @admin.register(CareerQuestion)
@@ -0,0 +1,71 @@
+"""
+Analysis sessions for the public API.
+
+The first public CV upload stores its analysis server side and returns a
+session id. Later calls from any frontend module (course recommendations for
+another target job, plan generation) pass the session id instead of having
+the CV extracted and analyzed again. Sessions expire after
+ANALYSIS_SESSION_TTL seconds of inactivity.
+"""
+import hashlib
+from datetime import timedelta
+from typing import Dict, Any, Optional
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .metrics import metrics
+
+
+# Keys of an analysis result that are not needed by later session calls
+_TRANSIENT_KEYS = ('text', 'section_hashes')
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'ANALYSIS_SESSION_TTL', 86400))
+
+
+def hash_uploaded_file(file) -> str:
+    """Return the sha256 of an uploaded file's content"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def create_session(content_hash: str, original_filename: str, analysis: Dict[str, Any]):
+    """Store an analysis result and return the new session"""
+    from .models import AnalysisSession
+
+    metrics.incr('analysis_session.created')
+    return AnalysisSession.objects.create(
+        content_hash=content_hash,
+        original_filename=original_filename[:255],
+        analysis={key: value for key, value in analysis.items() if key not in _TRANSIENT_KEYS},
+        expires_at=_expiry(),
+    )
+
+
+def get_session(session_id) -> Optional[object]:
+    """Return the unexpired session for an id and extend its expiry, or None"""
+    from .models import AnalysisSession
+
+    if not session_id:
+        return None
+    try:
+        session = AnalysisSession.objects.get(id=session_id, expires_at__gt=timezone.now())
+    except (AnalysisSession.DoesNotExist, ValidationError, ValueError):
+        return None
+    session.expires_at = _expiry()
+    session.save(update_fields=['expires_at'])
+    metrics.incr('analysis_session.reused')
+    return session
+
+
+def purge_expired_sessions() -> int:
+    """Delete expired sessions; returns the number deleted"""
+    from .models import AnalysisSession
+
+    deleted, _ = AnalysisSession.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,225 @@
+"""
+Async (ASGI) variants of the LLM-bound CV analysis endpoints.
+
+Under an ASGI server these views await the LLM through the shared
+AsyncAzureOpenAI client instead of holding a worker thread for the whole
+call, so one process can keep many slow analyses in flight. Blocking work
+(text extraction, ORM writes) runs in worker threads via sync_to_async.
+Request and response shapes match the sync DRF endpoints in views.py.
+"""
+import json
+import os
+import tempfile
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from .models import CVUpload, AnalysisSession
+from .services import CVAnalysisService, AIAnalysisService
+from .analysis_sessions import create_session, get_session, hash_uploaded_file
+from .course_catalog import arecommend_catalog_courses
+from .deadlines import remaining_time, with_request_deadline
+from .job_profiles import get_job_profile, personalize_courses
+from .enrichment import save_analysis, schedule_enrichment
+from .idempotency import idempotent
+from .metrics import metrics
+from .singleflight import SingleFlight, SingleFlightTimeout, get_single_flight
+from .upload_validation import upload_rejection
+from .views import (
+    PUBLIC_ANALYSIS_SECTIONS, public_analysis_payload, parse_include_param,
+    log_skipped_recommendations, generate_course_recommendations, mark_degraded,
+    deadline_fallback_analysis, deadline_fallback_recommendations,
+)
+
+
+def request_data(request):
+    """Return the parsed JSON body or the form data of a plain Django request"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+
+async def aanalyze_and_save(cv_upload, mode: str = 'full') -> dict:
+    """Async variant of views.analyze_and_save"""
+    analysis_service = CVAnalysisService()
+    if mode == 'tiered':
+        analysis_result = await sync_to_async(analysis_service.analyze_cv_fast, thread_sensitive=False)(
+            cv_upload.file.path
+        )
+        await sync_to_async(save_fast_analysis)(cv_upload, analysis_result)
+    else:
+        previous = await CVUpload.objects.filter(
+            user_id=cv_upload.user_id, analysis_tier='full'
+        ).exclude(id=cv_upload.id).select_related('text_blob', 'analysis_blob').order_by('-uploaded_at').afirst()
+        if previous:
+            analysis_result = await analysis_service.aanalyze_cv_incremental(cv_upload.file.path, previous)
+        else:
+            analysis_result = await analysis_service.aanalyze_cv(cv_upload.file.path, cv_upload.user_id)
+        if analysis_result['tier'] == 'fast':
+            await sync_to_async(save_fast_analysis)(cv_upload, analysis_result)
+        else:
+            await sync_to_async(save_analysis)(cv_upload, analysis_result, 'full')
+    return analysis_result
+
+
+def save_fast_analysis(cv_upload, analysis_result: dict) -> None:
+    """Store the fast-tier analysis and schedule its background enrichment"""
+    save_analysis(cv_upload, analysis_result, tier='fast')
+    schedule_enrichment(cv_upload.id)
+
+
+async def aanalyze_uploaded_file(file) -> dict:
+    """Async variant of views.analyze_uploaded_file"""
+    def write_temp_file():
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.name)[1]) as tmp_file:
+            for chunk in file.chunks():
+                tmp_file.write(chunk)
+            return tmp_file.name
+
+    tmp_file_path = await sync_to_async(write_temp_file, thread_sensitive=False)()
+    try:
+        return await CVAnalysisService().aanalyze_cv(tmp_file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.unlink(tmp_file_path)
+
+
+async def arecommend_courses(analysis_result: dict, target_job: str) -> list:
+    """Async variant of views.recommend_courses"""
+    # Job profiles are cached; a miss builds the profile in a worker thread
+    profile = await sync_to_async(get_job_profile, thread_sensitive=False)(target_job) if target_job else None
+    if profile and profile['courses']:
+        return personalize_courses(profile, analysis_result)
+
+    recommendations = await arecommend_catalog_courses(analysis_result, target_job)
+    if recommendations:
+        return recommendations
+    recommendations = await AIAnalysisService().asearch_and_recommend_courses(analysis_result, target_job)
+    if not recommendations:
+        recommendations = generate_course_recommendations(analysis_result, target_job)
+    return recommendations
+
+
+@require_POST
+@idempotent
+async def analyze_cv_async(request):
+    """Async variant of analyze_cv_api"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+
+    try:
+        file = request.FILES.get('file')
+        rejection = upload_rejection(request)
+        if rejection:
+            return JsonResponse({'success': False, 'error': rejection['error']}, status=rejection['status'])
+        if not file:
+            return JsonResponse({'error': 'No file provided'}, status=400)
+
+        cv_upload = await CVUpload.objects.acreate(
+            user=user,
+            file=file,
+            original_filename=file.name
+        )
+
+        mode = request_data(request).get('mode') or request.GET.get('mode') or settings.CV_ANALYSIS_MODE
+        analysis_result = await aanalyze_and_save(cv_upload, mode)
+
+        return JsonResponse({
+            'success': True,
+            'analysis': analysis_result,
+            'cv_id': cv_upload.id,
+            'tier': cv_upload.analysis_tier,
+            'status': cv_upload.analysis_status,
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@csrf_exempt
+@require_POST
+@idempotent
+@with_request_deadline
+async def public_analyze_cv_async(request):
+    """Async variant of public_analyze_cv_api
+
+    Identical in-flight uploads are coalesced within this process only.
+    """
+    try:
+        data = request_data(request)
+        file = request.FILES.get('file')
+        rejection = upload_rejection(request)
+        if rejection:
+            return JsonResponse({'success': False, 'error': rejection['error']}, status=rejection['status'])
+        target_job = data.get('target_job', '')
+        session = await sync_to_async(get_session)(data.get('session_id'))
+
+        if not file and not session:
+            return JsonResponse({
+                'success': False,
+                'error': 'No file or valid session_id provided',
+                'session_expired': bool(data.get('session_id')),
+            }, status=400)
+
+        include = parse_include_param(request)
+        unknown = include - set(PUBLIC_ANALYSIS_SECTIONS)
+        if unknown:
+            return JsonResponse({
+                'success': False,
+                'error': f"Unknown sections in include: {', '.join(sorted(unknown))}. "
+                         f"Allowed: {', '.join(PUBLIC_ANALYSIS_SECTIONS)}"
+            }, status=400)
+
+        if file:
+            content_hash = await sync_to_async(hash_uploaded_file, thread_sensitive=False)(file)
+            if session and (session.content_hash != content_hash or session.analysis.get('degraded')):
+                session = None
+
+        if not session:
+            async def analyze():
+                analysis = await aanalyze_uploaded_file(file)
+                created = await sync_to_async(create_session)(content_hash, file.name, analysis)
+                return str(created.id)
+
+            try:
+                session_id = await get_single_flight().ado(
+                    SingleFlight.make_key('public_analyze', content_hash), analyze, timeout=remaining_time()
+                )
+            except SingleFlightTimeout:
+                analysis = await sync_to_async(deadline_fallback_analysis, thread_sensitive=False)(file)
+                session_id = str((await sync_to_async(create_session)(content_hash, file.name, analysis)).id)
+            session = await AnalysisSession.objects.aget(id=session_id)
+        analysis_result = session.analysis
+        response_data = public_analysis_payload(session, include)
+
+        if 'recommendations' in include:
+            started = time.monotonic()
+            try:
+                response_data['recommendations'] = await get_single_flight().ado(
+                    SingleFlight.make_key('public_recommend', session.content_hash, target_job),
+                    lambda: arecommend_courses(analysis_result, target_job),
+                    timeout=remaining_time()
+                )
+            except SingleFlightTimeout:
+                response_data['recommendations'] = deadline_fallback_recommendations(analysis_result, target_job)
+            metrics.observe('public_analyze.recommendations_latency', time.monotonic() - started)
+        else:
+            log_skipped_recommendations()
+
+        mark_degraded(response_data, analysis_result)
+        return JsonResponse(response_data)
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
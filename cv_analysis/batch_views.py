@@ -0,0 +1,247 @@
+"""
+Batch CV analysis with streamed results.
+
+POST api/analyze/batch/ takes many CV files (the `files` field) and analyzes
+them on a process-wide pool of CV_BATCH_WORKERS threads. Each result is
+written as one NDJSON line as soon as it finishes, in completion order; a
+final line summarizes the batch. At most CV_BATCH_WORKERS * 2 files of a
+batch are queued or running at a time, and finished results are not kept,
+so memory does not grow with the batch size (multipart uploads larger than
+FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to temporary files by Django).
+
+With ?mode=packed (the default when CV_BATCH_PACKING is set) the files are
+taken in packs of CV_PACK_SIZE and the short CVs of a pack are analyzed in
+shared LLM calls (see cv_packing.py); a pack's lines are written when the
+whole pack finishes, and the summary line carries the batch's `packing`
+report of calls, prompt tokens and LLM time saved.
+
+Each analysis is stored as an analysis session, so the returned session_id
+can be passed to the public plan endpoint.
+"""
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Tuple
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .analysis_sessions import create_session, hash_uploaded_file
+from .cv_packing import (
+    analyze_packed, empty_packing_stats, merge_packing_stats, pack_size, packing_report, record_packing_report
+)
+from .metrics import metrics
+from .services import CVAnalysisService
+from .singleflight import SingleFlight, get_single_flight
+from .upload_validation import batch_upload, max_batch_files, upload_rejection, upload_rejections
+from .views import analyze_uploaded_file, public_analysis_payload, uploaded_temp_file
+
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CV_BATCH_WORKERS', 4),
+            thread_name_prefix='cv-batch'
+        )
+    return _executor
+
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=str) + '\n').encode('utf-8')
+
+
+def _file_succeeded(index: int, file, session, started: float) -> Dict[str, Any]:
+    payload = public_analysis_payload(session, {'analysis'})
+    metrics.incr('batch.files_analyzed')
+    return {
+        'index': index,
+        'file_name': file.name,
+        'success': True,
+        'session_id': payload['session_id'],
+        'analysis': payload['analysis'],
+        'elapsed': round(time.monotonic() - started, 3),
+    }
+
+
+def _file_failed(index: int, file, error: Exception, started: float) -> Dict[str, Any]:
+    metrics.incr('batch.files_failed')
+    print(f"Batch analysis of {file.name} failed: {error}")
+    return {
+        'index': index,
+        'file_name': file.name,
+        'success': False,
+        'error': str(error),
+        'elapsed': round(time.monotonic() - started, 3),
+    }
+
+
+def analyze_batch_file(index: int, file) -> Dict[str, Any]:
+    """Analyze one file of a batch into a session; errors are returned, not raised"""
+    from .models import AnalysisSession
+
+    started = time.monotonic()
+    close_old_connections()
+    try:
+        content_hash = hash_uploaded_file(file)
+        # Identical CVs in flight (in this batch or elsewhere) share one analysis
+        session_id = get_single_flight().do(
+            SingleFlight.make_key('public_analyze', content_hash),
+            lambda: str(create_session(content_hash, file.name, analyze_uploaded_file(file)).id)
+        )
+        return _file_succeeded(index, file, AnalysisSession.objects.get(id=session_id), started)
+    except Exception as e:
+        return _file_failed(index, file, e, started)
+    finally:
+        close_old_connections()
+
+
+def analyze_batch_pack(items: List[Tuple[int, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Analyze a pack of (index, file) pairs with packed LLM calls into sessions
+
+    Returns one result per file, as analyze_batch_file does, and the
+    packing stats of the pack.
+    """
+    started = time.monotonic()
+    close_old_connections()
+    service = CVAnalysisService()
+    results, extracted = [], []
+    try:
+        for index, file in items:
+            try:
+                content_hash = hash_uploaded_file(file)
+                with uploaded_temp_file(file) as tmp_file_path:
+                    text = service.extract_text(tmp_file_path)
+                if not text:
+                    raise ValueError("Could not extract text from the file")
+                extracted.append((index, file, content_hash, text))
+            except Exception as e:
+                results.append(_file_failed(index, file, e, started))
+
+        try:
+            analyses, stats = analyze_packed(service, [text for _, _, _, text in extracted])
+        except Exception as e:
+            failures = [_file_failed(index, file, e, started) for index, file, _, _ in extracted]
+            return results + failures, empty_packing_stats()
+
+        for (index, file, content_hash, text), analysis in zip(extracted, analyses):
+            try:
+                session = create_session(content_hash, file.name, service._full_result(text, analysis))
+                results.append(_file_succeeded(index, file, session, started))
+            except Exception as e:
+                results.append(_file_failed(index, file, e, started))
+        return results, stats
+    finally:
+        close_old_connections()
+
+
+def stream_batch_results(files, rejected, packed: bool = False) -> Iterator[bytes]:
+    """Yield one NDJSON line per file as it finishes (per pack when packed), then a summary line"""
+    started = time.monotonic()
+    executor = _get_executor()
+    window = max(1, getattr(settings, 'CV_BATCH_WORKERS', 4) * 2)
+    succeeded = failed = 0
+    stats = empty_packing_stats()
+
+    for rejection in rejected:
+        failed += 1
+        yield _ndjson({'index': None, 'success': False, **rejection})
+
+    if packed:
+        indexed = list(enumerate(files))
+        size = pack_size()
+        tasks = ((analyze_batch_pack, indexed[start:start + size]) for start in range(0, len(indexed), size))
+    else:
+        tasks = ((analyze_batch_file, index, file) for index, file in enumerate(files))
+
+    pending = set()
+    try:
+        while True:
+            for task in tasks:
+                pending.add(executor.submit(*task))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if packed:
+                    results, pack_stats = future.result()
+                    merge_packing_stats(stats, pack_stats)
+                else:
+                    results = [future.result()]
+                for result in results:
+                    if result['success']:
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield _ndjson(result)
+    finally:
+        # The client went away: drop the files that have not started
+        for future in pending:
+            future.cancel()
+
+    elapsed = time.monotonic() - started
+    metrics.observe('batch.latency', elapsed)
+    summary = {
+        'done': True,
+        'total': len(files) + len(rejected),
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed': round(elapsed, 3),
+    }
+    if packed:
+        summary['packing'] = packing_report(stats)
+        record_packing_report(summary['packing'])
+    yield _ndjson(summary)
+
+
+def _packing_requested(request) -> bool:
+    mode = request.GET.get('mode')
+    if mode:
+        return mode == 'packed'
+    return getattr(settings, 'CV_BATCH_PACKING', False)
+
+
+@batch_upload
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def analyze_cv_batch(request):
+    """Analyze a batch of CVs, streaming one NDJSON result line per file as it finishes
+
+    ?mode=packed analyzes short CVs several per LLM call, ?mode=single one
+    per call; without it CV_BATCH_PACKING decides.
+    """
+    files = request.FILES.getlist('files')
+    if not files:
+        # Nothing to analyze: the whole request or every file was rejected, or no files were sent
+        rejection = upload_rejection(request)
+        if rejection:
+            return Response({'success': False, 'error': rejection['error']}, status=rejection['status'])
+        return Response({'success': False, 'error': 'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
+    rejected = upload_rejections(request)
+    if len(files) + len(rejected) > max_batch_files():
+        return Response({
+            'success': False,
+            'error': f'Too many files: at most {max_batch_files()} per batch'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    packed = _packing_requested(request)
+    metrics.incr('batch.requests')
+    if packed:
+        metrics.incr('batch.packed_requests')
+    metrics.observe('batch.size', len(files))
+    response = StreamingHttpResponse(
+        stream_batch_results(files, rejected, packed=packed), content_type='application/x-ndjson'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Proxies must pass each line through instead of buffering the whole response
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,64 @@
+"""
+Compressed, content-addressed storage of bulky CV payloads.
+
+Extracted CV text and the analysis payload of a CVUpload live in CVBlob
+rows keyed by the SHA-256 of their uncompressed bytes, compressed with
+zstd when the zstandard package is installed and zlib otherwise. CVUpload
+rows only hold the blob keys, so list and lookup queries read small
+columns; identical payloads (re-uploads of the same CV) share one blob.
+"""
+import hashlib
+import json
+import zlib
+from typing import Any
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compress(raw: bytes):
+    """Return (codec, compressed bytes)"""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return 'zlib', zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress(codec: str, data) -> bytes:
+    data = bytes(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('The zstandard package is required to read zstd-compressed blobs')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def encode_json(value: Any) -> bytes:
+    """Serialize deterministically so equal payloads share a blob"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def store_blob(raw: bytes):
+    """Return the CVBlob holding raw, creating it if needed"""
+    from .models import CVBlob
+
+    key = digest(raw)
+    blob = CVBlob.objects.filter(digest=key).only('digest').first()
+    if blob is None:
+        codec, data = compress(raw)
+        blob, _ = CVBlob.objects.get_or_create(
+            digest=key, defaults={'codec': codec, 'size': len(raw), 'data': data}
+        )
+    return blob
+
+
+def load_blob(blob) -> bytes:
+    return decompress(blob.codec, blob.data)
@@ -0,0 +1,337 @@
+"""
+Deterministic local career planner.
+
+build_local_career_plan() produces a generate_career_plan-shaped plan
+without the LLM, in a few milliseconds:
+
+* the target role is a known job title (job_profiles.JOB_PROFILE_SKILLS)
+  named in the career-goal answers, else the CV's current role, else the
+  known title sharing the most skills with the CV;
+* skill gaps are set differences between the role's required skills, plus
+  the unmet prerequisites of those skills in SKILL_PREREQUISITES, and the
+  CV's canonical skills; skills the candidate asked to learn are added as
+  low-priority gaps;
+* the learning path walks the gaps in topological order of the
+  prerequisite graph, taking the highest-priority ready skill first, and
+  attaches the catalog course teaching each skill (a practice project when
+  the catalog has none).
+
+It is the plan of last resort when the LLM is unavailable, the whole plan
+with CAREER_PLAN_MODE='local', and the draft the LLM refines with
+CAREER_PLAN_MODE='refine'.
+"""
+import heapq
+import re
+import time
+from graphlib import CycleError, TopologicalSorter
+from typing import Any, Dict, List, Optional, Set
+from django.conf import settings
+
+from .job_profiles import JOB_PROFILE_SKILLS, KNOWN_JOB_TITLES, normalize_job_title
+from .metrics import metrics
+from .skills import canonical_skill_name, skill_names
+
+
+# Skill -> skills worth having first (canonical names)
+SKILL_PREREQUISITES = {
+    'algorithms': ['data structures'],
+    'system design': ['apis', 'sql', 'data structures'],
+    'typescript': ['javascript'],
+    'react': ['javascript', 'html', 'css'],
+    'react native': ['react'],
+    'node.js': ['javascript'],
+    'apis': ['git'],
+    'pandas': ['python'],
+    'machine learning': ['python', 'statistics'],
+    'deep learning': ['machine learning'],
+    'llms': ['deep learning', 'apis'],
+    'mlops': ['machine learning', 'docker', 'ci/cd'],
+    'docker': ['linux'],
+    'kubernetes': ['docker', 'networking'],
+    'ci/cd': ['git', 'testing'],
+    'terraform': ['cloud'],
+    'aws': ['linux', 'networking'],
+    'azure': ['networking'],
+    'cloud': ['linux', 'networking'],
+    'cloud security': ['security', 'cloud'],
+    'security': ['networking', 'linux'],
+    'penetration testing': ['security'],
+    'monitoring': ['linux'],
+    'incident response': ['monitoring'],
+    'test automation': ['testing', 'python'],
+    'selenium': ['test automation'],
+    'spark': ['python', 'sql'],
+    'data pipelines': ['sql', 'python'],
+    'airflow': ['data pipelines'],
+    'data visualization': ['excel'],
+    'scrum': ['agile'],
+    'roadmapping': ['product strategy'],
+    'product strategy': ['user research'],
+    'prototyping': ['wireframing', 'figma'],
+    'usability testing': ['user research'],
+    'mobile ui': ['prototyping'],
+    'process modeling': ['requirements analysis'],
+    'stakeholder management': ['communication'],
+    'leadership': ['communication'],
+    'hiring': ['leadership'],
+    'risk management': ['project planning'],
+}
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+# Required skills in the first part of a role's (importance-ordered) list are high priority
+HIGH_PRIORITY_SHARE = 0.5
+MAX_INTEREST_GAPS = 3
+PRACTICE_DURATION = '2 weeks'
+COURSE_LEVEL_RANK = {'beginner': 0, 'intermediate': 1, 'advanced': 2}
+
+
+def career_plan_mode() -> str:
+    """'llm' (LLM plan, local plan as fallback), 'refine' (LLM refines the local plan) or 'local'"""
+    return getattr(settings, 'CAREER_PLAN_MODE', 'llm')
+
+
+def _known_skills(cv_analysis: Dict[str, Any]) -> Set[str]:
+    return {canonical_skill_name(skill) for skill in skill_names(cv_analysis.get('skills', []))}
+
+
+def _all_skill_names() -> Set[str]:
+    names = set(SKILL_PREREQUISITES)
+    for prerequisites in SKILL_PREREQUISITES.values():
+        names.update(prerequisites)
+    for skills in JOB_PROFILE_SKILLS.values():
+        names.update(skills)
+    return names
+
+
+def _mentions(text: str, name: str) -> bool:
+    return re.search(rf'(?<![a-z0-9]){re.escape(name)}(?![a-z0-9])', text) is not None
+
+
+def _responses_text(user_responses: List[Dict[str, Any]], question_type: str) -> str:
+    return ' '.join(
+        (response.get('response_text') or '') for response in user_responses or []
+        if response.get('question_type') == question_type
+    ).lower()
+
+
+def choose_target_role(cv_analysis: Dict[str, Any], user_responses: List[Dict[str, Any]],
+                       target_job: Optional[str] = None) -> str:
+    """The known job title the plan works towards"""
+    candidates = [target_job] if target_job else []
+    goals = _responses_text(user_responses, 'career_goals')
+    # The longest title named in the answers wins ("machine learning engineer" over "engineer")
+    candidates.extend(title for title in sorted(KNOWN_JOB_TITLES, key=len, reverse=True) if _mentions(goals, title))
+    candidates.append(cv_analysis.get('current_role') or '')
+    for candidate in candidates:
+        normalized = normalize_job_title(candidate)
+        if normalized in JOB_PROFILE_SKILLS:
+            return normalized
+
+    known = _known_skills(cv_analysis)
+
+    def overlap(title):
+        required = {canonical_skill_name(skill) for skill in JOB_PROFILE_SKILLS[title]}
+        return len(required & known) / len(required | known)
+
+    # Ties keep KNOWN_JOB_TITLES (popularity) order
+    return max(KNOWN_JOB_TITLES, key=overlap)
+
+
+def compute_skill_gaps(target_role: str, known: Set[str], interests: str = '') -> Dict[str, Dict[str, Any]]:
+    """Missing skills of the role (with unmet prerequisites) and requested skills, by canonical name"""
+    required = [canonical_skill_name(skill) for skill in JOB_PROFILE_SKILLS.get(target_role, [])]
+    high_count = max(1, round(len(required) * HIGH_PRIORITY_SHARE))
+    gaps = {}
+    for rank, skill in enumerate(required):
+        if skill not in known:
+            gaps[skill] = {'priority': 'high' if rank < high_count else 'medium', 'reason': 'required', 'rank': rank}
+
+    # Unmet prerequisites of a gap share the priority of the most important skill needing them
+    pending = list(gaps)
+    while pending:
+        skill = pending.pop()
+        for prerequisite in SKILL_PREREQUISITES.get(skill, []):
+            if prerequisite in known:
+                continue
+            gap = gaps.get(prerequisite)
+            priority = gaps[skill]['priority']
+            if gap is None:
+                gaps[prerequisite] = {'priority': priority, 'reason': 'prerequisite', 'rank': gaps[skill]['rank']}
+                pending.append(prerequisite)
+            elif PRIORITY_RANK[priority] < PRIORITY_RANK[gap['priority']]:
+                gap['priority'] = priority
+                pending.append(prerequisite)
+
+    requested = sorted(
+        skill for skill in _all_skill_names() - known - set(gaps) if interests and _mentions(interests, skill)
+    )
+    for skill in requested[:MAX_INTEREST_GAPS]:
+        gaps[skill] = {'priority': 'low', 'reason': 'interest', 'rank': len(required)}
+    return gaps
+
+
+def learning_order(gaps: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Gap skills with prerequisites first, otherwise by priority and role importance"""
+    def key(skill):
+        return PRIORITY_RANK[gaps[skill]['priority']], gaps[skill]['rank'], skill
+
+    sorter = TopologicalSorter({
+        skill: [prerequisite for prerequisite in SKILL_PREREQUISITES.get(skill, []) if prerequisite in gaps]
+        for skill in gaps
+    })
+    try:
+        sorter.prepare()
+    except CycleError:
+        print("Skill prerequisite graph has a cycle, ordering the learning path by priority only")
+        return sorted(gaps, key=key)
+
+    order, ready = [], []
+    while sorter.is_active():
+        for skill in sorter.get_ready():
+            heapq.heappush(ready, (key(skill), skill))
+        _, skill = heapq.heappop(ready)
+        order.append(skill)
+        sorter.done(skill)
+    return order
+
+
+def _catalog_courses(skills: List[str]) -> List[Dict[str, Any]]:
+    """Catalog courses teaching the most of the skills; the built-in catalog if the database has none"""
+    from .course_catalog import DEFAULT_COURSES
+    from .skills import courses_for_skills, skill_ids
+
+    try:
+        courses = [
+            course.as_recommendation() for course in courses_for_skills(skill_ids(skills), limit=len(skills) * 2)
+        ]
+    except Exception as e:
+        print(f"Catalog lookup for the career planner failed: {e}")
+        courses = []
+    if courses:
+        return courses
+    wanted = set(skills)
+    return sorted(
+        (course for course in DEFAULT_COURSES if wanted & _course_skills(course)),
+        key=lambda course: -len(wanted & _course_skills(course))
+    )
+
+
+def _course_skills(course: Dict[str, Any]) -> Set[str]:
+    return {canonical_skill_name(skill) for skill in skill_names(course.get('skills', []))}
+
+
+def build_learning_path(order: List[str], gaps: Dict[str, Dict[str, Any]], target_role: str) -> List[Dict[str, Any]]:
+    """One learning item per gap skill in order; a course covering several gaps is listed once"""
+    courses = _catalog_courses(order)
+    used = {}
+    position = {}
+    path = []
+    for skill in order:
+        # Entry-level courses first: every gap starts at beginner level
+        teaching = sorted(
+            (course for course in courses if skill in _course_skills(course)),
+            key=lambda course: COURSE_LEVEL_RANK.get(str(course.get('level') or '').lower(), 1)
+        )
+        course = teaching[0] if teaching else None
+        if course is not None and course['id'] in used:
+            item_position = used[course['id']]
+            # Joining an earlier course must not put the skill ahead of its own prerequisites
+            prerequisites = [name for name in SKILL_PREREQUISITES.get(skill, []) if name in gaps]
+            if all(position[name] <= item_position for name in prerequisites):
+                path[item_position]['skills'].append(skill)
+                position[skill] = item_position
+                continue
+        if course is not None and course['id'] not in used:
+            item = {
+                'title': course['title'],
+                'type': 'course',
+                'duration': course.get('duration') or '',
+                'priority': gaps[skill]['priority'],
+                'description': course.get('description') or f"Learn {skill}",
+                'skills': [skill],
+                'provider': course.get('provider'),
+                'url': course.get('url'),
+                'course_id': course['id'],
+            }
+            used[course['id']] = len(path)
+        else:
+            item = {
+                'title': f"Build a {skill} project",
+                'type': 'practice',
+                'duration': PRACTICE_DURATION,
+                'priority': gaps[skill]['priority'],
+                'description': f"Learn {skill} by building a small project typical of {target_role} work.",
+                'skills': [skill],
+            }
+        position[skill] = len(path)
+        path.append(item)
+    return path
+
+
+def _target_level(gap: Dict[str, Any]) -> str:
+    # The role's most important skills are worth taking further than their prerequisites
+    return 'advanced' if gap['reason'] == 'required' and gap['priority'] == 'high' else 'intermediate'
+
+
+def _timeline(path: List[Dict[str, Any]], target_role: str) -> Dict[str, List[str]]:
+    third = max(1, (len(path) + 2) // 3)
+    steps = [
+        f"Complete {item['title']}" if item['type'] == 'course' else item['title']
+        for item in path
+    ]
+    return {
+        'short_term': steps[:third] or [f"Review the {target_role} skill requirements"],
+        'medium_term': steps[third:2 * third] + [f"Show the new skills in a {target_role} portfolio project"],
+        'long_term': steps[2 * third:] + [f"Apply for {target_role} positions"],
+    }
+
+
+def build_local_career_plan(cv_analysis: Dict[str, Any], user_responses: List[Dict[str, Any]],
+                            target_job: Optional[str] = None) -> Dict[str, Any]:
+    """Career plan computed from the skill graph, role profiles and catalog, without the LLM"""
+    started = time.monotonic()
+    known = _known_skills(cv_analysis)
+    target_role = choose_target_role(cv_analysis, user_responses, target_job)
+    gaps = compute_skill_gaps(target_role, known, _responses_text(user_responses, 'skills_interests'))
+    order = learning_order(gaps)
+    path = build_learning_path(order, gaps, target_role)
+
+    required = [canonical_skill_name(skill) for skill in JOB_PROFILE_SKILLS[target_role]]
+    matched = [skill for skill in required if skill in known]
+    role_gaps = [skill for skill in order if gaps[skill]['reason'] == 'required']
+    title = target_role.title()
+
+    goals = [f"Grow into a {title} role"]
+    if role_gaps:
+        goals.append(f"Close the core {title} skill gaps: {', '.join(role_gaps[:4])}")
+    goals.append(f"Build a portfolio that demonstrates {', '.join((matched + role_gaps)[:3])}")
+
+    recommendations = []
+    if matched:
+        recommendations.append(f"Lead with your {', '.join(matched[:3])} experience when applying for {title} roles")
+    for area in (cv_analysis.get('areas_for_improvement') or [])[:2]:
+        area_title = area.get('title') if isinstance(area, dict) else area
+        if area_title:
+            recommendations.append(f"Address in your CV: {area_title}")
+    recommendations.append("Revisit this plan as you complete each learning item")
+
+    metrics.incr('career_plan.local')
+    metrics.observe('career_plan.local_latency', time.monotonic() - started)
+    return {
+        'career_goals': goals,
+        'skill_gaps': [
+            {
+                'skill': skill,
+                'current_level': 'beginner',
+                'target_level': _target_level(gaps[skill]),
+                'priority': gaps[skill]['priority'],
+            }
+            for skill in order
+        ],
+        'learning_path': path,
+        'timeline': _timeline(path, target_role),
+        'recommendations': recommendations,
+        'target_role': target_role,
+        'skill_match': round(len(matched) / len(required), 2) if required else 0.0,
+        'planner': 'local',
+    }
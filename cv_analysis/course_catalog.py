@@ -0,0 +1,329 @@
+"""
+Course catalog retrieval.
+
+Catalog courses (the Course model) carry a precomputed embedding: a hashed
+bag of words and character n-grams of their title, skills and description.
+Each process stacks the embeddings into one NumPy matrix, so recommending
+courses is a single matrix-vector product over the catalog followed by a
+top-k selection. The query vector combines the CV's skills, improvement
+areas and target job; an LLM may optionally re-rank the shortlist.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1024
+CHAR_NGRAM_SIZE = 3
+# Weights of the query parts: what the candidate wants and lacks outranks what they already know
+QUERY_WEIGHTS = {'target_job': 2.0, 'improvement_areas': 1.5, 'skills': 1.0}
+# How often a process checks whether the catalog changed
+CATALOG_REFRESH_INTERVAL = 60
+
+# Built-in catalog, loaded by the load_courses command when no file is given
+DEFAULT_COURSES = [
+    {
+        'id': '1',
+        'title': 'React for Beginners',
+        'provider': 'Coursera',
+        'url': 'https://coursera.org',
+        'skills': ['react', 'javascript', 'frontend', 'hooks'],
+        'level': 'Beginner',
+        'duration': '12h',
+        'rating': 4.8,
+        'price': 'Free',
+        'isFree': True,
+        'description': 'Learn React from scratch with hands-on projects and real-world examples.'
+    },
+    {
+        'id': '2',
+        'title': 'Advanced React Patterns',
+        'provider': 'Udemy',
+        'url': 'https://udemy.com',
+        'skills': ['react', 'hooks', 'performance', 'patterns'],
+        'level': 'Advanced',
+        'duration': '15h',
+        'rating': 4.9,
+        'price': '$89.99',
+        'isFree': False,
+        'description': 'Master advanced React patterns and optimization techniques.'
+    },
+    {
+        'id': '3',
+        'title': 'Data Structures in Python',
+        'provider': 'edX',
+        'url': 'https://edx.org',
+        'skills': ['python', 'algorithms', 'data structures'],
+        'level': 'Intermediate',
+        'duration': '8h',
+        'rating': 4.7,
+        'price': 'Free',
+        'isFree': True,
+        'description': 'Comprehensive guide to data structures and algorithms in Python.'
+    },
+    {
+        'id': '4',
+        'title': 'Machine Learning Foundations',
+        'provider': 'Coursera',
+        'url': 'https://coursera.org',
+        'skills': ['ml', 'python', 'machine learning'],
+        'level': 'Beginner',
+        'duration': '20h',
+        'rating': 4.6,
+        'price': '$49.99',
+        'isFree': False,
+        'description': 'Introduction to machine learning concepts and applications.'
+    },
+    {
+        'id': '5',
+        'title': 'DevOps Essentials',
+        'provider': 'Udacity',
+        'url': 'https://udacity.com',
+        'skills': ['devops', 'ci/cd', 'docker', 'deployment'],
+        'level': 'Intermediate',
+        'duration': '16h',
+        'rating': 4.5,
+        'price': 'Free',
+        'isFree': True,
+        'description': 'Learn DevOps practices and tools for modern software development.'
+    },
+    {
+        'id': '6',
+        'title': 'AWS Cloud Practitioner',
+        'provider': 'AWS Training',
+        'url': 'https://aws.amazon.com',
+        'skills': ['aws', 'cloud', 'certification', 'infrastructure'],
+        'level': 'Beginner',
+        'duration': '10h',
+        'rating': 4.8,
+        'price': 'Free',
+        'isFree': True,
+        'description': 'Prepare for the AWS Cloud Practitioner certification exam.'
+    },
+    {
+        'id': '7',
+        'title': 'JavaScript Mastery',
+        'provider': 'Udemy',
+        'url': 'https://udemy.com',
+        'skills': ['javascript', 'es6', 'async', 'programming'],
+        'level': 'Intermediate',
+        'duration': '18h',
+        'rating': 4.9,
+        'price': '$79.99',
+        'isFree': False,
+        'description': 'Master modern JavaScript including ES6+, async/await, and advanced patterns.'
+    },
+    {
+        'id': '8',
+        'title': 'TypeScript Fundamentals',
+        'provider': 'Pluralsight',
+        'url': 'https://pluralsight.com',
+        'skills': ['typescript', 'javascript', 'type safety'],
+        'level': 'Intermediate',
+        'duration': '10h',
+        'rating': 4.7,
+        'price': 'Free',
+        'isFree': True,
+        'description': 'Learn TypeScript from the ground up with practical examples.'
+    },
+    {
+        'id': '9',
+        'title': 'Node.js Backend Development',
+        'provider': 'Coursera',
+        'url': 'https://coursera.org',
+        'skills': ['node.js', 'backend', 'api', 'server'],
+        'level': 'Advanced',
+        'duration': '25h',
+        'rating': 4.8,
+        'price': '$99.99',
+        'isFree': False,
+        'description': 'Build scalable backend applications with Node.js and Express.'
+    },
+    {
+        'id': '10',
+        'title': 'Docker & Kubernetes',
+        'provider': 'Udemy',
+        'url': 'https://udemy.com',
+        'skills': ['docker', 'kubernetes', 'devops', 'containers'],
+        'level': 'Intermediate',
+        'duration': '14h',
+        'rating': 4.6,
+        'price': '$69.99',
+        'isFree': False,
+        'description': 'Master containerization and orchestration with Docker and Kubernetes.'
+    },
+]
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    """Word and character n-gram features of a text"""
+    features = []
+    for word in re.findall(r'[a-z0-9+#.]+', (text or '').lower()):
+        word = word.strip('.')
+        if not word:
+            continue
+        features.append((f'w:{word}', 1.0))
+        padded = f'<{word}>'
+        for i in range(max(len(padded) - CHAR_NGRAM_SIZE + 1, 1)):
+            features.append((f'c:{padded[i:i + CHAR_NGRAM_SIZE]}', 0.5))
+    return features
+
+
+def embed_text(text: str):
+    """Return the L2-normalized hashed n-gram vector of a text (float32)"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature, weight in _features(text):
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], 'little') % EMBEDDING_DIM
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def course_text(course: Dict[str, Any]) -> str:
+    """Text a course is embedded from; skills are repeated to weigh them above the description"""
+    skills = ' '.join(course.get('skills') or [])
+    return ' '.join([course.get('title', ''), skills, skills, course.get('description', '')])
+
+
+def course_embedding(course: Dict[str, Any]) -> bytes:
+    return embed_text(course_text(course)).tobytes()
+
+
+def query_vector(cv_analysis: Dict[str, Any], target_job: str):
+    """Build the weighted query vector from a CV analysis and target job"""
+    areas = []
+    for area in cv_analysis.get('areas_for_improvement', []):
+        if isinstance(area, dict):
+            areas.append(f"{area.get('title', '')} {area.get('description', '')}")
+        else:
+            areas.append(str(area))
+    parts = {
+        'target_job': target_job or '',
+        'improvement_areas': ' '.join(areas),
+        'skills': ' '.join(str(skill) for skill in cv_analysis.get('skills', [])),
+    }
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for name, text in parts.items():
+        if text.strip():
+            vector += QUERY_WEIGHTS[name] * embed_text(text)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class CourseIndex:
+    """In-memory embedding matrix of the active catalog, reloaded when the catalog changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.matrix = None
+        self.courses = []
+
+    def _catalog_version(self):
+        from .models import Course
+        return tuple(Course.objects.filter(is_active=True).aggregate(
+            count=Count('id'), updated=Max('updated_at')
+        ).values())
+
+    def _refresh(self) -> None:
+        if time.monotonic() - self._checked_at < CATALOG_REFRESH_INTERVAL and self.matrix is not None:
+            return
+        from .models import Course
+
+        with self._lock:
+            version = self._catalog_version()
+            self._checked_at = time.monotonic()
+            if version == self._version:
+                return
+            courses = list(Course.objects.filter(is_active=True, embedding__isnull=False).order_by('id'))
+            if courses:
+                self.matrix = np.vstack([np.frombuffer(bytes(course.embedding), dtype=np.float32) for course in courses])
+            else:
+                self.matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+            self.courses = courses
+            self._version = version
+            metrics.incr('course_index.reloads')
+            logger.info("Loaded course index with %d courses", len(courses))
+
+    def warm(self) -> int:
+        """Load the catalog now instead of on the first search; returns the number of courses"""
+        self._refresh()
+        return len(self.courses)
+
+    def search(self, cv_analysis: Dict[str, Any], target_job: str, limit: int = 10) -> List[Tuple[Any, float]]:
+        """Return the top (Course, similarity) pairs for a CV analysis and target job"""
+        self._refresh()
+        if not self.courses:
+            return []
+        query = query_vector(cv_analysis, target_job)
+        if not query.any():
+            return []
+        scores = self.matrix @ query
+        limit = min(limit, len(self.courses))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.courses[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+_course_index = None
+
+
+def get_course_index() -> Optional[CourseIndex]:
+    """Return the process-wide course index, or None if NumPy is not installed"""
+    global _course_index
+    if np is None:
+        return None
+    if _course_index is None:
+        _course_index = CourseIndex()
+    return _course_index
+
+
+def recommend_catalog_courses(cv_analysis: Dict[str, Any], target_job: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Recommend catalog courses by embedding similarity, optionally re-ranked by the LLM"""
+    index = get_course_index()
+    if index is None:
+        return []
+    started = time.monotonic()
+    shortlist_size = getattr(settings, 'COURSE_RERANK_SHORTLIST', 20)
+    rerank = getattr(settings, 'COURSE_LLM_RERANK', False)
+    matches = index.search(cv_analysis, target_job, limit=shortlist_size if rerank else limit)
+    metrics.observe('course_search.latency', time.monotonic() - started)
+    courses = [course.as_recommendation() for course, _ in matches]
+    if rerank and len(courses) > 1:
+        from .services import AIAnalysisService
+        courses = AIAnalysisService().rerank_courses(cv_analysis, target_job, courses)
+    return courses[:limit]
+
+
+async def arecommend_catalog_courses(cv_analysis: Dict[str, Any], target_job: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Async variant of recommend_catalog_courses"""
+    index = get_course_index()
+    if index is None:
+        return []
+    started = time.monotonic()
+    shortlist_size = getattr(settings, 'COURSE_RERANK_SHORTLIST', 20)
+    rerank = getattr(settings, 'COURSE_LLM_RERANK', False)
+    matches = await sync_to_async(index.search)(cv_analysis, target_job, limit=shortlist_size if rerank else limit)
+    metrics.observe('course_search.latency', time.monotonic() - started)
+    courses = [course.as_recommendation() for course, _ in matches]
+    if rerank and len(courses) > 1:
+        from .services import AIAnalysisService
+        courses = await AIAnalysisService().arerank_courses(cv_analysis, target_job, courses)
+    return courses[:limit]
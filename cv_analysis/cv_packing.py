@@ -0,0 +1,206 @@
+"""
+Packed analysis of short CVs for batch and offline work.
+
+Analyzing a short CV on its own spends most of the prompt on the analysis
+instructions. analyze_packed() instead sends up to CV_PACK_SIZE short CVs
+(each at most CV_PACK_MAX_CV_CHARS characters, CV_PACK_MAX_CHARS in total)
+in one cv_analysis_packed call: the instructions appear once, each CV sits
+in its own <cv id="..."> block, and the model answers with a JSON object
+keyed by CV id. Every CV's slice of the answer is validated on its own; a CV
+whose slice is missing or malformed is re-analyzed individually, as are long
+CVs and CVs left alone in a pack.
+
+The stats of each call are summed per batch and turned into a report by
+packing_report(): LLM calls, prompt tokens and LLM seconds spent on the
+packed CVs against estimates for analyzing them one by one (the individual
+prompt built for each CV, and the average cv_analysis_short latency).
+"""
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+
+from .llm_routing import get_llm_router, short_cv_chars
+from .metrics import metrics
+from .prompts import build_cv_packed_messages, count_tokens, record_prompt_usage
+
+
+PACKED_TASK = 'cv_analysis_packed'
+# Completion token budget per CV of a packed call
+CV_PACK_MAX_TOKENS_PER_CV = 1500
+
+_STAT_KEYS = (
+    'cvs', 'reused_cvs', 'individual_cvs', 'packs', 'packed_cvs', 'retried_cvs',
+    'prompt_tokens', 'individual_prompt_tokens', 'llm_seconds',
+)
+
+
+def pack_size() -> int:
+    return max(1, getattr(settings, 'CV_PACK_SIZE', 5))
+
+
+def pack_max_cv_chars() -> int:
+    return getattr(settings, 'CV_PACK_MAX_CV_CHARS', None) or short_cv_chars()
+
+
+def pack_max_chars() -> int:
+    return getattr(settings, 'CV_PACK_MAX_CHARS', 24000)
+
+
+def empty_packing_stats() -> Dict[str, Any]:
+    return {key: 0 for key in _STAT_KEYS}
+
+
+def merge_packing_stats(total: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    for key in _STAT_KEYS:
+        total[key] = total.get(key, 0) + stats.get(key, 0)
+    return total
+
+
+def pack_groups(texts: List[str], indexes: List[int]) -> List[List[int]]:
+    """Split the CVs at indexes, in order, into packs within the size and character limits"""
+    groups, current, chars = [], [], 0
+    for index in indexes:
+        length = len(texts[index])
+        if current and (len(current) >= pack_size() or chars + length > pack_max_chars()):
+            groups.append(current)
+            current, chars = [], 0
+        current.append(index)
+        chars += length
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _valid_slice(value: Any) -> bool:
+    """Whether one CV's part of a packed answer is a usable analysis"""
+    return (isinstance(value, dict)
+            and isinstance(value.get('skills'), list)
+            and isinstance(value.get('strengths'), list)
+            and isinstance(value.get('areas_for_improvement'), list)
+            and isinstance(value.get('summary'), str) and bool(value['summary'].strip()))
+
+
+def parse_packed_content(content: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """The valid per-CV analyses of a packed answer, by CV id; invalid or missing slices are left out"""
+    json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', content or '', re.DOTALL)
+    try:
+        result = json.loads(json_match.group(1) if json_match else content)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(result, dict):
+        return {}
+    return {cv_id: result[cv_id] for cv_id in ids if _valid_slice(result.get(cv_id))}
+
+
+def _analyze_pack(service, texts: List[str], group: List[int], stats: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """One packed call for the CVs at group; returns the analyses that came back valid, by index"""
+    ids = [f'cv{position + 1}' for position in range(len(group))]
+    messages = build_cv_packed_messages([(cv_id, texts[index]) for cv_id, index in zip(ids, group)])
+    stats['packs'] += 1
+    stats['packed_cvs'] += len(group)
+    # Both sides of the comparison are counted the same way, not from provider usage
+    stats['prompt_tokens'] += count_tokens(messages)
+    stats['individual_prompt_tokens'] += sum(count_tokens(service._analysis_messages(texts[index])) for index in group)
+
+    started = time.monotonic()
+    try:
+        response = get_llm_router().chat(
+            service.openai_client,
+            PACKED_TASK,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=CV_PACK_MAX_TOKENS_PER_CV * len(group)
+        )
+        record_prompt_usage(PACKED_TASK, messages, response)
+        slices = parse_packed_content(response.choices[0].message.content, ids)
+    except Exception as e:
+        print(f"Packed analysis of {len(group)} CVs failed, analyzing them one by one: {e}")
+        slices = {}
+    finally:
+        stats['llm_seconds'] += time.monotonic() - started
+
+    if len(slices) < len(group):
+        print(f"Packed analysis returned {len(slices)} of {len(group)} CVs, retrying the others one by one")
+    return {
+        index: service._normalize_analysis_format(slices[cv_id])
+        for cv_id, index in zip(ids, group) if cv_id in slices
+    }
+
+
+def analyze_packed(service, texts: List[str], user_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Analyze CV texts with a CVAnalysisService, packing short CVs into shared LLM calls
+
+    Near-duplicates of user_id's own analyses are reused (none without a
+    user_id). Returns the analyses in the order of texts and the stats of
+    the call (see packing_report).
+    """
+    stats = empty_packing_stats()
+    stats['cvs'] = len(texts)
+    analyses: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+
+    packable = []
+    for index, text in enumerate(texts):
+        reused = service._reuse_near_duplicate_analysis(text, user_id)
+        if reused:
+            analyses[index] = reused
+            stats['reused_cvs'] += 1
+        elif len(text) <= pack_max_cv_chars():
+            packable.append(index)
+
+    if service.openai_client and get_llm_router().available(PACKED_TASK):
+        for group in pack_groups(texts, packable):
+            if len(group) < 2:
+                continue
+            packed = _analyze_pack(service, texts, group, stats)
+            for index in group:
+                if index in packed:
+                    analyses[index] = packed[index]
+                    continue
+                stats['retried_cvs'] += 1
+                stats['prompt_tokens'] += count_tokens(service._analysis_messages(texts[index]))
+                started = time.monotonic()
+                analyses[index] = service.analyze_with_ai(texts[index])
+                stats['llm_seconds'] += time.monotonic() - started
+
+    for index, text in enumerate(texts):
+        if analyses[index] is None:
+            stats['individual_cvs'] += 1
+            analyses[index] = service.analyze_with_ai(text)
+    return analyses, stats
+
+
+def packing_report(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Calls, prompt tokens and LLM seconds saved on the packed CVs against analyzing them one by one"""
+    report = dict(stats)
+    report['llm_seconds'] = round(stats['llm_seconds'], 3)
+    report['llm_calls'] = stats['packs'] + stats['retried_cvs']
+    report['llm_calls_saved'] = stats['packed_cvs'] - report['llm_calls']
+    report['prompt_tokens_saved'] = stats['individual_prompt_tokens'] - stats['prompt_tokens']
+
+    # Individual calls are timed from the short-CV route's average in this process, when it has one
+    latency = metrics.snapshot()['timings'].get('llm.route.cv_analysis_short.latency') or {}
+    if latency.get('count'):
+        individual_seconds = stats['packed_cvs'] * latency['avg']
+        report['individual_llm_seconds'] = round(individual_seconds, 3)
+        report['llm_seconds_saved'] = round(individual_seconds - stats['llm_seconds'], 3)
+    else:
+        report['individual_llm_seconds'] = None
+        report['llm_seconds_saved'] = None
+    return report
+
+
+def record_packing_report(report: Dict[str, Any]) -> None:
+    """Log a batch's packing report and add its savings to the metrics"""
+    metrics.incr('packing.packs', report['packs'])
+    metrics.incr('packing.packed_cvs', report['packed_cvs'])
+    metrics.incr('packing.retried_cvs', report['retried_cvs'])
+    metrics.incr('packing.llm_calls_saved', report['llm_calls_saved'])
+    metrics.incr('packing.prompt_tokens_saved', report['prompt_tokens_saved'])
+    if report['llm_seconds_saved'] is not None:
+        metrics.incr('packing.llm_seconds_saved', report['llm_seconds_saved'])
+    print(f"Packed {report['packed_cvs']} of {report['cvs']} CVs into {report['packs']} calls "
+          f"({report['retried_cvs']} retried): {report['llm_calls_saved']} calls and "
+          f"{report['prompt_tokens_saved']} prompt tokens saved, "
+          f"LLM time {report['llm_seconds']}s vs {report['individual_llm_seconds']}s estimated one by one")
@@ -0,0 +1,144 @@
+"""
+End-to-end request deadlines.
+
+A view decorated with with_request_deadline (or code inside
+request_deadline(request)) sets the request's time budget
+(the X-Request-Budget header in seconds, else settings.REQUEST_DEADLINE_SECONDS)
+in a context variable. The pipeline stages below the view read it:
+
+* extraction stops reading PDF pages when the deadline has passed;
+* LLM analysis, job profile builds, AI course search and re-ranking only
+  run when at least their REQUEST_STAGE_MIN_SECONDS are left, and LLM calls
+  never wait, time out or back off past the deadline (see llm_gateway.py);
+* otherwise the stage uses its cheaper variant (local analysis, catalog or
+  static course list, unranked shortlist) and is recorded as degraded.
+
+Views report the degraded stages as `degraded` / `degraded_stages` in the
+response. Code running outside a request deadline (background enrichment,
+management commands) is never degraded.
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Optional
+from django.conf import settings
+
+from .metrics import metrics
+
+
+DEFAULT_STAGE_MIN_SECONDS = {
+    'extraction': 0.5,
+    'llm_analysis': 6.0,
+    'job_profile': 3.0,
+    'course_search': 4.0,
+    'course_rerank': 2.0,
+}
+
+_current = contextvars.ContextVar('request_deadline', default=None)
+
+
+class Deadline:
+    """Time budget of one request and the stages that were degraded to meet it"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degraded_stages = []
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def degrade(self, stage: str) -> None:
+        if stage not in self.degraded_stages:
+            self.degraded_stages.append(stage)
+            metrics.incr(f'deadline.degraded.{stage}')
+            print(f"Deadline: {stage} degraded with {self.remaining():.2f}s of {self.budget:.1f}s left")
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.degraded_stages)
+
+
+def request_budget(request) -> float:
+    """Seconds the request may take: the client's X-Request-Budget header, capped, else the default"""
+    default = getattr(settings, 'REQUEST_DEADLINE_SECONDS', 25.0)
+    maximum = getattr(settings, 'REQUEST_DEADLINE_MAX_SECONDS', 60.0)
+    header = request.headers.get('X-Request-Budget') if request is not None else None
+    try:
+        budget = float(header) if header else default
+    except ValueError:
+        budget = default
+    # Leave time to build and send the response
+    reserve = getattr(settings, 'REQUEST_DEADLINE_RESERVE_SECONDS', 0.5)
+    return max(0.0, min(budget, maximum) - reserve)
+
+
+@contextmanager
+def request_deadline(request):
+    """Run the enclosed pipeline under the request's deadline"""
+    deadline = Deadline(request_budget(request))
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+        if deadline.expired:
+            metrics.incr('deadline.exceeded')
+
+
+def with_request_deadline(view):
+    """Decorator running a (sync or async) view under its request's deadline"""
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with request_deadline(request):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with request_deadline(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def stage_min_seconds(stage: str) -> float:
+    configured = getattr(settings, 'REQUEST_STAGE_MIN_SECONDS', None) or {}
+    return configured.get(stage, DEFAULT_STAGE_MIN_SECONDS.get(stage, 0.0))
+
+
+def has_time_for(stage: str) -> bool:
+    """Whether the full variant of a stage fits in the remaining time; degrades the stage if not"""
+    deadline = _current.get()
+    if deadline is None or deadline.remaining() >= stage_min_seconds(stage):
+        return True
+    deadline.degrade(stage)
+    return False
+
+
+def degrade_if_expired(stage: str) -> None:
+    """Record a stage's fallback as degraded when it was caused by running out of time"""
+    deadline = _current.get()
+    if deadline is not None and deadline.remaining() < stage_min_seconds(stage):
+        deadline.degrade(stage)
+
+
+def degraded_stages() -> List[str]:
+    deadline = _current.get()
+    return list(deadline.degraded_stages) if deadline is not None else []
@@ -0,0 +1,101 @@
+"""
+Tiered CV analysis.
+
+The request path stores a fast local analysis (tier "fast") and returns
+immediately; a background worker then upgrades the CVUpload record with the
+LLM analysis (tier "full"). Clients poll the analysis status endpoint for
+the upgrade. When the LLM is unavailable the record stays "fast" and
+"pending" for enrich_pending_cvs to retry.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .llm_gateway import LLMUnavailableError
+from .metrics import metrics
+from .skills import link_cv_skills
+
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CV_ENRICHMENT_WORKERS', 2),
+            thread_name_prefix='cv-enrichment'
+        )
+    return _executor
+
+
+def save_analysis(cv_upload, analysis_result: Dict[str, Any], tier: str = 'full') -> None:
+    """Store an analysis result on a CVUpload record"""
+    if 'text' in analysis_result:
+        cv_upload.extracted_text = analysis_result.get('text', '')
+    cv_upload.skills = analysis_result.get('skills', [])
+    cv_upload.experience_years = analysis_result.get('experience_years')
+    cv_upload.education_level = analysis_result.get('education_level')
+    cv_upload.current_role = analysis_result.get('current_role')
+    cv_upload.industries = analysis_result.get('industries', [])
+    cv_upload.strengths = analysis_result.get('strengths', [])
+    cv_upload.areas_for_improvement = analysis_result.get('areas_for_improvement', [])
+    cv_upload.ai_analysis = {
+        key: value for key, value in analysis_result.items() if key not in ('text', 'section_hashes')
+    }
+    if 'section_hashes' in analysis_result:
+        cv_upload.section_hashes = analysis_result['section_hashes']
+    cv_upload.analysis_tier = tier
+    cv_upload.analysis_status = 'complete' if tier == 'full' else 'pending'
+    cv_upload.analyzed_at = timezone.now()
+    cv_upload.save()
+    try:
+        link_cv_skills(cv_upload)
+    except Exception as e:
+        # backfill_skills repairs links that could not be written here
+        print(f"Could not link skills of CV {cv_upload.id}: {e}")
+
+
+def enrich_cv_upload(cv_upload_id: int) -> None:
+    """Upgrade a fast-tier CVUpload with the full LLM analysis"""
+    from .models import CVUpload
+    from .services import CVAnalysisService
+
+    close_old_connections()
+    try:
+        updated = CVUpload.objects.filter(id=cv_upload_id, analysis_tier='fast').exclude(
+            analysis_status='enriching'
+        ).update(analysis_status='enriching')
+        if not updated:
+            return
+
+        cv_upload = CVUpload.objects.get(id=cv_upload_id)
+        started = timezone.now()
+        try:
+            # strict: the local fallback must not be stored as the full analysis
+            analysis = CVAnalysisService().analyze_with_ai(cv_upload.extracted_text or '', strict=True)
+        except LLMUnavailableError as e:
+            # Left pending, so enrich_pending_cvs retries it once the LLM is back
+            print(f"LLM unavailable, enrichment of CV {cv_upload_id} postponed: {e}")
+            CVUpload.objects.filter(id=cv_upload_id).update(analysis_status='pending')
+            metrics.incr('enrichment.postponed')
+            return
+        except Exception as e:
+            print(f"Error enriching CV {cv_upload_id}: {e}")
+            CVUpload.objects.filter(id=cv_upload_id).update(analysis_status='failed')
+            metrics.incr('enrichment.failed')
+            return
+
+        save_analysis(cv_upload, analysis, tier='full')
+        metrics.incr('enrichment.completed')
+        metrics.observe('enrichment.latency', (timezone.now() - started).total_seconds())
+    finally:
+        close_old_connections()
+
+
+def schedule_enrichment(cv_upload_id: int) -> None:
+    """Run enrich_cv_upload in the background worker pool once the current transaction commits"""
+    metrics.incr('enrichment.scheduled')
+    transaction.on_commit(lambda: _get_executor().submit(enrich_cv_upload, cv_upload_id))
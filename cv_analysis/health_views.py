@@ -0,0 +1,67 @@
+"""
+Liveness and readiness endpoints for container probes.
+
+/healthz only reports that the process serves requests. /readyz reports 503
+until the worker has prewarmed (see startup.py) and while the database is
+unreachable, so load balancers only route to warm, working workers; being
+unauthenticated, it reports only the outcome of each check. /metrics/ (staff
+only) reports the counters and timings of every worker of the host (see
+metrics_export.py) and this worker's startup, LLM circuit and per-route
+latency, cost and fallback figures.
+"""
+from django.db import connection
+from django.http import JsonResponse
+from django.conf import settings
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .llm_gateway import DEFAULT_DEPLOYMENT, get_llm_gateway
+from .llm_routing import route_report
+from .metrics_export import collect_worker_snapshots, merge_snapshots
+from .startup import is_ready, start_background_prewarm, startup_status
+
+
+@require_GET
+def liveness(request):
+    """The process is up and serving requests"""
+    return JsonResponse({'status': 'alive'})
+
+
+@require_GET
+def readiness(request):
+    """The worker is prewarmed and its dependencies are reachable"""
+    if not is_ready():
+        # Servers without the gunicorn hook warm up on the first probe
+        start_background_prewarm()
+
+    checks = {'prewarm': 'ok' if is_ready() else 'pending'}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        checks['database'] = 'ok'
+    except Exception as e:
+        print(f"Readiness database check failed: {e}")
+        checks['database'] = 'failed'
+
+    ready = all(result == 'ok' for result in checks.values())
+    return JsonResponse({'ready': ready, 'checks': checks}, status=200 if ready else 503)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_report(request):
+    """Counters and timings of each worker of this host, their totals, and this worker's LLM state"""
+    workers = collect_worker_snapshots()
+    return Response({
+        'workers': workers,
+        'totals': merge_snapshots(workers),
+        'startup': startup_status(),
+        # An open circuit does not make the worker unready: analyses fall back
+        'llm_circuits_open': {
+            name: get_llm_gateway(name).circuit_open
+            for name in set(getattr(settings, 'LLM_DEPLOYMENTS', {})) | {DEFAULT_DEPLOYMENT}
+        },
+        'llm_routes': route_report(),
+    })
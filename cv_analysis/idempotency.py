@@ -0,0 +1,298 @@
+"""
+Idempotency keys for expensive POST endpoints.
+
+A client retrying a POST sends the same Idempotency-Key header with every
+attempt. The first attempt claims the key (an IdempotencyKey row, unique per
+view and user, or per view and client address for anonymous requests)
+together with a fingerprint of the request (path, query string, form or
+JSON body and the hashes of uploaded files) and runs the view; its response
+is stored on the row. A later attempt with the same key
+
+* and a different fingerprint is rejected with 422;
+* while the first is still running waits for it (up to
+  IDEMPOTENCY_WAIT_SECONDS, then 409 with Retry-After);
+* after the first finished gets the stored response replayed, with an
+  Idempotent-Replayed: true header, without running the view again.
+
+Only 2xx responses, and responses the view marks with replayable() (the
+redirect after a successful form POST), are stored. For any other response
+(error redirects, 4xx, 5xx) the key is released so the next retry runs the
+view. A claim whose attempt died without finishing is taken over after
+IDEMPOTENCY_LOCK_SECONDS. Keys expire IDEMPOTENCY_KEY_TTL seconds after they
+were claimed (purge_idempotency_keys deletes them). Requests without the
+header are not affected.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .analysis_sessions import hash_uploaded_file
+from .metrics import metrics
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.25
+# Form fields that differ between otherwise identical submissions
+_IGNORED_FIELDS = {'csrfmiddlewaretoken'}
+
+
+def _key_ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def _lock_time() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 300))
+
+
+def request_fingerprint(request) -> str:
+    """sha256 over what makes two POSTs the same request"""
+    request = getattr(request, '_request', request)
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}?{request.META.get('QUERY_STRING', '')}\n".encode('utf-8'))
+    content_type = request.META.get('CONTENT_TYPE', '')
+    if content_type.startswith(('multipart/form-data', 'application/x-www-form-urlencoded')):
+        # Parsed form fields and file hashes, so the upload is not loaded into memory twice
+        fields = sorted((name, request.POST.getlist(name)) for name in request.POST if name not in _IGNORED_FIELDS)
+        files = sorted(
+            (name, [(file.name, hash_uploaded_file(file)) for file in request.FILES.getlist(name)])
+            for name in request.FILES
+        )
+        digest.update(json.dumps([fields, files]).encode('utf-8'))
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _scope(view_name: str, request) -> str:
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"{view_name}:user:{user.pk}"
+    return f"{view_name}:anon:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _claim(scope: str, key: str, fingerprint: str) -> Tuple[str, Optional[Any]]:
+    """Try to claim a key once: ('claimed' | 'mismatch' | 'completed' | 'in_progress' | 'retry', row)"""
+    from .models import IdempotencyKey
+
+    now = timezone.now()
+    fresh = {
+        'fingerprint': fingerprint,
+        'status': 'in_progress',
+        'response_status': None,
+        'response': None,
+        'locked_until': now + _lock_time(),
+        'expires_at': now + _key_ttl(),
+    }
+    try:
+        with transaction.atomic():
+            return 'claimed', IdempotencyKey.objects.create(scope=scope, key=key, **fresh)
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        return 'retry', None
+    if record.expires_at <= now:
+        # An expired key is a new key; the conditional update lets one request take it
+        if IdempotencyKey.objects.filter(pk=record.pk, expires_at=record.expires_at).update(**fresh):
+            return 'claimed', IdempotencyKey.objects.get(pk=record.pk)
+        return 'retry', None
+    if record.fingerprint != fingerprint:
+        return 'mismatch', record
+    if record.status == 'completed':
+        return 'completed', record
+    if record.locked_until <= now:
+        # The attempt holding the key died: take over
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, status='in_progress', locked_until=record.locked_until
+        ).update(locked_until=fresh['locked_until'])
+        if taken:
+            metrics.incr('idempotency.taken_over')
+            return 'claimed', record
+    return 'in_progress', record
+
+
+def _error(request, body: Dict[str, Any], status: int) -> HttpResponse:
+    if hasattr(request, '_request'):
+        return Response(body, status=status)
+    return JsonResponse(body, status=status)
+
+
+def _replay(record) -> HttpResponse:
+    stored = record.response or {}
+    if 'data' in stored:
+        response = Response(stored['data'], status=record.response_status)
+    else:
+        response = HttpResponse(
+            stored.get('content', ''), status=record.response_status, content_type=stored.get('content_type')
+        )
+        if stored.get('location'):
+            response['Location'] = stored['location']
+    response['Idempotent-Replayed'] = 'true'
+    metrics.incr('idempotency.replayed')
+    return response
+
+
+def begin_request(request, view_name: str, key: str) -> Tuple[Optional[Any], Optional[HttpResponse]]:
+    """Claim the request's key, waiting for an in-flight attempt
+
+    Returns (claimed row, None) when the view should run, else (None, the
+    response to send: a replay or an error).
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        return None, _error(request, {
+            'success': False,
+            'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'
+        }, 400)
+    scope = _scope(view_name, request)
+    fingerprint = request_fingerprint(request)
+    wait = getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 60)
+    deadline = time.monotonic() + wait
+    waited = False
+    while True:
+        outcome, record = _claim(scope, key, fingerprint)
+        if outcome == 'claimed':
+            metrics.incr('idempotency.claimed')
+            return record, None
+        if outcome == 'mismatch':
+            metrics.incr('idempotency.mismatch')
+            return None, _error(request, {
+                'success': False,
+                'error': f'This {HEADER} was already used for a different request'
+            }, 422)
+        if outcome == 'completed':
+            return None, _replay(record)
+        if outcome == 'in_progress':
+            if time.monotonic() >= deadline:
+                response = _error(request, {
+                    'success': False,
+                    'error': f'A request with this {HEADER} is still in progress'
+                }, 409)
+                response['Retry-After'] = str(max(1, int(wait)))
+                return None, response
+            if not waited:
+                waited = True
+                metrics.incr('idempotency.waited')
+            time.sleep(POLL_INTERVAL)
+
+
+def _begin_in_worker(request, view_name: str, key: str):
+    try:
+        return begin_request(request, view_name, key)
+    finally:
+        close_old_connections()
+
+
+def _stored_response(response) -> Optional[Dict[str, Any]]:
+    if getattr(response, 'streaming', False):
+        return None
+    if isinstance(response, Response):
+        # Stored as DRF would render it, so replays are identical
+        return {'data': json.loads(json.dumps(response.data, cls=JSONEncoder))}
+    return {
+        'content': response.content.decode('utf-8', errors='replace'),
+        'content_type': response.get('Content-Type'),
+        'location': response.get('Location'),
+    }
+
+
+def replayable(response: HttpResponse) -> HttpResponse:
+    """Mark a non-2xx response, such as the redirect after a successful POST, as the outcome to replay"""
+    response.idempotent_replayable = True
+    return response
+
+
+def _is_outcome(response) -> bool:
+    return 200 <= response.status_code < 300 or getattr(response, 'idempotent_replayable', False)
+
+
+def finish_request(record, response) -> None:
+    """Store the response on the claimed key, or release the key if it should not be replayed"""
+    from .models import IdempotencyKey
+
+    stored = _stored_response(response) if _is_outcome(response) else None
+    if stored is None:
+        release_key(record)
+        return
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status='completed', response_status=response.status_code, response=stored, locked_until=timezone.now()
+    )
+
+
+def release_key(record) -> None:
+    """Forget a claimed key so the next retry runs the view"""
+    from .models import IdempotencyKey
+
+    IdempotencyKey.objects.filter(pk=record.pk, status='in_progress').delete()
+
+
+def _request_key(request) -> Optional[str]:
+    if request.method != 'POST':
+        return None
+    key = (request.headers.get(HEADER) or '').strip()
+    return key or None
+
+
+def idempotent(view):
+    """Decorator making a (sync or async) POST view honour the Idempotency-Key header
+
+    On DRF views it goes below @api_view / @permission_classes, so the
+    request is authenticated before its key is looked up.
+    """
+    view_name = view.__name__
+
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = _request_key(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+            # Waiting for an in-flight attempt must not hold the shared sync thread
+            record, response = await sync_to_async(_begin_in_worker, thread_sensitive=False)(request, view_name, key)
+            if response is not None:
+                return response
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(release_key)(record)
+                raise
+            await sync_to_async(finish_request)(record, response)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _request_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+        record, response = begin_request(request, view_name, key)
+        if response is not None:
+            return response
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            release_key(record)
+            raise
+        finish_request(record, response)
+        return response
+    return wrapper
+
+
+def purge_expired_keys() -> int:
+    """Delete expired idempotency keys; returns the number deleted"""
+    from .models import IdempotencyKey
+
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
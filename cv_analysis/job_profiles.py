@@ -0,0 +1,256 @@
+"""
+Per-target-job course recommendation profiles.
+
+Recommending courses is split into two stages:
+
+* a shared job-profile stage: the required skills and canonical courses for
+  a normalized job title. It is computed once per title and kept in the
+  Django cache (pre-warmed for popular titles by prewarm_job_profiles);
+* a cheap per-CV personalization stage that re-orders the profile's
+  courses by the candidate's missing skills and improvement areas.
+
+Job titles are normalized (case, seniority words, abbreviations) and fuzzily
+matched to known titles so "Sr. Data-Scientist" and "data scientist" share
+one profile.
+"""
+import difflib
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .deadlines import has_time_for
+from .metrics import metrics
+from .skills import canonical_skill_name, skill_names
+
+
+logger = logging.getLogger(__name__)
+
+# Canonical job titles (most requested first) and the skills they require
+JOB_PROFILE_SKILLS = {
+    'software engineer': ['python', 'java', 'algorithms', 'data structures', 'git', 'testing', 'system design'],
+    'data scientist': ['python', 'statistics', 'machine learning', 'sql', 'pandas', 'data visualization'],
+    'frontend developer': ['javascript', 'typescript', 'react', 'html', 'css', 'testing'],
+    'backend developer': ['python', 'node.js', 'sql', 'apis', 'docker', 'system design'],
+    'full stack developer': ['javascript', 'react', 'node.js', 'sql', 'apis', 'docker'],
+    'data analyst': ['sql', 'excel', 'statistics', 'data visualization', 'python'],
+    'machine learning engineer': ['python', 'machine learning', 'deep learning', 'mlops', 'docker', 'sql'],
+    'devops engineer': ['docker', 'kubernetes', 'ci/cd', 'aws', 'linux', 'terraform'],
+    'cloud engineer': ['aws', 'azure', 'terraform', 'kubernetes', 'networking', 'linux'],
+    'product manager': ['product strategy', 'roadmapping', 'user research', 'analytics', 'agile', 'communication'],
+    'project manager': ['project planning', 'agile', 'scrum', 'risk management', 'stakeholder management'],
+    'ux designer': ['user research', 'wireframing', 'prototyping', 'figma', 'usability testing'],
+    'data engineer': ['python', 'sql', 'spark', 'data pipelines', 'airflow', 'cloud'],
+    'mobile developer': ['swift', 'kotlin', 'react native', 'mobile ui', 'apis'],
+    'qa engineer': ['testing', 'test automation', 'selenium', 'ci/cd', 'python'],
+    'security engineer': ['security', 'networking', 'linux', 'penetration testing', 'cloud security'],
+    'business analyst': ['requirements analysis', 'sql', 'excel', 'process modeling', 'communication'],
+    'site reliability engineer': ['linux', 'kubernetes', 'monitoring', 'python', 'incident response'],
+    'ai engineer': ['python', 'machine learning', 'llms', 'deep learning', 'apis'],
+    'engineering manager': ['leadership', 'system design', 'agile', 'hiring', 'communication'],
+}
+KNOWN_JOB_TITLES = list(JOB_PROFILE_SKILLS)
+
+_TITLE_ALIASES = {
+    'dev': 'developer',
+    'devs': 'developer',
+    'eng': 'engineer',
+    'engr': 'engineer',
+    'swe': 'software engineer',
+    'sde': 'software engineer',
+    'ml': 'machine learning',
+    'ai/ml': 'machine learning',
+    'front end': 'frontend',
+    'front-end': 'frontend',
+    'back end': 'backend',
+    'back-end': 'backend',
+    'fullstack': 'full stack',
+    'full-stack': 'full stack',
+    'sre': 'site reliability engineer',
+    'pm': 'product manager',
+    'qa': 'qa engineer',
+    'ui/ux': 'ux',
+    'programmer': 'developer',
+}
+_SENIORITY_WORDS = {
+    'senior', 'sr', 'junior', 'jr', 'lead', 'principal', 'staff', 'intern', 'trainee', 'entry', 'level',
+    'associate', 'head', 'chief', 'i', 'ii', 'iii', 'iv', 'mid',
+}
+FUZZY_MATCH_CUTOFF = 0.85
+
+PROFILE_COURSE_LIMIT = 20
+
+
+def normalize_job_title(title: str) -> str:
+    """Return the canonical form of a job title, matched to a known title where possible"""
+    text = (title or '').lower()
+    for alias in sorted((a for a in _TITLE_ALIASES if not a.isalnum()), key=len, reverse=True):
+        text = text.replace(alias, f' {_TITLE_ALIASES[alias]} ')
+    words = []
+    for word in re.findall(r'[a-z0-9+#.]+', text):
+        word = word.strip('.')
+        if not word or word in _SENIORITY_WORDS:
+            continue
+        words.extend(_TITLE_ALIASES.get(word, word).split())
+    normalized = ' '.join(dict.fromkeys(words))
+    if not normalized:
+        return ''
+
+    if normalized in JOB_PROFILE_SKILLS:
+        return normalized
+    match = difflib.get_close_matches(normalized, KNOWN_JOB_TITLES, n=1, cutoff=FUZZY_MATCH_CUTOFF)
+    if match:
+        return match[0]
+    # Word order differences ("engineer data") still map to a known title
+    sorted_words = ' '.join(sorted(normalized.split()))
+    for known in KNOWN_JOB_TITLES:
+        if ' '.join(sorted(known.split())) == sorted_words:
+            return known
+    return normalized
+
+
+def _cache_key(normalized_title: str) -> str:
+    generation = cache.get('job_profile:generation', 0)
+    digest = hashlib.sha256(normalized_title.encode('utf-8')).hexdigest()[:32]
+    return f'job_profile:{generation}:{digest}'
+
+
+def invalidate_job_profiles() -> None:
+    """Drop all cached job profiles (e.g. after the course catalog changed)"""
+    try:
+        cache.incr('job_profile:generation')
+    except ValueError:
+        cache.set('job_profile:generation', 1, None)
+
+
+def build_job_profile(normalized_title: str) -> Dict[str, Any]:
+    """Compute the required skills and canonical courses for a normalized job title"""
+    from .course_catalog import recommend_catalog_courses
+    from .services import AIAnalysisService
+    from .skills import courses_for_skills, skill_ids
+    from .views import generate_course_recommendations
+
+    required_skills = JOB_PROFILE_SKILLS.get(normalized_title)
+    ai_service = None
+    if required_skills is None:
+        ai_service = AIAnalysisService()
+        required_skills = ai_service.job_required_skills(normalized_title)
+    if not required_skills:
+        required_skills = [word for word in normalized_title.split() if len(word) > 3]
+
+    job_analysis = {'skills': [], 'areas_for_improvement': [{'title': skill} for skill in required_skills]}
+    # Courses tagged with the required skills first, topped up by catalog similarity search
+    courses = [
+        course.as_recommendation()
+        for course in courses_for_skills(skill_ids(required_skills), limit=PROFILE_COURSE_LIMIT)
+    ]
+    if len(courses) < PROFILE_COURSE_LIMIT:
+        seen = {course['id'] for course in courses}
+        courses.extend(
+            course for course in recommend_catalog_courses(job_analysis, normalized_title, limit=PROFILE_COURSE_LIMIT)
+            if course['id'] not in seen
+        )
+        courses = courses[:PROFILE_COURSE_LIMIT]
+    if not courses:
+        ai_service = ai_service or AIAnalysisService()
+        courses = ai_service.search_and_recommend_courses(job_analysis, normalized_title, task='job_profile_courses')
+    if not courses:
+        courses = generate_course_recommendations(job_analysis, normalized_title)
+
+    return {
+        'title': normalized_title,
+        'required_skills': required_skills,
+        'courses': courses,
+        'built_at': timezone.now().isoformat(),
+    }
+
+
+def get_job_profile(target_job: str) -> Optional[Dict[str, Any]]:
+    """Return the cached job profile for a target job, building it on a miss"""
+    normalized = normalize_job_title(target_job)
+    if not normalized:
+        return None
+    record_target_job(normalized)
+
+    key = _cache_key(normalized)
+    profile = cache.get(key)
+    if profile is not None:
+        metrics.incr('job_profile.cache_hit')
+        return profile
+
+    metrics.incr('job_profile.cache_miss')
+    if not has_time_for('job_profile'):
+        # Building may call the LLM; recommend from the catalog instead
+        return None
+    profile = build_job_profile(normalized)
+    cache.set(key, profile, getattr(settings, 'JOB_PROFILE_CACHE_TTL', 7 * 24 * 60 * 60))
+    return profile
+
+
+def prewarm_job_profile(normalized_title: str) -> Dict[str, Any]:
+    """Rebuild and cache the profile of a normalized job title"""
+    profile = build_job_profile(normalized_title)
+    cache.set(_cache_key(normalized_title), profile, getattr(settings, 'JOB_PROFILE_CACHE_TTL', 7 * 24 * 60 * 60))
+    return profile
+
+
+def record_target_job(normalized_title: str) -> None:
+    """Count requests per normalized title; prewarm_job_profiles warms the most requested ones"""
+    from .models import TargetJobStat
+
+    try:
+        updated = TargetJobStat.objects.filter(title=normalized_title[:200]).update(
+            request_count=F('request_count') + 1, last_requested_at=timezone.now()
+        )
+        if not updated:
+            TargetJobStat.objects.get_or_create(title=normalized_title[:200])
+    except DatabaseError as e:
+        # Only the prewarm ranking is affected; the recommendation itself goes on
+        logger.warning("Could not record target job %r: %s", normalized_title, e)
+
+
+def top_job_titles(limit: int) -> List[str]:
+    """The most requested normalized titles, topped up with the built-in known titles"""
+    from .models import TargetJobStat
+
+    titles = list(TargetJobStat.objects.order_by('-request_count').values_list('title', flat=True)[:limit])
+    for known in KNOWN_JOB_TITLES:
+        if len(titles) >= limit:
+            break
+        if known not in titles:
+            titles.append(known)
+    return titles
+
+
+def personalize_courses(profile: Dict[str, Any], cv_analysis: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+    """Order a job profile's courses for one CV
+
+    Courses teaching required skills the candidate lacks come first, then
+    courses matching their improvement areas; courses covering only skills
+    they already have drop to the end.
+    """
+    known = {canonical_skill_name(skill) for skill in skill_names(cv_analysis.get('skills', []))}
+    missing = {canonical_skill_name(skill) for skill in profile.get('required_skills', [])} - known
+    area_words = set()
+    for area in cv_analysis.get('areas_for_improvement', []):
+        text = f"{area.get('title', '')} {area.get('description', '')}" if isinstance(area, dict) else str(area)
+        area_words.update(word for word in re.findall(r'[a-z0-9+#.]+', text.lower()) if len(word) > 3)
+
+    scored = []
+    for rank, course in enumerate(profile.get('courses', [])):
+        course_skills = {canonical_skill_name(skill) for skill in skill_names(course.get('skills', []))}
+        course_text = f"{course.get('title', '')} {course.get('description', '')}".lower()
+        score = 3 * len(course_skills & missing)
+        score += sum(1 for word in area_words if word in course_text or any(word in skill for skill in course_skills))
+        if course_skills and course_skills <= known:
+            score -= 2
+        # Ties keep the profile's (job relevance) order
+        scored.append((-score, rank, course))
+    scored.sort(key=lambda item: item[:2])
+    metrics.incr('job_profile.personalized')
+    return [course for _, _, course in scored[:limit]]
@@ -0,0 +1,480 @@
+"""
+Gateway for all Azure OpenAI chat completion calls.
+
+Every call goes through LLMGateway.chat(), which enforces a request timeout,
+an adaptive (AIMD) per-process concurrency limit, a cross-worker slot limit,
+retries with jittered exponential backoff and a circuit breaker. When the
+circuit is open, calls fail immediately with CircuitOpenError so callers can
+switch to their local fallback instead of waiting for a timeout.
+
+There is one gateway per named deployment (settings.LLM_DEPLOYMENTS), so a
+slow or failing deployment only uses up its own limits; llm_routing.py picks
+the deployment for each task.
+
+Under a request deadline (deadlines.py) queue waits, call timeouts and
+retry backoffs are capped by the time left, and a call cut short by the
+deadline raises DeadlineExceededError without counting against the
+deployment's limits or circuit breaker.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Any, Optional
+from django.conf import settings
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .deadlines import remaining_time
+from .metrics import metrics
+
+
+DEFAULT_GATEWAY_CONFIG = {
+    'TIMEOUT': 30.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8.0,
+    'INITIAL_CONCURRENCY': 4,
+    'MIN_CONCURRENCY': 1,
+    'MAX_CONCURRENCY': 16,
+    'LATENCY_TARGET': 15.0,
+    'QUEUE_TIMEOUT': 5.0,
+    'WORKER_SLOTS': 8,
+    'SLOT_DIR': None,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30.0,
+}
+
+DEFAULT_DEPLOYMENT = 'full'
+
+
+# How often async callers re-check for a free concurrency slot
+ASYNC_POLL_INTERVAL = 0.01
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM cannot be called right now and the caller should fall back"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised when the circuit breaker is open"""
+
+
+class ConcurrencyLimitError(LLMUnavailableError):
+    """Raised when no concurrency slot became free within the queue timeout"""
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    """Raised when the request deadline leaves no time for the call"""
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limiter.
+
+    The limit grows additively (by 1/limit per successful call under the latency
+    target) and shrinks multiplicatively when a call is throttled, times out or
+    exceeds the latency target.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int,
+                 latency_target: float, decrease_factor: float = 0.7):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a slot under the current limit"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free, without waiting"""
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """Async variant of acquire that polls instead of blocking the event loop"""
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(ASYNC_POLL_INTERVAL)
+        return True
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Release a slot and adapt the limit from the observed outcome
+
+        latency=None releases a slot that made no call (rejected before
+        sending, or out of deadline) without adapting the limit.
+        """
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if overloaded or (latency is not None and latency > self.latency_target):
+                # Decrease at most once per latency window so a burst of slow
+                # responses from the same episode does not collapse the limit.
+                if now - self._last_decrease >= min(self.latency_target, 5.0):
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            metrics.observe('llm.concurrency_limit', self.limit)
+            self._condition.notify_all()
+
+
+class CrossWorkerSemaphore:
+    """
+    Counting semaphore shared by all worker processes on the same host.
+
+    Each slot is a lock file; holding an exclusive flock on it holds the slot.
+    Locks are released by the kernel if a worker dies, so slots cannot leak.
+    """
+
+    def __init__(self, slots: int, directory: Optional[str] = None):
+        self.slots = max(1, slots)
+        self.directory = directory or os.path.join(
+            getattr(settings, 'MEDIA_ROOT', '/tmp'), '.llm_slots'
+        )
+
+    def try_acquire(self):
+        """Return an open slot file handle if a slot is free, without waiting"""
+        if fcntl is None:
+            return _NullSlot()
+        os.makedirs(self.directory, exist_ok=True)
+        for index in random.sample(range(self.slots), self.slots):
+            handle = open(os.path.join(self.directory, f'slot-{index}.lock'), 'a')
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+
+    def acquire(self, timeout: float):
+        """Return an open slot file handle, or None if no slot became free"""
+        deadline = time.monotonic() + timeout
+        while True:
+            handle = self.try_acquire()
+            if handle is not None or time.monotonic() >= deadline:
+                return handle
+            time.sleep(0.05)
+
+    async def acquire_async(self, timeout: float):
+        """Async variant of acquire that polls instead of blocking the event loop"""
+        deadline = time.monotonic() + timeout
+        while True:
+            handle = self.try_acquire()
+            if handle is not None or time.monotonic() >= deadline:
+                return handle
+            await asyncio.sleep(0.05)
+
+    @staticmethod
+    def release(handle) -> None:
+        if handle is not None:
+            handle.close()
+
+
+class _NullSlot:
+    """Slot handle used when file locking is not available"""
+
+    def close(self):
+        pass
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def cancel_probe(self) -> None:
+        """Give back a half-open probe that was allowed but never sent"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.incr('llm.circuit_opened')
+                    print(f"LLM circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+def _is_throttle(error: Exception) -> bool:
+    return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def _is_retryable(error: Exception) -> bool:
+    if _is_throttle(error):
+        return True
+    if type(error).__name__ in ('APITimeoutError', 'APIConnectionError', 'InternalServerError'):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return status_code is not None and status_code >= 500
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """Rate-, concurrency- and failure-aware wrapper around chat.completions.create"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, name: str = DEFAULT_DEPLOYMENT):
+        self.config = {**DEFAULT_GATEWAY_CONFIG, **(config or {})}
+        self.name = name
+        self.model = self.config.get('DEPLOYMENT') or settings.AZURE_OPENAI_DEPLOYMENT
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=self.config['INITIAL_CONCURRENCY'],
+            minimum=self.config['MIN_CONCURRENCY'],
+            maximum=self.config['MAX_CONCURRENCY'],
+            latency_target=self.config['LATENCY_TARGET'],
+        )
+        self.worker_slots = CrossWorkerSemaphore(self.config['WORKER_SLOTS'], self.config['SLOT_DIR'])
+        self.breaker = CircuitBreaker(self.config['FAILURE_THRESHOLD'], self.config['RESET_TIMEOUT'])
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.breaker.is_open
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.config['BACKOFF_MAX'])
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        return random.uniform(0, min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * (2 ** attempt)))
+
+    def _within_deadline(self, key: str):
+        """Return (config[key] capped by the request deadline, whether it was capped)"""
+        remaining = remaining_time()
+        if remaining is None or remaining >= self.config[key]:
+            return self.config[key], False
+        if remaining <= 0:
+            metrics.incr('llm.deadline_exceeded')
+            raise DeadlineExceededError("No time left before the request deadline")
+        return remaining, True
+
+    def _admit(self) -> None:
+        if not self.breaker.allow_request():
+            metrics.incr('llm.short_circuited')
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+    def _reject(self, reason: str, slot_taken: bool = False) -> None:
+        if slot_taken:
+            self.limiter.release()
+        self.breaker.cancel_probe()
+        if reason == 'local':
+            metrics.incr('llm.rejected_local_limit')
+            raise ConcurrencyLimitError("Too many concurrent LLM calls in this worker")
+        metrics.incr('llm.rejected_worker_limit')
+        raise ConcurrencyLimitError("Too many concurrent LLM calls across workers")
+
+    def _on_failure(self, error: Exception, attempt: int, attempts: int, latency: float, slot,
+                    deadline_capped: bool = False) -> float:
+        """Record a failed call; re-raise it if it should not be retried, else return the backoff delay"""
+        timed_out = type(error).__name__ == 'APITimeoutError'
+        if deadline_capped and timed_out:
+            # Cut short by the request deadline, not a sign of an unhealthy deployment
+            self.limiter.release(latency)
+            self.worker_slots.release(slot)
+            self.breaker.cancel_probe()
+            metrics.incr('llm.deadline_exceeded')
+            raise DeadlineExceededError("LLM call timed out at the request deadline") from error
+        self.limiter.release(latency, overloaded=_is_throttle(error) or timed_out)
+        self.worker_slots.release(slot)
+        self.breaker.record_failure()
+        metrics.incr('llm.errors')
+        if _is_throttle(error):
+            metrics.incr('llm.throttled')
+        if not _is_retryable(error) or attempt == attempts - 1:
+            raise error
+        delay = self._backoff(attempt, error)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            raise error
+        metrics.incr('llm.retries')
+        print(f"LLM call failed ({type(error).__name__}), retrying in {delay:.2f}s")
+        return delay
+
+    def _on_success(self, latency: float, slot) -> None:
+        self.limiter.release(latency)
+        self.worker_slots.release(slot)
+        self.breaker.record_success()
+        metrics.incr('llm.calls')
+        metrics.observe('llm.latency', latency)
+        metrics.observe(f'llm.deployment.{self.name}.latency', latency)
+
+    def chat(self, client, messages: List[Dict[str, str]], model: Optional[str] = None, **kwargs):
+        """Call client.chat.completions.create with limits, retries and the circuit breaker"""
+        model = model or self.model
+        attempts = self.config['MAX_RETRIES'] + 1
+
+        for attempt in range(attempts):
+            queue_timeout, _ = self._within_deadline('QUEUE_TIMEOUT')
+            self._admit()
+            if not self.limiter.acquire(queue_timeout):
+                self._reject('local')
+            slot = self.worker_slots.acquire(queue_timeout)
+            if slot is None:
+                self._reject('worker', slot_taken=True)
+            try:
+                timeout, capped = self._within_deadline('TIMEOUT')
+            except DeadlineExceededError:
+                self.limiter.release()
+                self.worker_slots.release(slot)
+                self.breaker.cancel_probe()
+                raise
+
+            started = time.monotonic()
+            try:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout,
+                    **kwargs
+                )
+            except Exception as e:
+                time.sleep(self._on_failure(e, attempt, attempts, time.monotonic() - started, slot, capped))
+                continue
+
+            self._on_success(time.monotonic() - started, slot)
+            return response
+
+    async def achat(self, client, messages: List[Dict[str, str]], model: Optional[str] = None, **kwargs):
+        """Async variant of chat() for openai.AsyncAzureOpenAI clients"""
+        model = model or self.model
+        attempts = self.config['MAX_RETRIES'] + 1
+
+        for attempt in range(attempts):
+            queue_timeout, _ = self._within_deadline('QUEUE_TIMEOUT')
+            self._admit()
+            if not await self.limiter.acquire_async(queue_timeout):
+                self._reject('local')
+            slot = await self.worker_slots.acquire_async(queue_timeout)
+            if slot is None:
+                self._reject('worker', slot_taken=True)
+            try:
+                timeout, capped = self._within_deadline('TIMEOUT')
+            except DeadlineExceededError:
+                self.limiter.release()
+                self.worker_slots.release(slot)
+                self.breaker.cancel_probe()
+                raise
+
+            started = time.monotonic()
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout,
+                    **kwargs
+                )
+            except asyncio.CancelledError:
+                self.limiter.release(time.monotonic() - started)
+                self.worker_slots.release(slot)
+                self.breaker.cancel_probe()
+                raise
+            except Exception as e:
+                await asyncio.sleep(self._on_failure(e, attempt, attempts, time.monotonic() - started, slot, capped))
+                continue
+
+            self._on_success(time.monotonic() - started, slot)
+            return response
+
+
+_gateways = {}
+_gateway_lock = threading.Lock()
+
+
+def deployment_config(name: str) -> Dict[str, Any]:
+    """Gateway config of a named deployment: LLM_GATEWAY overridden by its LLM_DEPLOYMENTS entry"""
+    base = getattr(settings, 'LLM_GATEWAY', None) or {}
+    overrides = getattr(settings, 'LLM_DEPLOYMENTS', {}).get(name) or {}
+    config = {**base, **overrides}
+    if not overrides.get('SLOT_DIR'):
+        # Each deployment has its own cross-worker slots
+        root = base.get('SLOT_DIR') or os.path.join(getattr(settings, 'MEDIA_ROOT', '/tmp'), '.llm_slots')
+        config['SLOT_DIR'] = os.path.join(root, name)
+    return config
+
+
+def get_llm_gateway(deployment: Optional[str] = None) -> LLMGateway:
+    """Return the process-wide gateway of a named deployment (the full deployment by default)"""
+    name = deployment or DEFAULT_DEPLOYMENT
+    gateway = _gateways.get(name)
+    if gateway is None:
+        with _gateway_lock:
+            gateway = _gateways.get(name)
+            if gateway is None:
+                gateway = _gateways[name] = LLMGateway(deployment_config(name), name=name)
+    return gateway
+
+
+def reset_llm_gateways() -> None:
+    """Drop the gateways so the next call rebuilds them from the current settings"""
+    with _gateway_lock:
+        _gateways.clear()
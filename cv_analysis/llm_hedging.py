@@ -0,0 +1,228 @@
+"""
+Hedged LLM requests.
+
+A hedged call sends the request, and if it has not returned after the
+route's hedge delay, sends a second identical request (to the same
+deployment or to settings.LLM_HEDGING['DEPLOYMENT']) and returns whichever
+succeeds first. The loser is cancelled (async) or abandoned and its result
+dropped (sync, where a running HTTP call cannot be interrupted).
+
+The delay adapts per route: it is the PERCENTILE of the route's recent
+successful call latencies, clamped to [MIN_DELAY, MAX_DELAY], so only the
+slowest few percent of calls are hedged. A token bucket caps the hedge rate
+at BUDGET hedges per call (with up to BURST saved up), so a deployment that
+is slow for everyone does not get twice the load.
+
+Sync calls, the primary and the hedge, run on a shared thread pool of
+MAX_THREADS threads, by default the sum of the deployments' MAX_CONCURRENCY:
+the gateways admit no more calls than that per process, so the pool never
+caps them below the gateway limits.
+
+llm.route.<task>.hedges_fired / hedges_won / hedges_skipped count the
+hedges (see llm_routing.route_report).
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional
+from django.conf import settings
+
+from .llm_gateway import DEFAULT_DEPLOYMENT, DEFAULT_GATEWAY_CONFIG, deployment_config
+from .metrics import metrics
+
+
+DEFAULT_HEDGING_CONFIG = {
+    'ENABLED': False,
+    'TASKS': ['cv_analysis', 'cv_analysis_short', 'course_search', 'job_profile_courses', 'career_plan'],
+    'DEPLOYMENT': None,
+    'PERCENTILE': 95.0,
+    'MIN_DELAY': 1.0,
+    'MAX_DELAY': 20.0,
+    'WINDOW': 200,
+    'MIN_SAMPLES': 20,
+    'BUDGET': 0.05,
+    'BURST': 5.0,
+    'MAX_THREADS': None,
+}
+
+
+def hedging_config() -> Dict[str, Any]:
+    return {**DEFAULT_HEDGING_CONFIG, **(getattr(settings, 'LLM_HEDGING', None) or {})}
+
+
+def hedging_enabled(task: str) -> bool:
+    config = hedging_config()
+    return bool(config['ENABLED']) and task in config['TASKS']
+
+
+class HedgePolicy:
+    """Adaptive hedge delay and hedge budget of one route"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.latencies = deque(maxlen=int(config['WINDOW']))
+        self.tokens = 1.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait for the first request before hedging"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.config['MIN_SAMPLES']:
+            return self.config['MAX_DELAY']
+        index = min(len(samples) - 1, int(len(samples) * self.config['PERCENTILE'] / 100))
+        return min(max(samples[index], self.config['MIN_DELAY']), self.config['MAX_DELAY'])
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+
+    def on_call(self) -> None:
+        """Every call earns BUDGET of a hedge"""
+        with self._lock:
+            self.tokens = min(self.config['BURST'], self.tokens + self.config['BUDGET'])
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget if there is one"""
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+_executor = None
+
+
+def get_hedge_policy(task: str) -> HedgePolicy:
+    policy = _policies.get(task)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.setdefault(task, HedgePolicy(hedging_config()))
+    return policy
+
+
+def reset_hedge_policies() -> None:
+    with _policies_lock:
+        _policies.clear()
+
+
+def executor_threads() -> int:
+    """MAX_THREADS, or the most sync LLM calls the deployments' gateways admit at once in this process"""
+    configured = hedging_config()['MAX_THREADS']
+    if configured:
+        return int(configured)
+    names = set(getattr(settings, 'LLM_DEPLOYMENTS', {})) | {DEFAULT_DEPLOYMENT}
+    return sum(
+        int(deployment_config(name).get('MAX_CONCURRENCY', DEFAULT_GATEWAY_CONFIG['MAX_CONCURRENCY']))
+        for name in names
+    )
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _policies_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=executor_threads(), thread_name_prefix='llm-hedge')
+    return _executor
+
+
+def _timed(policy: HedgePolicy, call: Callable[[], Any]) -> Any:
+    started = time.monotonic()
+    response = call()
+    policy.observe(time.monotonic() - started)
+    return response
+
+
+async def _atimed(policy: HedgePolicy, call: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.monotonic()
+    response = await call()
+    policy.observe(time.monotonic() - started)
+    return response
+
+
+def _abandon(future, is_hedge: bool, on_abandoned: Optional[Callable[[bool, Any], None]]) -> None:
+    """Drop the losing request; its result (if it still arrives) goes to on_abandoned(is_hedge, response)"""
+    if future.cancel() or on_abandoned is None:
+        return
+
+    def collect(done):
+        if not done.cancelled() and done.exception() is None:
+            on_abandoned(is_hedge, done.result())
+
+    future.add_done_callback(collect)
+
+
+def hedged_call(task: str, primary: Callable[[], Any], hedge: Callable[[], Any],
+                on_abandoned: Optional[Callable[[bool, Any], None]] = None) -> Any:
+    """Run primary, hedging it with hedge after the route's delay; return the first success
+
+    The loser's late response goes to on_abandoned(is_hedge, response), with
+    is_hedge telling which of the two requests lost. If both requests fail,
+    the primary's error is raised.
+    """
+    policy = get_hedge_policy(task)
+    policy.on_call()
+    executor = _get_executor()
+    # The request's context (its deadline) goes with the call into the pool thread
+    first = executor.submit(contextvars.copy_context().run, _timed, policy, primary)
+    try:
+        return first.result(timeout=policy.delay())
+    except FutureTimeoutError:
+        pass
+    if not policy.try_spend():
+        metrics.incr(f'llm.route.{task}.hedges_skipped')
+        return first.result()
+
+    metrics.incr(f'llm.route.{task}.hedges_fired')
+    second = executor.submit(contextvars.copy_context().run, _timed, policy, hedge)
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    _abandon(loser, loser is second, on_abandoned)
+                if future is second:
+                    metrics.incr(f'llm.route.{task}.hedges_won')
+                return future.result()
+    return first.result()
+
+
+async def ahedged_call(task: str, primary: Callable[[], Awaitable[Any]], hedge: Callable[[], Awaitable[Any]]) -> Any:
+    """Async variant of hedged_call; the losing request is cancelled"""
+    policy = get_hedge_policy(task)
+    policy.on_call()
+    first = asyncio.ensure_future(_atimed(policy, primary))
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=policy.delay())
+        if done:
+            return first.result()
+        if not policy.try_spend():
+            metrics.incr(f'llm.route.{task}.hedges_skipped')
+            return await first
+
+        metrics.incr(f'llm.route.{task}.hedges_fired')
+        second = asyncio.ensure_future(_atimed(policy, hedge))
+        tasks.append(second)
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                if finished.exception() is None:
+                    if finished is second:
+                        metrics.incr(f'llm.route.{task}.hedges_won')
+                    return finished.result()
+        return first.result()
+    finally:
+        for pending_task in tasks:
+            if not pending_task.done():
+                pending_task.cancel()
@@ -0,0 +1,211 @@
+"""
+Routing of LLM tasks to named deployments.
+
+Every LLM call names its task (the same names record_prompt_usage uses).
+The route of a task is its deployment in settings.LLM_ROUTES, else
+DEFAULT_ROUTES: short CVs, per-chunk fact extraction, job skill lists and
+course lists for cached job profiles go to the small, fast deployment; full
+CV analysis, long-CV synthesis, packed batch analysis (several CVs in one
+long answer, see cv_packing.py) and career plans go to the large one. Each
+deployment has its own gateway (timeout, concurrency limits, circuit
+breaker, see llm_gateway.py); when the routed deployment is unavailable the
+call moves to its FALLBACK deployment before the caller's local fallback.
+
+Calls on the tasks in settings.LLM_HEDGING['TASKS'] are hedged when hedging
+is enabled (see llm_hedging.py). Latency, token cost, fallback and hedge
+counts are recorded per route as llm.route.<task>.* metrics and summarized
+by route_report().
+"""
+import time
+from typing import Any, Dict, List
+from django.conf import settings
+
+from .llm_gateway import DEFAULT_DEPLOYMENT, LLMUnavailableError, _is_retryable, get_llm_gateway
+from .llm_hedging import ahedged_call, hedged_call, hedging_config, hedging_enabled
+from .metrics import metrics
+
+
+DEFAULT_ROUTES = {
+    'cv_analysis': 'full',
+    'cv_analysis_short': 'fast',
+    'cv_analysis_packed': 'full',
+    'cv_chunk': 'fast',
+    'cv_synthesis': 'full',
+    'job_profile': 'fast',
+    'job_profile_courses': 'fast',
+    'course_search': 'full',
+    'course_rerank': 'fast',
+    'career_plan': 'full',
+}
+
+
+def short_cv_chars() -> int:
+    return getattr(settings, 'LLM_SHORT_CV_CHARS', 6000)
+
+
+def analysis_task(text: str) -> str:
+    """Route name for analyzing a CV of this text"""
+    return 'cv_analysis_short' if len(text or '') <= short_cv_chars() else 'cv_analysis'
+
+
+def route_deployment(task: str) -> str:
+    """Deployment a task is routed to"""
+    return getattr(settings, 'LLM_ROUTES', {}).get(task) or DEFAULT_ROUTES.get(task, DEFAULT_DEPLOYMENT)
+
+
+def route_chain(task: str) -> List[str]:
+    """The routed deployment followed by its fallback deployment, if any"""
+    primary = route_deployment(task)
+    chain = [primary]
+    fallback = (getattr(settings, 'LLM_DEPLOYMENTS', {}).get(primary) or {}).get('FALLBACK')
+    if fallback and fallback != primary:
+        chain.append(fallback)
+    return chain
+
+
+def _should_reroute(error: Exception) -> bool:
+    # A missing deployment (404) is as unusable as an overloaded one
+    return (isinstance(error, LLMUnavailableError) or _is_retryable(error)
+            or getattr(error, 'status_code', None) == 404)
+
+
+def call_cost(deployment: str, response) -> float:
+    """USD cost of a response from its token usage and the deployment's prices"""
+    config = getattr(settings, 'LLM_DEPLOYMENTS', {}).get(deployment) or {}
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+    return (prompt_tokens * config.get('PROMPT_COST_PER_1K', 0.0)
+            + completion_tokens * config.get('COMPLETION_COST_PER_1K', 0.0)) / 1000
+
+
+class LLMRouter:
+    """Sends each task to its deployment's gateway, falling back along the route chain"""
+
+    def available(self, task: str) -> bool:
+        """False when the circuit of every deployment on the route is open"""
+        return any(not get_llm_gateway(name).circuit_open for name in route_chain(task))
+
+    def _candidates(self, task: str) -> List[str]:
+        chain = route_chain(task)
+        open_circuits = [name for name in chain if get_llm_gateway(name).circuit_open]
+        return [name for name in chain if name not in open_circuits] or chain[:1]
+
+    def _record(self, task: str, deployment: str, primary: str, latency: float, response) -> None:
+        cost = call_cost(deployment, response)
+        metrics.incr(f'llm.route.{task}.calls')
+        metrics.observe(f'llm.route.{task}.latency', latency)
+        metrics.observe(f'llm.route.{task}.cost', cost)
+        metrics.incr(f'llm.deployment.{deployment}.cost', cost)
+        if deployment != primary:
+            metrics.incr(f'llm.route.{task}.fallbacks')
+
+    def _record_abandoned(self, task: str, deployment: str, response) -> None:
+        """Cost of a hedged request whose response arrived after the winner's"""
+        cost = call_cost(deployment, response)
+        metrics.incr(f'llm.route.{task}.hedge_cost', cost)
+        metrics.incr(f'llm.deployment.{deployment}.cost', cost)
+
+    def _hedge_gateway(self, gateway):
+        name = hedging_config()['DEPLOYMENT']
+        return get_llm_gateway(name) if name else gateway
+
+    def _call(self, task: str, gateway, client, messages: List[Dict[str, str]], kwargs: Dict[str, Any]):
+        if not hedging_enabled(task):
+            return gateway.chat(client, messages=messages, **kwargs)
+        hedge_gateway = self._hedge_gateway(gateway)
+        return hedged_call(
+            task,
+            lambda: gateway.chat(client, messages=messages, **kwargs),
+            lambda: hedge_gateway.chat(client, messages=messages, **kwargs),
+            on_abandoned=lambda is_hedge, response: self._record_abandoned(
+                task, (hedge_gateway if is_hedge else gateway).name, response
+            ),
+        )
+
+    async def _acall(self, task: str, gateway, client, messages: List[Dict[str, str]], kwargs: Dict[str, Any]):
+        if not hedging_enabled(task):
+            return await gateway.achat(client, messages=messages, **kwargs)
+        hedge_gateway = self._hedge_gateway(gateway)
+        return await ahedged_call(
+            task,
+            lambda: gateway.achat(client, messages=messages, **kwargs),
+            lambda: hedge_gateway.achat(client, messages=messages, **kwargs),
+        )
+
+    def _fail(self, task: str, error: Exception) -> None:
+        metrics.incr(f'llm.route.{task}.calls')
+        metrics.incr(f'llm.route.{task}.failures')
+        raise error
+
+    def chat(self, client, task: str, messages: List[Dict[str, str]], **kwargs):
+        """Call the deployment routed for task, moving to its fallback when it is unavailable"""
+        primary = route_deployment(task)
+        candidates = self._candidates(task)
+        started = time.monotonic()
+        for position, name in enumerate(candidates):
+            gateway = get_llm_gateway(name)
+            try:
+                response = self._call(task, gateway, client, messages, kwargs)
+            except Exception as e:
+                if position == len(candidates) - 1 or not _should_reroute(e):
+                    self._fail(task, e)
+                print(f"LLM deployment {name} unavailable for {task} ({type(e).__name__}), "
+                      f"trying {candidates[position + 1]}")
+                continue
+            self._record(task, name, primary, time.monotonic() - started, response)
+            return response
+
+    async def achat(self, client, task: str, messages: List[Dict[str, str]], **kwargs):
+        """Async variant of chat()"""
+        primary = route_deployment(task)
+        candidates = self._candidates(task)
+        started = time.monotonic()
+        for position, name in enumerate(candidates):
+            gateway = get_llm_gateway(name)
+            try:
+                response = await self._acall(task, gateway, client, messages, kwargs)
+            except Exception as e:
+                if position == len(candidates) - 1 or not _should_reroute(e):
+                    self._fail(task, e)
+                print(f"LLM deployment {name} unavailable for {task} ({type(e).__name__}), "
+                      f"trying {candidates[position + 1]}")
+                continue
+            self._record(task, name, primary, time.monotonic() - started, response)
+            return response
+
+
+_router = LLMRouter()
+
+
+def get_llm_router() -> LLMRouter:
+    """Return the process-wide LLM router"""
+    return _router
+
+
+def route_report() -> Dict[str, Dict[str, Any]]:
+    """Per-route deployment, call count, latency, cost and fallback/failure rates in this process"""
+    snapshot = metrics.snapshot()
+    counters, timings = snapshot['counters'], snapshot['timings']
+    tasks = sorted(set(DEFAULT_ROUTES) | set(getattr(settings, 'LLM_ROUTES', {})))
+    report = {}
+    for task in tasks:
+        calls = counters.get(f'llm.route.{task}.calls', 0)
+        latency = timings.get(f'llm.route.{task}.latency') or {}
+        cost = timings.get(f'llm.route.{task}.cost') or {}
+        hedges = counters.get(f'llm.route.{task}.hedges_fired', 0)
+        report[task] = {
+            'deployment': route_deployment(task),
+            'calls': calls,
+            'avg_latency': round(latency.get('avg', 0.0), 3),
+            'max_latency': round(latency.get('max', 0.0), 3),
+            'cost': round(cost.get('sum', 0.0), 6),
+            'avg_cost': round(cost.get('avg', 0.0), 6),
+            'fallback_rate': round(counters.get(f'llm.route.{task}.fallbacks', 0) / calls, 3) if calls else 0.0,
+            'failure_rate': round(counters.get(f'llm.route.{task}.failures', 0) / calls, 3) if calls else 0.0,
+            'hedges_fired': hedges,
+            'hedges_won': counters.get(f'llm.route.{task}.hedges_won', 0),
+            'hedge_rate': round(hedges / calls, 3) if calls else 0.0,
+            'hedge_cost': round(counters.get(f'llm.route.{task}.hedge_cost', 0.0), 6),
+        }
+    return report
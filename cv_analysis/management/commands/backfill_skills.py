@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from career_planning.models import SkillGap
+from cv_analysis.models import CVUpload, Course
+from cv_analysis.skills import link_course_skills, link_cv_skills, normalize_skill_name, resolve_skills
+
+
+class Command(BaseCommand):
+    help = 'Populate the canonical skill table and skill links of existing CVs, catalog courses and skill gaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        cv_count = 0
+        for cv_upload in CVUpload.objects.filter(analysis_blob__isnull=False).select_related('analysis_blob').iterator(
+            chunk_size=batch_size
+        ):
+            link_cv_skills(cv_upload)
+            cv_count += 1
+
+        course_ids = list(Course.objects.values_list('id', flat=True))
+        for start in range(0, len(course_ids), batch_size):
+            link_course_skills(Course.objects.filter(id__in=course_ids[start:start + batch_size]).only('id', 'skills'))
+
+        gap_count = 0
+        last_id = 0
+        while True:
+            batch = list(SkillGap.objects.filter(skill__isnull=True, id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            resolved = resolve_skills(gap.skill_name for gap in batch)
+            for gap in batch:
+                gap.skill = resolved.get(normalize_skill_name(gap.skill_name))
+            SkillGap.objects.bulk_update(batch, ['skill'])
+            gap_count += sum(1 for gap in batch if gap.skill_id)
+            last_id = batch[-1].id
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Linked skills of {cv_count} CVs, {len(course_ids)} courses and {gap_count} skill gaps'
+            )
+        )
@@ -0,0 +1,105 @@
+import glob
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from cv_analysis.word_text import extract_docx_text
+
+
+WORDS = ('python django kubernetes docker aws terraform react typescript sql spark airflow leadership '
+         'mentoring delivered migrated designed improved reduced latency pipeline platform team').split()
+
+
+def python_docx_text(file_path: str, max_chars: int) -> str:
+    """The previous extraction: python-docx body paragraphs only"""
+    import docx
+
+    doc = docx.Document(file_path)
+    parts = []
+    length = 0
+    for paragraph in doc.paragraphs:
+        parts.append(paragraph.text + "\n")
+        length += len(parts[-1])
+        if length >= max_chars:
+            break
+    return "".join(parts)[:max_chars]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming DOCX extractor against python-docx on a corpus of CVs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory of .docx files (default: generate a synthetic corpus)')
+        parser.add_argument('--files', type=int, default=20, help='Synthetic CVs to generate')
+        parser.add_argument('--paragraphs', type=int, default=3000, help='Paragraphs per synthetic CV')
+        parser.add_argument('--max-chars', type=int, default=10 ** 9, help='Extraction character limit')
+
+    def handle(self, *args, **options):
+        try:
+            import docx  # noqa: F401
+        except ImportError:
+            raise CommandError('python-docx is required to run the comparison')
+
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            if options['dir']:
+                paths = sorted(glob.glob(os.path.join(options['dir'], '*.docx')))
+            else:
+                paths = self._generate(corpus_dir, options['files'], options['paragraphs'])
+            if not paths:
+                raise CommandError('No .docx files found')
+
+            size = sum(os.path.getsize(path) for path in paths)
+            self.stdout.write(f"{len(paths)} files, {size / (1024 * 1024):.1f} MB")
+            results = {}
+            for name, extract in (('python-docx', python_docx_text), ('streaming', extract_docx_text)):
+                results[name] = self._run(extract, paths, options['max_chars'])
+                result = results[name]
+                self.stdout.write(
+                    f"{name:12} {result['elapsed']:.2f}s ({result['elapsed'] / len(paths) * 1000:.1f} ms/file), "
+                    f"peak Python heap {result['peak'] / (1024 * 1024):.1f} MB, {result['chars']} chars"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Streaming extraction: {results['python-docx']['elapsed'] / results['streaming']['elapsed']:.1f}x "
+            f"faster, {results['streaming']['chars'] / max(results['python-docx']['chars'], 1):.2f}x the text "
+            f"(tables, text boxes, headers and footers). lxml's C allocations used by python-docx are not "
+            f"counted in its peak heap."
+        ))
+
+    def _run(self, extract, paths, max_chars):
+        chars = 0
+        peak = 0
+        started = time.perf_counter()
+        for path in paths:
+            tracemalloc.start()
+            chars += len(extract(path, max_chars))
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return {'elapsed': time.perf_counter() - started, 'peak': peak, 'chars': chars}
+
+    def _generate(self, corpus_dir, files, paragraphs):
+        import docx
+
+        rng = random.Random(42)
+        paths = []
+        for index in range(files):
+            document = docx.Document()
+            section = document.sections[0]
+            section.header.paragraphs[0].text = f"Candidate {index} | candidate{index}@example.com | +1 555 0100"
+            section.footer.paragraphs[0].text = f"Page footer of CV {index}"
+            for number in range(paragraphs):
+                if number % 50 == 0:
+                    document.add_heading(f"Role {number // 50}", level=2)
+                document.add_paragraph(' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))))
+                if number % 200 == 0:
+                    # Skills tables are common in CV templates
+                    table = document.add_table(rows=4, cols=3)
+                    for row in table.rows:
+                        for cell in row.cells:
+                            cell.text = ', '.join(rng.sample(WORDS, 3))
+            path = os.path.join(corpus_dir, f'cv-{index}.docx')
+            document.save(path)
+            paths.append(path)
+        return paths
@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from cv_analysis.enrichment import enrich_cv_upload
+from cv_analysis.models import CVUpload
+
+
+class Command(BaseCommand):
+    help = 'Run LLM enrichment for fast-tier CV analyses that were never upgraded (e.g. after a worker restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=15,
+            help='Treat records stuck in "enriching" for longer than this as abandoned'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also retry records whose enrichment failed'
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+
+        pending = CVUpload.objects.filter(analysis_tier='fast').filter(
+            Q(analysis_status__in=statuses, analyzed_at__lt=stale_before) |
+            Q(analysis_status='enriching', analyzed_at__lt=stale_before)
+        )
+        ids = list(pending.values_list('id', flat=True))
+        # Reset so enrich_cv_upload can claim them
+        CVUpload.objects.filter(id__in=ids).update(analysis_status='pending')
+
+        for cv_upload_id in ids:
+            enrich_cv_upload(cv_upload_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Enriched {len(ids)} CV analyses')
+        )
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from cv_analysis.course_catalog import DEFAULT_COURSES, np, course_embedding
+from cv_analysis.job_profiles import invalidate_job_profiles
+from cv_analysis.models import Course
+from cv_analysis.skills import link_course_skills
+
+
+COURSE_FIELDS = ['title', 'provider', 'url', 'skills', 'level', 'duration', 'rating', 'price', 'is_free',
+                 'description', 'is_active', 'embedding', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = 'Bulk load (insert or update) the course catalog and precompute course embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='JSON list or CSV of courses in the recommendation format (id, title, provider, url, skills, '
+                 'level, duration, rating, price, isFree, description); CSV skills are separated by ";". '
+                 'Defaults to the built-in catalog'
+        )
+        parser.add_argument(
+            '--deactivate-missing',
+            action='store_true',
+            help='Deactivate catalog courses that are not in the loaded file'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('NumPy is required to compute course embeddings')
+
+        rows = self._read(options['file']) if options['file'] else DEFAULT_COURSES
+        courses = {}
+        for row in rows:
+            course = self._course(row)
+            if course.external_id and course.title:
+                courses[course.external_id] = course
+        if not courses:
+            raise CommandError('No valid courses found')
+
+        with transaction.atomic():
+            Course.objects.bulk_create(
+                list(courses.values()),
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['external_id'],
+                update_fields=COURSE_FIELDS,
+            )
+            link_course_skills(Course.objects.filter(external_id__in=list(courses)).only('id', 'skills'))
+            deactivated = 0
+            if options['deactivate_missing']:
+                deactivated = Course.objects.filter(is_active=True).exclude(
+                    external_id__in=list(courses)
+                ).update(is_active=False)
+        # Cached job profiles list courses from the previous catalog
+        invalidate_job_profiles()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Loaded {len(courses)} courses, deactivated {deactivated}')
+        )
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        with open(path, 'r', encoding='utf-8') as source:
+            if path.lower().endswith('.csv'):
+                rows = []
+                for row in csv.DictReader(source):
+                    row['skills'] = [skill.strip() for skill in (row.get('skills') or '').split(';') if skill.strip()]
+                    rows.append(row)
+                return rows
+            return json.load(source)
+
+    def _course(self, row):
+        is_free = row.get('isFree', row.get('is_free', False))
+        if isinstance(is_free, str):
+            is_free = is_free.strip().lower() in ('1', 'true', 'yes')
+        try:
+            rating = float(row['rating']) if row.get('rating') not in (None, '') else None
+        except ValueError:
+            rating = None
+        course = Course(
+            external_id=str(row.get('id', '')).strip(),
+            title=str(row.get('title', '')).strip(),
+            provider=row.get('provider', ''),
+            url=row.get('url', ''),
+            skills=list(row.get('skills') or []),
+            level=row.get('level', ''),
+            duration=row.get('duration', ''),
+            rating=rating,
+            price=row.get('price', ''),
+            is_free=bool(is_free),
+            description=row.get('description', ''),
+            is_active=True,
+        )
+        # bulk_create bypasses Course.save(), so the embedding is computed here
+        course.embedding = course_embedding(course.as_recommendation())
+        return course
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from cv_analysis import llm_gateway, services
+from cv_analysis.models import AnalysisSession
+
+
+FAKE_ANALYSIS = {
+    'skills': ['Python', 'Django'],
+    'experience_years': 5,
+    'education_level': 'Bachelor',
+    'current_role': 'Software Engineer',
+    'industries': ['Technology'],
+    'strengths': [],
+    'areas_for_improvement': [],
+    'summary': 'Load test analysis',
+}
+
+
+class _InFlight:
+    """Counts concurrent fake LLM calls"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def exit(self):
+        with self._lock:
+            self.current -= 1
+
+
+def _fake_response():
+    message = SimpleNamespace(content=json.dumps(FAKE_ANALYSIS))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class _FakeSyncClient:
+    def __init__(self, latency, in_flight):
+        def create(**kwargs):
+            in_flight.enter()
+            try:
+                time.sleep(latency)
+            finally:
+                in_flight.exit()
+            return _fake_response()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class _FakeAsyncClient:
+    def __init__(self, latency, in_flight):
+        async def create(**kwargs):
+            in_flight.enter()
+            try:
+                await asyncio.sleep(latency)
+            finally:
+                in_flight.exit()
+            return _fake_response()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare how many concurrent LLM-bound public analyses the WSGI (thread per request) '
+        'and ASGI (async view) paths can hold, using a fake LLM with fixed latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Concurrent requests per path')
+        parser.add_argument('--latency', type=float, default=2.0, help='Simulated LLM latency in seconds')
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='WSGI worker threads (gunicorn --threads) available to the sync path'
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        latency = options['latency']
+        in_flight = _InFlight()
+        # The gateway limits are raised so that only the request path limits concurrency
+        gateway_config = {
+            'INITIAL_CONCURRENCY': total,
+            'MAX_CONCURRENCY': total,
+            'WORKER_SLOTS': total,
+            'QUEUE_TIMEOUT': latency * total,
+            'TIMEOUT': latency * 10,
+        }
+
+        with tempfile.TemporaryDirectory() as slot_dir, override_settings(
+            LLM_GATEWAY={**gateway_config, 'SLOT_DIR': slot_dir},
+            LLM_DEPLOYMENTS={},
+            AZURE_OPENAI_API_KEY='loadtest',
+            AZURE_OPENAI_ENDPOINT='https://loadtest.invalid',
+            CV_NEAR_DUPLICATE_REUSE=False,
+        ), mock.patch.object(
+            services.CVAnalysisService, '_setup_openai_client',
+            lambda service: _FakeSyncClient(latency, in_flight)
+        ), mock.patch.object(
+            services, 'get_async_openai_client',
+            lambda: _FakeAsyncClient(latency, in_flight)
+        ):
+            try:
+                llm_gateway.reset_llm_gateways()
+                wsgi = self._run_wsgi(total, options['threads'], in_flight)
+                in_flight.peak = 0
+                llm_gateway.reset_llm_gateways()
+                asgi = asyncio.run(self._run_asgi(total, in_flight))
+            finally:
+                llm_gateway.reset_llm_gateways()
+                AnalysisSession.objects.filter(original_filename__startswith='loadtest-').delete()
+
+        self.stdout.write(f"{total} requests, simulated LLM latency {latency:.1f}s")
+        for name, result in (('WSGI', wsgi), ('ASGI', asgi)):
+            self.stdout.write(
+                f"{name}: {result['ok']}/{total} ok in {result['elapsed']:.1f}s "
+                f"({result['ok'] / result['elapsed']:.1f} req/s), "
+                f"peak concurrent LLM calls {result['peak']}, "
+                f"p50 {result['p50']:.1f}s, p95 {result['p95']:.1f}s"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"ASGI held {asgi['peak'] / max(wsgi['peak'], 1):.1f}x the concurrent LLM calls of WSGI "
+            f"with {options['threads']} threads"
+        ))
+
+    def _upload(self, path: str, index: int):
+        # Distinct content per request so sessions and single-flight do not coalesce them
+        content = f"Load test CV {path} {index}\nSKILLS\nPython, Django\n".encode('utf-8')
+        return SimpleUploadedFile(f'loadtest-{path}-{index}.txt', content, content_type='text/plain')
+
+    def _summarize(self, latencies, statuses, elapsed, peak):
+        latencies = sorted(latencies)
+        return {
+            'ok': sum(1 for code in statuses if code == 200),
+            'elapsed': elapsed,
+            'peak': peak,
+            'p50': latencies[len(latencies) // 2] if latencies else 0.0,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        }
+
+    def _run_wsgi(self, total, threads, in_flight):
+        local = threading.local()
+
+        def request(index):
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_HOST='localhost')
+            started = time.monotonic()
+            response = local.client.post(
+                '/api/cv/public/analyze/?include=analysis', {'file': self._upload('wsgi', index)}
+            )
+            return time.monotonic() - started, response.status_code
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(request, range(total)))
+        elapsed = time.monotonic() - started
+        return self._summarize([r[0] for r in results], [r[1] for r in results], elapsed, in_flight.peak)
+
+    async def _run_asgi(self, total, in_flight):
+        client = AsyncClient(HTTP_HOST='localhost')
+
+        async def request(index):
+            started = time.monotonic()
+            response = await client.post(
+                '/api/cv/public/analyze/async/?include=analysis', {'file': self._upload('asgi', index)}
+            )
+            return time.monotonic() - started, response.status_code
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(request(index) for index in range(total)))
+        elapsed = time.monotonic() - started
+        return self._summarize([r[0] for r in results], [r[1] for r in results], elapsed, in_flight.peak)
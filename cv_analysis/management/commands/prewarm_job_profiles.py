@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from cv_analysis.job_profiles import prewarm_job_profile, top_job_titles
+
+
+class Command(BaseCommand):
+    help = 'Build and cache the course recommendation profiles of the most requested target jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=50,
+            help='Number of job titles to pre-warm (most requested first, then built-in titles)'
+        )
+
+    def handle(self, *args, **options):
+        titles = top_job_titles(options['top'])
+        for title in titles:
+            profile = prewarm_job_profile(title)
+            self.stdout.write(f"{title}: {len(profile['required_skills'])} skills, {len(profile['courses'])} courses")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Pre-warmed {len(titles)} job profiles')
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from cv_analysis.analysis_sessions import purge_expired_sessions
+from cv_analysis.singleflight import get_single_flight
+
+
+class Command(BaseCommand):
+    help = 'Delete expired public CV analysis sessions and stale single-flight lock files'
+
+    def handle(self, *args, **options):
+        deleted_count = purge_expired_sessions()
+        removed_files = get_single_flight().cleanup()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Deleted {deleted_count} expired analysis sessions and {removed_files} stale lock files'
+            )
+        )
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+from cv_analysis.models import CVUpload, CVBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete CV text and analysis blobs no longer referenced by any CV and report storage savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report, do not delete')
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=60,
+            help='Keep unreferenced blobs created this recently: their CV may not be saved yet'
+        )
+
+    def handle(self, *args, **options):
+        referenced = CVUpload.objects.filter(Q(text_blob=OuterRef('pk')) | Q(analysis_blob=OuterRef('pk')))
+        orphans = CVBlob.objects.filter(
+            ~Exists(referenced),
+            created_at__lt=timezone.now() - timedelta(minutes=options['grace_minutes'])
+        )
+        orphan_count = orphans.count()
+        if orphan_count and not options['dry_run']:
+            orphans.delete()
+
+        totals = CVBlob.objects.aggregate(
+            blobs=Count('digest'),
+            raw=Sum('size'),
+            stored=Sum(Length('data')),
+            zstd=Count('digest', filter=Q(codec='zstd')),
+        )
+        raw = totals['raw'] or 0
+        stored = totals['stored'] or 0
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f"{action} {orphan_count} unreferenced blobs")
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['blobs']} blobs ({totals['zstd']} zstd): {raw / 1024:.1f} KB raw, "
+            f"{stored / 1024:.1f} KB stored ({stored / raw if raw else 0:.0%} of raw)"
+        ))
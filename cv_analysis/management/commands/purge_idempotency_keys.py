@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from cv_analysis.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys and their stored responses'
+
+    def handle(self, *args, **options):
+        deleted_count = purge_expired_keys()
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted_count} expired idempotency keys'))
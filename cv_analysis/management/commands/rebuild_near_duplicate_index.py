@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from cv_analysis.models import CVUpload
+from cv_analysis.near_duplicates import index_cv_upload
+
+
+class Command(BaseCommand):
+    help = 'Build or refresh the MinHash/LSH near-duplicate index for all stored CVs'
+
+    def handle(self, *args, **options):
+        indexed_count = 0
+        for cv_upload in CVUpload.objects.select_related('text_blob').iterator():
+            if index_cv_upload(cv_upload):
+                indexed_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed_count} CVs')
+        )
@@ -0,0 +1,43 @@
+import threading
+from typing import Dict, Any
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process counters and timing summaries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record an observation (e.g. a latency in seconds)"""
+        with self._lock:
+            summary = self._timings.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of all counters and timing summaries"""
+        with self._lock:
+            timings = {}
+            for name, summary in self._timings.items():
+                timings[name] = {
+                    **summary,
+                    'avg': summary['sum'] / summary['count'] if summary['count'] else 0.0,
+                }
+            return {'counters': dict(self._counters), 'timings': timings}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,124 @@
+"""
+Per-worker metrics export.
+
+The registry in metrics.py lives in one process, so under gunicorn each
+worker only counts its own limiter, breaker, coalescing, cold-start, hedge
+and idempotency events. Every worker therefore writes its snapshot to
+METRICS_EXPORT_DIR/<host>-<pid>.json every METRICS_EXPORT_INTERVAL seconds
+from a background thread started by prewarm (startup.py). GET /metrics/
+(staff users, any DRF authentication) reads the snapshots of all workers of
+the host, uses a live snapshot for the worker serving the request, and adds
+their totals. Snapshots not refreshed for three intervals belong to workers
+that exited; they are skipped and removed.
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+from django.conf import settings
+
+from .metrics import metrics
+
+
+_export_lock = threading.Lock()
+_exporter_pid = None
+
+
+def export_dir() -> str:
+    default = os.path.join(tempfile.gettempdir(), 'careercoach-metrics')
+    return getattr(settings, 'METRICS_EXPORT_DIR', None) or default
+
+
+def export_interval() -> float:
+    return max(1.0, getattr(settings, 'METRICS_EXPORT_INTERVAL', 15.0))
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def worker_snapshot() -> Dict[str, Any]:
+    """This process's counters and timings, labelled with the worker"""
+    return {'worker': worker_id(), 'pid': os.getpid(), 'exported_at': time.time(), **metrics.snapshot()}
+
+
+def export_snapshot() -> None:
+    """Write this worker's snapshot, replacing the previous one atomically"""
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{worker_id()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as handle:
+        json.dump(worker_snapshot(), handle)
+    os.replace(tmp_path, path)
+
+
+def _export_loop() -> None:
+    while True:
+        time.sleep(export_interval())
+        try:
+            export_snapshot()
+        except Exception as e:
+            print(f"Metrics export failed: {e}")
+
+
+def start_metrics_export() -> None:
+    """Start the export thread of this process (once per worker, also after a fork)"""
+    global _exporter_pid
+    with _export_lock:
+        if _exporter_pid == os.getpid():
+            return
+        _exporter_pid = os.getpid()
+    try:
+        export_snapshot()
+    except Exception as e:
+        print(f"Metrics export failed: {e}")
+    threading.Thread(target=_export_loop, name='metrics-export', daemon=True).start()
+
+
+def collect_worker_snapshots() -> List[Dict[str, Any]]:
+    """The latest snapshot of every live worker of this host, this one read live"""
+    directory = export_dir()
+    own = worker_snapshot()
+    snapshots = [own]
+    stale_before = time.time() - 3 * export_interval()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith('.json') or name == f"{own['worker']}.json":
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as handle:
+                snapshot = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get('exported_at', 0) < stale_before:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            continue
+        snapshots.append(snapshot)
+    return sorted(snapshots, key=lambda snapshot: snapshot['worker'])
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counters and timing summaries summed over workers"""
+    counters, timings = {}, {}
+    for snapshot in snapshots:
+        for name, value in snapshot.get('counters', {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for name, summary in snapshot.get('timings', {}).items():
+            total = timings.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            total['count'] += summary['count']
+            total['sum'] += summary['sum']
+            total['max'] = max(total['max'], summary['max'])
+    for total in timings.values():
+        total['avg'] = total['sum'] / total['count'] if total['count'] else 0.0
+    return {'counters': counters, 'timings': timings}
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+
+def mark_existing_analyses_complete(apps, schema_editor):
+    CVUpload = apps.get_model('cv_analysis', 'CVUpload')
+    CVUpload.objects.exclude(extracted_text__isnull=True).exclude(extracted_text='').update(
+        analysis_tier='full',
+        analysis_status='complete',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvupload',
+            name='analysis_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('enriching', 'Enriching'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cvupload',
+            name='analysis_tier',
+            field=models.CharField(blank=True, choices=[('fast', 'Fast (local)'), ('full', 'Full (AI)')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='cvupload',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_analyses_complete, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0002_cvupload_analysis_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvupload',
+            name='section_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0003_cvupload_section_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvupload',
+            name='minhash_signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CVLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.CharField(max_length=16)),
+                ('cv_upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='cv_analysis.cvupload')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='cv_analysis_band_74952b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:55
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0004_near_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('original_filename', models.CharField(blank=True, max_length=255)),
+                ('analysis', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0005_analysissession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=100, unique=True)),
+                ('title', models.CharField(max_length=255)),
+                ('provider', models.CharField(blank=True, max_length=100)),
+                ('url', models.URLField(blank=True, max_length=500)),
+                ('skills', models.JSONField(blank=True, default=list)),
+                ('level', models.CharField(blank=True, max_length=50)),
+                ('duration', models.CharField(blank=True, max_length=50)),
+                ('rating', models.FloatField(blank=True, null=True)),
+                ('price', models.CharField(blank=True, max_length=50)),
+                ('is_free', models.BooleanField(default=False)),
+                ('description', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('embedding', models.BinaryField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['title'],
+            },
+        ),
+    ]
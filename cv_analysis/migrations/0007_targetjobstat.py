@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0006_course'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TargetJobStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, unique=True)),
+                ('request_count', models.PositiveIntegerField(default=1)),
+                ('last_requested_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-request_count'],
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+ANALYSIS_KEYS = ('skills', 'industries', 'ai_analysis', 'strengths', 'areas_for_improvement')
+
+
+def _store(CVBlob, raw):
+    digest = hashlib.sha256(raw).hexdigest()
+    if not CVBlob.objects.filter(digest=digest).exists():
+        CVBlob.objects.create(digest=digest, codec='zlib', size=len(raw), data=zlib.compress(raw, 6))
+    return digest
+
+
+def move_payloads_to_blobs(apps, schema_editor):
+    CVUpload = apps.get_model('cv_analysis', 'CVUpload')
+    CVBlob = apps.get_model('cv_analysis', 'CVBlob')
+    for cv_upload in CVUpload.objects.iterator():
+        text_blob_id = None
+        if cv_upload.extracted_text is not None:
+            text_blob_id = _store(CVBlob, cv_upload.extracted_text.encode('utf-8'))
+        payload = {key: getattr(cv_upload, key) for key in ANALYSIS_KEYS}
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        CVUpload.objects.filter(pk=cv_upload.pk).update(
+            text_blob_id=text_blob_id, analysis_blob_id=_store(CVBlob, raw)
+        )
+
+
+def restore_payloads_from_blobs(apps, schema_editor):
+    CVUpload = apps.get_model('cv_analysis', 'CVUpload')
+    for cv_upload in CVUpload.objects.select_related('text_blob', 'analysis_blob').iterator():
+        updates = {}
+        for blob_field in ('text_blob', 'analysis_blob'):
+            blob = getattr(cv_upload, blob_field)
+            if blob is None:
+                continue
+            if blob.codec != 'zlib':
+                raise RuntimeError(f'Cannot restore {blob.codec}-compressed blob {blob.digest} in a migration')
+            raw = zlib.decompress(bytes(blob.data))
+            if blob_field == 'text_blob':
+                updates['extracted_text'] = raw.decode('utf-8')
+            else:
+                payload = json.loads(raw)
+                updates.update({key: payload[key] for key in ANALYSIS_KEYS if key in payload})
+        if updates:
+            CVUpload.objects.filter(pk=cv_upload.pk).update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0007_targetjobstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(default='zlib', max_length=10)),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size in bytes')),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cvupload',
+            name='analysis_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='cv_analysis.cvblob'),
+        ),
+        migrations.AddField(
+            model_name='cvupload',
+            name='text_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='cv_analysis.cvblob'),
+        ),
+        migrations.RunPython(move_payloads_to_blobs, restore_payloads_from_blobs),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='ai_analysis',
+        ),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='areas_for_improvement',
+        ),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='extracted_text',
+        ),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='industries',
+        ),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='skills',
+        ),
+        migrations.RemoveField(
+            model_name='cvupload',
+            name='strengths',
+        ),
+    ]
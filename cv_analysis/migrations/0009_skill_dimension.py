@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_analysis', '0008_cv_blob_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Normalized canonical name', max_length=100, unique=True)),
+                ('display_name', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CVSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cv_upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='cv_analysis.cvupload')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cv_links', to='cv_analysis.skill')),
+            ],
+            options={
+                'unique_together': {('cv_upload', 'skill')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='cv_analysis.course')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_links', to='cv_analysis.skill')),
+            ],
+            options={
+                'unique_together': {('course', 'skill')},
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='skill_set',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='cv_analysis.CourseSkill', to='cv_analysis.skill'),
+        ),
+        migrations.AddField(
+            model_name='cvupload',
+            name='skill_set',
+            field=models.ManyToManyField(blank=True, related_name='cv_uploads', through='cv_analysis.CVSkill', to='cv_analysis.skill'),
+        ),
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='cv_analysis.skill')),
+            ],
+            options={
+                'verbose_name_plural': 'skill aliases',
+                'ordering': ['alias'],
+            },
+        ),
+    ]
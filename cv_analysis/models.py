@@ -1,6 +1,10 @@
+import json
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 
+from .blob_store import digest, encode_json, load_blob, store_blob
+
 
 class CVUpload(models.Model):
     """Model to store uploaded CV files and their analysis"""
@@ -10,23 +14,301 @@ class CVUpload(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     # Analysis results
-    extracted_text = models.TextField(blank=True, null=True)
-    skills = models.JSONField(default=list, blank=True)
     experience_years = models.IntegerField(null=True, blank=True)
     education_level = models.CharField(max_length=100, blank=True, null=True)
     current_role = models.CharField(max_length=200, blank=True, null=True)
-    industries = models.JSONField(default=list, blank=True)
     
-    # AI Analysis
-    ai_analysis = models.JSONField(default=dict, blank=True)
-    strengths = models.JSONField(default=list, blank=True)
-    areas_for_improvement = models.JSONField(default=list, blank=True)
+    # Extracted text and the analysis payload (skills, industries, ai_analysis,
+    # strengths, areas_for_improvement) are stored compressed in CVBlob rows and
+    # loaded on first access through the properties below
+    text_blob = models.ForeignKey('CVBlob', on_delete=models.PROTECT, null=True, blank=True,
+                                  related_name='+', editable=False)
+    analysis_blob = models.ForeignKey('CVBlob', on_delete=models.PROTECT, null=True, blank=True,
+                                      related_name='+', editable=False)
+    
+    # Tiered analysis: a fast local result first, upgraded by LLM enrichment
+    analysis_tier = models.CharField(max_length=10, blank=True, choices=[
+        ('fast', 'Fast (local)'),
+        ('full', 'Full (AI)'),
+    ])
+    analysis_status = models.CharField(max_length=20, default='pending', choices=[
+        ('pending', 'Pending'),
+        ('enriching', 'Enriching'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ])
+    analyzed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Per-section content hashes used to re-analyze only edited sections
+    section_hashes = models.JSONField(default=dict, blank=True)
+    
+    # MinHash signature of extracted_text for near-duplicate lookup
+    minhash_signature = models.BinaryField(null=True, blank=True, editable=False)
+    
+    # Canonical skills of the analysis, for indexed skill lookups (see skills.py)
+    skill_set = models.ManyToManyField('Skill', through='CVSkill', related_name='cv_uploads', blank=True)
     
     class Meta:
         ordering = ['-uploaded_at']
     
     def __str__(self):
         return f"{self.user.username} - {self.original_filename}"
+    
+    @property
+    def extracted_text(self):
+        if not hasattr(self, '_extracted_text'):
+            self._extracted_text = load_blob(self.text_blob).decode('utf-8') if self.text_blob_id else None
+        return self._extracted_text
+    
+    @extracted_text.setter
+    def extracted_text(self, value):
+        self._extracted_text = value
+    
+    def _analysis_payload(self) -> dict:
+        if not hasattr(self, '_analysis'):
+            self._analysis = json.loads(load_blob(self.analysis_blob)) if self.analysis_blob_id else {}
+        return self._analysis
+    
+    def _store_blobs(self, update_fields=None) -> None:
+        """Store loaded or assigned payloads whose content changed"""
+        if hasattr(self, '_extracted_text') and (update_fields is None or 'text_blob' in update_fields):
+            if self._extracted_text is None:
+                self.text_blob = None
+            else:
+                raw = self._extracted_text.encode('utf-8')
+                if digest(raw) != self.text_blob_id:
+                    self.text_blob = store_blob(raw)
+        if hasattr(self, '_analysis') and (update_fields is None or 'analysis_blob' in update_fields):
+            raw = encode_json(self._analysis)
+            if digest(raw) != self.analysis_blob_id:
+                self.analysis_blob = store_blob(raw)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = kwargs['update_fields'] = {BLOB_FIELDS.get(name, name) for name in update_fields}
+        self._store_blobs(update_fields)
+        super().save(*args, **kwargs)
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        for cached in ('_extracted_text', '_analysis'):
+            self.__dict__.pop(cached, None)
+        self._indexed_text_blob_id = self.text_blob_id
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored signature was computed from the stored text (see signals.py)
+        instance._indexed_text_blob_id = instance.__dict__.get('text_blob_id')
+        return instance
+
+
+def _analysis_property(key: str, default):
+    def getter(self):
+        return self._analysis_payload().setdefault(key, default())
+    
+    def setter(self, value):
+        self._analysis_payload()[key] = value
+    
+    return property(getter, setter)
+
+
+for _key, _default in (('skills', list), ('industries', list), ('ai_analysis', dict),
+                       ('strengths', list), ('areas_for_improvement', list)):
+    setattr(CVUpload, _key, _analysis_property(_key, _default))
+
+# Payload attributes -> the blob column they are stored in (for save(update_fields=...))
+BLOB_FIELDS = {
+    'extracted_text': 'text_blob',
+    'skills': 'analysis_blob',
+    'industries': 'analysis_blob',
+    'ai_analysis': 'analysis_blob',
+    'strengths': 'analysis_blob',
+    'areas_for_improvement': 'analysis_blob',
+}
+
+
+class CVBlob(models.Model):
+    """Compressed, content-addressed payload (see blob_store)"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=10, default='zlib')
+    size = models.PositiveIntegerField(help_text='Uncompressed size in bytes')
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.codec}, {self.size} bytes)"
+
+
+class Skill(models.Model):
+    """Canonical skill referenced by CVs, courses and skill gaps"""
+    name = models.CharField(max_length=100, unique=True, help_text='Normalized canonical name')
+    display_name = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.display_name
+
+
+class SkillAlias(models.Model):
+    """Normalized spelling of a skill ("k8s", "kubernetes") mapped to its canonical skill"""
+    alias = models.CharField(max_length=100, unique=True)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+    
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = 'skill aliases'
+    
+    def __str__(self):
+        return f"{self.alias} -> {self.skill.name}"
+
+
+class CVSkill(models.Model):
+    """Skill detected in an analyzed CV"""
+    cv_upload = models.ForeignKey(CVUpload, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='cv_links')
+    
+    class Meta:
+        unique_together = ['cv_upload', 'skill']
+    
+    def __str__(self):
+        return f"{self.cv_upload_id} - {self.skill_id}"
+
+
+class CVLSHBucket(models.Model):
+    """LSH band bucket of a CV's MinHash signature, used to find near-duplicate CVs"""
+    cv_upload = models.ForeignKey(CVUpload, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.CharField(max_length=16)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f"{self.cv_upload_id} - band {self.band}: {self.bucket}"
+
+
+class AnalysisSession(models.Model):
+    """Server-side CV analysis that later public API calls can reference instead of re-uploading the CV"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    original_filename = models.CharField(max_length=255, blank=True)
+    analysis = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.id} - {self.original_filename}"
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a POST sent with an Idempotency-Key header, replayed to retries of that request"""
+    STATUS_CHOICES = [
+        ('in_progress', 'In Progress'),
+        ('completed', 'Completed'),
+    ]
+    
+    # View name plus the user (or anonymous client) the key belongs to
+    scope = models.CharField(max_length=200)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    response_status = models.IntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # An in-progress key whose request has not finished by then is taken over by the next retry
+    locked_until = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        unique_together = ['scope', 'key']
+    
+    def __str__(self):
+        return f"{self.scope} - {self.key} ({self.status})"
+
+
+class Course(models.Model):
+    """Catalog course used for course recommendations"""
+    external_id = models.CharField(max_length=100, unique=True)
+    title = models.CharField(max_length=255)
+    provider = models.CharField(max_length=100, blank=True)
+    url = models.URLField(max_length=500, blank=True)
+    skills = models.JSONField(default=list, blank=True)
+    level = models.CharField(max_length=50, blank=True)
+    duration = models.CharField(max_length=50, blank=True)
+    rating = models.FloatField(null=True, blank=True)
+    price = models.CharField(max_length=50, blank=True)
+    is_free = models.BooleanField(default=False)
+    description = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Hashed n-gram embedding (float32) of title, skills and description
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    
+    skill_set = models.ManyToManyField(Skill, through='CourseSkill', related_name='courses', blank=True)
+    
+    class Meta:
+        ordering = ['title']
+    
+    def __str__(self):
+        return f"{self.title} ({self.provider})"
+    
+    def save(self, *args, **kwargs):
+        from .course_catalog import np, course_embedding
+        if np is not None:
+            self.embedding = course_embedding(self.as_recommendation())
+        super().save(*args, **kwargs)
+    
+    def as_recommendation(self) -> dict:
+        """Return the course in the recommendation format used by the API"""
+        return {
+            'id': self.external_id,
+            'title': self.title,
+            'provider': self.provider,
+            'url': self.url,
+            'skills': self.skills,
+            'level': self.level,
+            'duration': self.duration,
+            'rating': self.rating,
+            'price': self.price,
+            'isFree': self.is_free,
+            'description': self.description,
+        }
+
+
+class CourseSkill(models.Model):
+    """Skill taught by a catalog course"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='course_links')
+    
+    class Meta:
+        unique_together = ['course', 'skill']
+    
+    def __str__(self):
+        return f"{self.course_id} - {self.skill_id}"
+
+
+class TargetJobStat(models.Model):
+    """Request count of a normalized target job title, used to pre-warm job profiles"""
+    title = models.CharField(max_length=200, unique=True)
+    request_count = models.PositiveIntegerField(default=1)
+    last_requested_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-request_count']
+    
+    def __str__(self):
+        return f"{self.title} ({self.request_count})"
 
 
 class CareerQuestion(models.Model):
@@ -0,0 +1,178 @@
+"""
+Near-duplicate CV detection with MinHash and locality-sensitive hashing.
+
+Each CV's extracted text is reduced to word shingles and a MinHash signature.
+The signature is cut into bands; every band is hashed into a bucket row
+(CVLSHBucket) so candidate near-duplicates are found with an indexed lookup
+instead of comparing against every stored CV. Candidates are then verified
+by the Jaccard similarity estimated from their signatures.
+"""
+import hashlib
+import random
+import re
+import struct
+from typing import Dict, List, Optional, Set, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+# 16 bands x 8 rows: pairs above ~0.7 Jaccard similarity are very likely to share a bucket
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(430)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Return hashed word shingles of normalized text"""
+    words = re.findall(r'\w+', (text or '').lower())
+    if words and len(words) < size:
+        words += [''] * (size - len(words))
+    result = set()
+    for i in range(max(len(words) - size + 1, 0)):
+        shingle = ' '.join(words[i:i + size]).encode('utf-8')
+        result.add(struct.unpack('<I', hashlib.blake2b(shingle, digest_size=4).digest())[0])
+    return result
+
+
+def minhash_signature(text: str) -> List[int]:
+    """Compute the MinHash signature of a text"""
+    hashed = shingles(text)
+    if not hashed:
+        return []
+    return [
+        min(((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH for value in hashed)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return struct.pack(f'<{len(signature)}I', *signature)
+
+
+def unpack_signature(data) -> List[int]:
+    if not data:
+        return []
+    data = bytes(data)
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+
+def estimated_similarity(first: List[int], second: List[int]) -> float:
+    """Estimate Jaccard similarity from two MinHash signatures"""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+
+
+def band_buckets(signature: List[int]) -> List[Tuple[int, str]]:
+    """Return (band, bucket key) pairs for a signature"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        if len(rows) < LSH_ROWS:
+            break
+        buckets.append((band, hashlib.blake2b(pack_signature(rows), digest_size=8).hexdigest()))
+    return buckets
+
+
+def index_cv_upload(cv_upload) -> bool:
+    """(Re)index a CVUpload's text; returns False if its signature was unchanged"""
+    from .models import CVUpload, CVLSHBucket
+
+    signature = minhash_signature(cv_upload.extracted_text or '')
+    packed = pack_signature(signature) if signature else None
+    if cv_upload.minhash_signature is not None and packed == bytes(cv_upload.minhash_signature):
+        return False
+
+    with transaction.atomic():
+        CVUpload.objects.filter(pk=cv_upload.pk).update(minhash_signature=packed)
+        CVLSHBucket.objects.filter(cv_upload_id=cv_upload.pk).delete()
+        CVLSHBucket.objects.bulk_create([
+            CVLSHBucket(cv_upload_id=cv_upload.pk, band=band, bucket=bucket)
+            for band, bucket in band_buckets(signature)
+        ])
+    cv_upload.minhash_signature = packed
+    return True
+
+
+def find_near_duplicates(text: str, threshold: Optional[float] = None, exclude_id: Optional[int] = None,
+                         queryset=None, limit: int = 5) -> List[Tuple[object, float]]:
+    """Find stored CVs whose text is a near-duplicate of `text`
+
+    Returns (CVUpload, estimated similarity) pairs, most similar first.
+    """
+    from .models import CVUpload, CVLSHBucket
+
+    if threshold is None:
+        threshold = getattr(settings, 'CV_NEAR_DUPLICATE_THRESHOLD', 0.85)
+    signature = minhash_signature(text)
+    if not signature:
+        return []
+
+    bucket_filter = None
+    for band, bucket in band_buckets(signature):
+        condition = Q(band=band, bucket=bucket)
+        bucket_filter = condition if bucket_filter is None else bucket_filter | condition
+    candidate_ids = CVLSHBucket.objects.filter(bucket_filter).values_list('cv_upload_id', flat=True).distinct()
+
+    candidates = (queryset if queryset is not None else CVUpload.objects.all()).filter(id__in=candidate_ids)
+    if exclude_id is not None:
+        candidates = candidates.exclude(id=exclude_id)
+
+    matches = []
+    for candidate in candidates.only('id', 'minhash_signature'):
+        similarity = estimated_similarity(signature, unpack_signature(candidate.minhash_signature))
+        if similarity >= threshold:
+            matches.append((candidate, similarity))
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches[:limit]
+
+
+def near_duplicate_pairs(threshold: Optional[float] = None, limit: int = 200) -> List[Dict]:
+    """List pairs of stored CVs that share an LSH bucket and pass the similarity threshold"""
+    from .models import CVUpload, CVLSHBucket
+
+    if threshold is None:
+        threshold = getattr(settings, 'CV_NEAR_DUPLICATE_THRESHOLD', 0.85)
+    shared = (
+        CVLSHBucket.objects.values('band', 'bucket')
+        .annotate(size=Count('id'))
+        .filter(size__gt=1)
+    )
+    groups = {}
+    for row in CVLSHBucket.objects.filter(
+        band__in={entry['band'] for entry in shared},
+        bucket__in={entry['bucket'] for entry in shared},
+    ).values_list('band', 'bucket', 'cv_upload_id'):
+        groups.setdefault(row[:2], set()).add(row[2])
+
+    pairs = set()
+    for members in groups.values():
+        members = sorted(members)
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                pairs.add((first, second))
+
+    ids = {cv_id for pair in pairs for cv_id in pair}
+    uploads = CVUpload.objects.select_related('user').in_bulk(ids)
+    results = []
+    for first, second in pairs:
+        if first not in uploads or second not in uploads:
+            continue
+        similarity = estimated_similarity(
+            unpack_signature(uploads[first].minhash_signature),
+            unpack_signature(uploads[second].minhash_signature),
+        )
+        if similarity >= threshold:
+            results.append({'first': uploads[first], 'second': uploads[second], 'similarity': similarity})
+    results.sort(key=lambda pair: pair['similarity'], reverse=True)
+    return results[:limit]
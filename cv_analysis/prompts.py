@@ -0,0 +1,285 @@
+"""
+Prompt templates for LLM calls.
+
+Templates keep the stable text (system role, instructions, output schema)
+at the start of the message list and the per-request data at the end, so the
+provider can reuse its cached prefix across requests. Variable data is
+serialized as compact JSON containing only the fields the task needs.
+"""
+import json
+from typing import Dict, List, Any, Optional, Tuple
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from .metrics import metrics
+
+
+CAREER_PLAN_SYSTEM_PROMPT = """You are an expert career counselor. Create detailed, actionable career development plans.
+
+You will receive a JSON object with two keys:
+- "cv": the candidate's CV analysis (skills, experience, education, current role, industries, strength titles and improvement areas with priorities)
+- "responses": the candidate's answers to career questions, grouped by question type
+
+Based on this data, create a comprehensive career development plan.
+
+Return a JSON response with this structure:
+{
+    "career_goals": ["goal1", "goal2", ...],
+    "skill_gaps": [
+        {"skill": "skill_name", "current_level": "beginner/intermediate/advanced", "target_level": "intermediate/advanced/expert", "priority": "high/medium/low"}
+    ],
+    "learning_path": [
+        {"title": "Learning item", "type": "course/certification/practice", "duration": "X weeks", "priority": "high/medium/low", "description": "..."}
+    ],
+    "timeline": {
+        "short_term": ["action1", "action2", ...],
+        "medium_term": ["action1", "action2", ...],
+        "long_term": ["action1", "action2", ...]
+    },
+    "recommendations": ["recommendation1", "recommendation2", ...]
+}
+
+Return only valid JSON."""
+
+# Appended to the career plan prompt when a local draft plan is sent along
+CAREER_PLAN_DRAFT_INSTRUCTIONS = """
+
+The JSON object also has a "draft" key: a plan computed from a skill prerequisite graph and the target role's skill profile ("target_role", "skill_gaps" as [skill, priority], "learning_path" as [title, type, skills] in prerequisite order).
+Refine this draft rather than starting over: keep its target role, skill gaps and learning order unless the CV or responses contradict them, keep the course titles it names, and write specific goals, descriptions, timeline and recommendations for this candidate."""
+
+COURSE_RERANK_SYSTEM_PROMPT = """You are an expert career advisor. You are given a candidate's CV summary, their target job and a shortlist of catalog courses.
+Order the courses from most to least useful for reaching the target job, preferring courses that close the candidate's skill gaps over ones repeating skills they already have.
+Return ONLY a JSON array of the course ids, best first, e.g. ["12","4","7"]. Do not add courses that are not in the shortlist."""
+
+JOB_PROFILE_SYSTEM_PROMPT = """You are an expert career advisor. Given a job title, list the 6-10 most important skills a candidate needs for that role, most important first.
+Use short lowercase skill names (e.g. "python", "sql", "stakeholder management").
+Return ONLY a JSON array of strings."""
+
+CV_CHUNK_SYSTEM_PROMPT = """You extract facts from one excerpt of a longer CV. Report only what this excerpt states; other excerpts are processed separately.
+Return a JSON object with this structure:
+{
+    "skills": ["skill", ...],
+    "industries": ["industry", ...],
+    "roles": [{"title": "job title", "start_year": 2019, "end_year": 2023 or null if current}],
+    "education_level": "highest degree in this excerpt (High School/Associate/Bachelor's/Master's/PhD) or null",
+    "experience_years": total years of experience if the excerpt states it, else null,
+    "strengths": [{"title": "specific strength", "evidence": "achievement from this excerpt"}],
+    "highlights": ["short notable achievement", ...]
+}
+Use at most 5 strengths and 3 highlights. Return only valid JSON."""
+
+CV_SYNTHESIS_SYSTEM_PROMPT = """You are an expert CV analyzer and career advisor. You receive facts merged from all excerpts of one long CV (skills, industries, roles, education, strengths and highlights).
+Return a JSON object with this structure:
+{
+    "summary": "3-4 sentence professional summary",
+    "areas_for_improvement": [
+        {"title": "specific gap", "description": "why it is a gap given these facts", "recommendation": "actionable step", "priority": "high/medium/low"}
+    ]
+}
+List at most 5 areas for improvement, based only on the facts given. Return only valid JSON."""
+
+CV_PACKED_SYSTEM_PROMPT = """You are an expert CV analyzer and career advisor. You receive several CVs of different people, each between <cv id="..."> and </cv> tags. Analyze each CV on its own: never mix information between CVs.
+
+Return a JSON object with one key per CV id, each holding that CV's analysis with this structure:
+{
+    "<cv id>": {
+        "skills": ["skill1", "skill2", ...],
+        "experience_years": number,
+        "education_level": "Bachelor's/Master's/PhD/etc",
+        "current_role": "current job title",
+        "industries": ["industry1", "industry2", ...],
+        "strengths": [
+            {"title": "Specific strength title", "description": "Detailed explanation with evidence from the CV", "evidence": "Specific examples or achievements from the CV", "impact": "How this strength benefits their career"}
+        ],
+        "areas_for_improvement": [
+            {"title": "Specific area that needs improvement", "description": "Why this is a gap based on the CV content", "current_state": "What the CV currently shows (or lacks)", "recommendation": "Specific actionable steps", "priority": "high/medium/low"}
+        ],
+        "summary": "Comprehensive professional summary highlighting key achievements and background"
+    }
+}
+
+IMPORTANT GUIDELINES:
+1. Strengths must be SPECIFIC to that person's CV - cite actual experiences, skills, or achievements
+2. Weaknesses must be IDENTIFIED from what's MISSING or WEAK in that CV - not generic suggestions
+3. Make recommendations ACTIONABLE and SPECIFIC
+4. Base everything on the actual CV content, not assumptions
+5. Include every CV id exactly once
+
+Return only valid JSON."""
+
+MAX_PLAN_SKILLS = 30
+MAX_PLAN_ITEMS = 8
+
+
+def compact_json(data: Any) -> str:
+    """Serialize data without whitespace"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def _titles(items: List[Any], limit: int) -> List[str]:
+    titles = []
+    for item in items or []:
+        if isinstance(item, dict):
+            title = item.get('title')
+        else:
+            title = item
+        if title:
+            titles.append(str(title))
+    return titles[:limit]
+
+
+def _improvement_areas(items: List[Any], limit: int) -> List[Any]:
+    areas = []
+    for item in items or []:
+        if isinstance(item, dict):
+            if item.get('title'):
+                areas.append([item['title'], item.get('priority', 'medium')])
+        elif item:
+            areas.append([str(item), 'medium'])
+    return areas[:limit]
+
+
+def trim_cv_analysis_for_plan(cv_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the CV fields a career plan needs, dropping empty values"""
+    trimmed = {
+        'skills': list(cv_analysis.get('skills') or [])[:MAX_PLAN_SKILLS],
+        'experience_years': cv_analysis.get('experience_years'),
+        'education_level': cv_analysis.get('education_level'),
+        'current_role': cv_analysis.get('current_role'),
+        'industries': list(cv_analysis.get('industries') or [])[:MAX_PLAN_ITEMS],
+        'strengths': _titles(cv_analysis.get('strengths'), MAX_PLAN_ITEMS),
+        'improvement_areas': _improvement_areas(cv_analysis.get('areas_for_improvement'), MAX_PLAN_ITEMS),
+    }
+    return {key: value for key, value in trimmed.items() if value not in (None, '', [], 'Unknown')}
+
+
+def group_user_responses(user_responses: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Group response texts by question type"""
+    grouped = {}
+    for response in user_responses or []:
+        text = (response.get('response_text') or '').strip()
+        if text:
+            grouped.setdefault(response.get('question_type', 'other'), []).append(text)
+    return grouped
+
+
+def trim_draft_plan(draft: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what the LLM needs of a local draft plan"""
+    return {
+        'target_role': draft.get('target_role'),
+        'skill_gaps': [[gap['skill'], gap['priority']] for gap in draft.get('skill_gaps', [])],
+        'learning_path': [
+            [item['title'], item['type'], item.get('skills', [])] for item in draft.get('learning_path', [])
+        ],
+    }
+
+
+def build_career_plan_messages(cv_analysis: Dict[str, Any], user_responses: List[Dict[str, Any]],
+                               draft: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+    """Build the chat messages for career plan generation, optionally refining a local draft plan"""
+    payload = {
+        'cv': trim_cv_analysis_for_plan(cv_analysis),
+        'responses': group_user_responses(user_responses),
+    }
+    system_prompt = CAREER_PLAN_SYSTEM_PROMPT
+    if draft:
+        payload['draft'] = trim_draft_plan(draft)
+        system_prompt += CAREER_PLAN_DRAFT_INSTRUCTIONS
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": compact_json(payload)},
+    ]
+
+
+def build_course_rerank_messages(cv_analysis: Dict[str, Any], target_job: str,
+                                 courses: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Build the chat messages for re-ranking a course shortlist"""
+    payload = {
+        'cv': trim_cv_analysis_for_plan(cv_analysis),
+        'target_job': target_job,
+        'courses': [[course['id'], course['title'], course.get('skills', [])] for course in courses],
+    }
+    return [
+        {"role": "system", "content": COURSE_RERANK_SYSTEM_PROMPT},
+        {"role": "user", "content": compact_json(payload)},
+    ]
+
+
+def build_job_profile_messages(job_title: str) -> List[Dict[str, str]]:
+    """Build the chat messages for listing the skills a job requires"""
+    return [
+        {"role": "system", "content": JOB_PROFILE_SYSTEM_PROMPT},
+        {"role": "user", "content": job_title},
+    ]
+
+
+def build_cv_chunk_messages(chunk: str, index: int, total: int) -> List[Dict[str, str]]:
+    """Build the chat messages for extracting facts from one chunk of a long CV"""
+    return [
+        {"role": "system", "content": CV_CHUNK_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Excerpt {index + 1} of {total}:\n{chunk}"},
+    ]
+
+
+def build_cv_synthesis_messages(merged: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Build the chat messages for summarizing the merged facts of a long CV"""
+    payload = {
+        'skills': list(merged.get('skills') or [])[:MAX_PLAN_SKILLS],
+        'industries': list(merged.get('industries') or [])[:MAX_PLAN_ITEMS],
+        'roles': list(merged.get('roles') or [])[:MAX_PLAN_ITEMS],
+        'education_level': merged.get('education_level'),
+        'experience_years': merged.get('experience_years'),
+        'strengths': _titles(merged.get('strengths'), MAX_PLAN_ITEMS),
+        'highlights': list(merged.get('highlights') or [])[:MAX_PLAN_ITEMS],
+    }
+    return [
+        {"role": "system", "content": CV_SYNTHESIS_SYSTEM_PROMPT},
+        {"role": "user", "content": compact_json({key: value for key, value in payload.items() if value})},
+    ]
+
+
+def build_cv_packed_messages(cvs: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+    """Build the chat messages for analyzing several short CVs, given as (id, text) pairs, in one call"""
+    # A closing tag inside a CV would end its block early
+    packed = "\n\n".join(
+        f'<cv id="{cv_id}">\n{text.replace("</cv>", "</ cv>")}\n</cv>' for cv_id, text in cvs
+    )
+    return [
+        {"role": "system", "content": CV_PACKED_SYSTEM_PROMPT},
+        {"role": "user", "content": packed},
+    ]
+
+
+def count_tokens(messages: List[Dict[str, str]]) -> int:
+    """Count prompt tokens with tiktoken, or estimate at ~4 characters per token"""
+    text = "\n".join(message.get('content', '') for message in messages)
+    if tiktoken is not None:
+        try:
+            return len(tiktoken.get_encoding('o200k_base').encode(text))
+        except Exception:
+            pass
+    # Every message also carries a few tokens of role/formatting overhead
+    return len(text) // 4 + 4 * len(messages)
+
+
+def record_prompt_usage(task: str, messages: List[Dict[str, str]], response=None) -> Dict[str, int]:
+    """Report prompt token counts for a call, preferring the provider's usage numbers"""
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    if prompt_tokens is None:
+        prompt_tokens = count_tokens(messages)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', None) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+
+    metrics.observe(f'llm.prompt_tokens.{task}', prompt_tokens)
+    metrics.observe(f'llm.cached_prompt_tokens.{task}', cached_tokens)
+    metrics.observe(f'llm.completion_tokens.{task}', completion_tokens)
+    print(f"LLM {task}: prompt_tokens={prompt_tokens} cached_tokens={cached_tokens} completion_tokens={completion_tokens}")
+    return {
+        'prompt_tokens': prompt_tokens,
+        'cached_tokens': cached_tokens,
+        'completion_tokens': completion_tokens,
+    }
@@ -0,0 +1,144 @@
+"""
+Section-level segmentation of extracted CV text.
+
+CVs are split on common headings (experience, education, skills, ...) and
+each section gets a content hash, so a re-uploaded CV can be diffed against
+the previous upload and only the changed sections re-analyzed.
+"""
+import hashlib
+import re
+from typing import Dict, List, Tuple
+
+
+# Canonical section name -> heading variants (matched case-insensitively on their own line)
+SECTION_HEADINGS = {
+    'summary': ['summary', 'professional summary', 'profile', 'professional profile', 'about me', 'objective', 'career objective'],
+    'experience': ['experience', 'work experience', 'professional experience', 'employment', 'employment history', 'work history', 'career history'],
+    'education': ['education', 'academic background', 'education and training', 'qualifications', 'academic qualifications'],
+    'skills': ['skills', 'technical skills', 'core skills', 'key skills', 'competencies', 'core competencies', 'technologies', 'tools'],
+    'projects': ['projects', 'personal projects', 'selected projects', 'portfolio'],
+    'certifications': ['certifications', 'certificates', 'licenses', 'licenses and certifications', 'courses', 'training'],
+    'publications': ['publications', 'research', 'papers', 'conferences', 'presentations'],
+    'awards': ['awards', 'honors', 'honours', 'achievements', 'awards and honors'],
+    'languages': ['languages'],
+    'volunteering': ['volunteering', 'volunteer experience', 'community involvement', 'leadership', 'activities', 'extracurricular activities'],
+    'interests': ['interests', 'hobbies', 'hobbies and interests'],
+    'references': ['references'],
+}
+
+# Text before the first recognized heading (name, contact details, headline)
+HEADER_SECTION = 'header'
+
+_HEADING_LOOKUP = {
+    variant: name
+    for name, variants in SECTION_HEADINGS.items()
+    for variant in variants
+}
+_HEADING_PATTERN = re.compile(
+    r'^\s*(?:#+\s*)?(' + '|'.join(sorted((re.escape(v) for v in _HEADING_LOOKUP), key=len, reverse=True)) + r')\s*:?\s*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Split CV text into (section_name, section_text) pairs in document order
+
+    Repeated headings get a numeric suffix (e.g. "experience_2") so every
+    section name is unique.
+    """
+    sections = []
+    seen = {}
+    position = 0
+    current = HEADER_SECTION
+    for match in _HEADING_PATTERN.finditer(text or ''):
+        body = text[position:match.start()].strip()
+        if body or current != HEADER_SECTION:
+            sections.append((current, body))
+        name = _HEADING_LOOKUP[match.group(1).lower()]
+        seen[name] = seen.get(name, 0) + 1
+        current = name if seen[name] == 1 else f'{name}_{seen[name]}'
+        position = match.end()
+    body = (text or '')[position:].strip()
+    if body or current != HEADER_SECTION:
+        sections.append((current, body))
+    return sections
+
+
+def normalize_section_text(text: str) -> str:
+    """Normalize whitespace and case so reformatting alone does not count as a change"""
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+def section_hashes(sections: List[Tuple[str, str]]) -> Dict[str, str]:
+    """Return {section_name: sha256 of normalized section text}"""
+    return {
+        name: hashlib.sha256(normalize_section_text(body).encode('utf-8')).hexdigest()
+        for name, body in sections
+    }
+
+
+def diff_section_hashes(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """Compare two section hash maps"""
+    return {
+        'unchanged': [name for name, digest in current.items() if previous.get(name) == digest],
+        'changed': [name for name, digest in current.items() if name in previous and previous[name] != digest],
+        'added': [name for name in current if name not in previous],
+        'removed': [name for name in previous if name not in current],
+    }
+
+
+def base_section_name(name: str) -> str:
+    """Strip the numeric suffix from repeated section names"""
+    return re.sub(r'_\d+$', '', name)
+
+
+def _split_long_text(text: str, max_chars: int) -> List[str]:
+    """Split text into pieces of at most max_chars, on paragraph, then line, then word boundaries"""
+    if len(text) <= max_chars:
+        return [text]
+    for separator in ('\n\n', '\n', ' '):
+        parts = text.split(separator)
+        if len(parts) > 1:
+            break
+    else:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    pieces = []
+    current = ''
+    for part in parts:
+        candidate = f'{current}{separator}{part}' if current else part
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if len(part) > max_chars:
+            pieces.extend(_split_long_text(part, max_chars))
+            current = ''
+        else:
+            current = part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_sections(sections: List[Tuple[str, str]], max_chars: int) -> List[str]:
+    """Group sections into chunks of at most about max_chars characters
+
+    Consecutive sections share a chunk while they fit; a section longer than
+    max_chars is split on paragraph boundaries. Every piece keeps its
+    section heading so the chunk can be read on its own.
+    """
+    chunks = []
+    current = ''
+    for name, body in sections:
+        heading = base_section_name(name).upper()
+        for piece in _split_long_text(body, max(max_chars - len(heading) - 1, 1)):
+            block = f'{heading}\n{piece}'
+            if current and len(current) + len(block) + 2 > max_chars:
+                chunks.append(current)
+                current = ''
+            current = f'{current}\n\n{block}' if current else block
+    if current:
+        chunks.append(current)
+    return chunks
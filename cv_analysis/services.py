@@ -1,27 +1,102 @@
 import os
+import asyncio
+import contextvars
 import json
 import re
-from typing import Dict, List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+from asgiref.sync import sync_to_async
+from django.utils import timezone
 from django.conf import settings
-try:
-    import openai
-except ImportError:
-    openai = None
 
+from .career_planner import build_local_career_plan, career_plan_mode
+from .deadlines import degrade_if_expired, degraded_stages, has_time_for
+from .llm_gateway import LLMUnavailableError
+from .llm_routing import analysis_task, get_llm_router
+from .metrics import metrics
+from .prompts import (
+    build_career_plan_messages, build_course_rerank_messages, build_cv_chunk_messages, build_cv_synthesis_messages,
+    build_job_profile_messages, record_prompt_usage
+)
+from .near_duplicates import find_near_duplicates
+from .sections import split_sections, section_hashes, diff_section_hashes, base_section_name, chunk_sections
+from .word_text import extract_doc_text, extract_docx_text
 
-class CVAnalysisService:
-    """Service for analyzing CV files and extracting information"""
-    
-    def __init__(self):
-        self.openai_client = self._setup_openai_client()
-    
-    def _setup_openai_client(self):
-        """Setup OpenAI client with Azure configuration"""
+# Completion token budget of the AI course search
+COURSE_SEARCH_MAX_TOKENS = 2000
+# Completion token budget of short list answers (re-ranked course ids, job skills)
+COURSE_RERANK_MAX_TOKENS = 200
+# Completion token budgets of the long-CV map (per chunk) and synthesis calls
+CV_CHUNK_MAX_TOKENS = 600
+CV_SYNTHESIS_MAX_TOKENS = 700
+# Strengths kept from the chunks of a long CV
+LONG_DOCUMENT_MAX_STRENGTHS = 8
+
+# Highest education level first
+EDUCATION_LEVELS = [
+    ('PhD', ('phd', 'ph.d', 'doctor')),
+    ("Master's", ('master', 'msc', 'm.sc', 'mba', 'meng')),
+    ("Bachelor's", ('bachelor', 'bsc', 'b.sc', 'b.a', 'beng', 'undergraduate')),
+    ('Associate', ('associate', 'diploma')),
+    ('High School', ('high school', 'secondary')),
+]
+
+# Chunk size for reading plain-text CVs
+TEXT_READ_CHUNK_CHARS = 64 * 1024
+
+_openai = None
+_openai_client = None
+_openai_client_checked = False
+_async_openai_client = None
+
+
+def text_char_limit() -> int:
+    """Maximum number of characters extracted from a CV file"""
+    return getattr(settings, 'CV_TEXT_MAX_CHARS', 200000)
+
+
+def read_text_file(file_path: str, max_chars: int) -> str:
+    """Read up to max_chars characters of a UTF-8 text file chunk by chunk"""
+    parts = []
+    remaining = max_chars
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        while remaining > 0:
+            chunk = file.read(min(TEXT_READ_CHUNK_CHARS, remaining))
+            if not chunk:
+                break
+            parts.append(chunk)
+            remaining -= len(chunk)
+    return "".join(parts)
+
+
+def get_openai_module():
+    """Import the openai package on first use (None if it is not installed)
+
+    The import takes about a second, so it is deferred until a client is
+    needed; web workers pay it while prewarming (see startup.py).
+    """
+    global _openai
+    if _openai is None:
+        try:
+            import openai
+        except ImportError:
+            openai = False
+        _openai = openai
+    return _openai or None
+
+
+def get_openai_client():
+    """Return the process-wide AzureOpenAI client, or None if Azure OpenAI is not configured"""
+    global _openai_client, _openai_client_checked
+    if _openai_client is None and not _openai_client_checked:
+        _openai_client_checked = True
         try:
             if not settings.AZURE_OPENAI_API_KEY or not settings.AZURE_OPENAI_ENDPOINT:
                 print("Azure OpenAI credentials not configured, using fallback analysis")
                 return None
             
+            openai = get_openai_module()
             if not openai:
                 print("OpenAI library not available, using fallback analysis")
                 return None
@@ -29,150 +104,529 @@ class CVAnalysisService:
             # Get API version from settings or use default
             api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-12-01-preview')
             
-            client = openai.AzureOpenAI(
+            _openai_client = openai.AzureOpenAI(
                 api_key=settings.AZURE_OPENAI_API_KEY,
                 api_version=api_version,
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                # Timeouts and retries are handled by the LLM gateway
+                max_retries=0
             )
             print(f"Azure OpenAI client initialized successfully with API version {api_version}")
-            return client
         except Exception as e:
             print(f"Error setting up OpenAI client: {e}")
             import traceback
             traceback.print_exc()
+    return _openai_client
+
+
+def get_async_openai_client():
+    """Return the process-wide AsyncAzureOpenAI client, or None if Azure OpenAI is not configured"""
+    global _async_openai_client
+    if _async_openai_client is None:
+        if not settings.AZURE_OPENAI_API_KEY or not settings.AZURE_OPENAI_ENDPOINT:
             return None
+        openai = get_openai_module()
+        if not openai:
+            return None
+        _async_openai_client = openai.AsyncAzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-12-01-preview'),
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+            # Timeouts and retries are handled by the LLM gateway
+            max_retries=0
+        )
+    return _async_openai_client
+
+
+class CVAnalysisService:
+    """Service for analyzing CV files and extracting information"""
+    
+    def __init__(self):
+        self.openai_client = self._setup_openai_client()
+    
+    def _setup_openai_client(self):
+        """Return the shared Azure OpenAI client"""
+        return get_openai_client()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
         try:
             import PyPDF2
+            max_chars = text_char_limit()
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
+                parts = []
+                length = 0
+                for number, page in enumerate(pdf_reader.pages):
+                    if number and not has_time_for('extraction'):
+                        # Out of time: analyze the pages read so far
+                        break
+                    page_text = page.extract_text() or ""
+                    parts.append(page_text)
+                    length += len(page_text)
+                    if length >= max_chars:
+                        break
+                return "".join(parts)[:max_chars]
         except Exception as e:
             print(f"Error extracting PDF text: {e}")
             return ""
     
     def extract_text_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
+        """Extract text from DOCX file, including tables, text boxes, headers and footers"""
         try:
-            import docx
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+            return extract_docx_text(file_path, text_char_limit())
         except Exception as e:
             print(f"Error extracting DOCX text: {e}")
             return ""
     
+    def extract_text_from_doc(self, file_path: str) -> str:
+        """Extract text from a legacy binary Word (.doc) file"""
+        try:
+            return extract_doc_text(file_path, text_char_limit())
+        except Exception as e:
+            print(f"Error extracting DOC text: {e}")
+            return ""
+    
     def extract_text(self, file_path: str) -> str:
         """Extract text from various file formats"""
         file_extension = os.path.splitext(file_path)[1].lower()
         
         if file_extension == '.pdf':
             return self.extract_text_from_pdf(file_path)
-        elif file_extension in ['.docx', '.doc']:
+        elif file_extension == '.docx':
             return self.extract_text_from_docx(file_path)
+        elif file_extension == '.doc':
+            return self.extract_text_from_doc(file_path)
         else:
-            # Try to read as plain text
+            # Read as plain text, incrementally and at most text_char_limit() characters
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    return file.read()
-            except:
+                return read_text_file(file_path, text_char_limit())
+            except OSError:
                 return ""
     
-    def analyze_with_ai(self, text: str) -> Dict[str, Any]:
-        """Use AI to analyze CV text and extract structured information"""
-        if not self.openai_client:
-            return self._fallback_analysis(text)
+    def analyze_with_ai(self, text: str, partial: bool = False, strict: bool = False) -> Dict[str, Any]:
+        """Use AI to analyze CV text and extract structured information
+        
+        With partial=True the text holds only some sections of a CV (see
+        analyze_cv_incremental) and the model is told not to report gaps
+        for content that belongs to the other sections. When the LLM cannot
+        produce the analysis the local fallback is returned with tier "fast"
+        (see _llm_fallback); with strict=True failures raise instead, for
+        callers that must not store the fallback as an AI result.
+        """
+        task = analysis_task(text)
+        if not self.openai_client or not get_llm_router().available(task):
+            if strict:
+                raise LLMUnavailableError(f"LLM route for {task} is not available")
+            return self._llm_fallback(text)
+        if not has_time_for('llm_analysis'):
+            if strict:
+                raise LLMUnavailableError("No time left for LLM analysis")
+            return self._llm_fallback(text)
+        if self._is_long_document(text, partial):
+            return self.analyze_long_document(text, strict)
         
         try:
-            prompt = f"""
-            Analyze the following CV text in detail and extract comprehensive, personalized information. 
-            Provide SPECIFIC strengths and weaknesses based on the actual content of this CV.
-            
-            Return a JSON response with the following structure:
-            {{
-                "skills": ["skill1", "skill2", ...],
-                "experience_years": number,
-                "education_level": "Bachelor's/Master's/PhD/etc",
-                "current_role": "current job title",
-                "industries": ["industry1", "industry2", ...],
-                "strengths": [
-                    {{
-                        "title": "Specific strength title",
-                        "description": "Detailed explanation of this strength with evidence from the CV",
-                        "evidence": "Specific examples or achievements from CV that demonstrate this strength",
-                        "impact": "How this strength benefits their career"
-                    }}
-                ],
-                "areas_for_improvement": [
-                    {{
-                        "title": "Specific area that needs improvement",
-                        "description": "Detailed explanation of why this is a gap based on CV content",
-                        "current_state": "What the CV currently shows (or lacks)",
-                        "recommendation": "Specific actionable steps to improve this area",
-                        "priority": "high/medium/low"
-                    }}
-                ],
-                "summary": "Comprehensive professional summary highlighting key achievements and background"
-            }}
-            
-            IMPORTANT GUIDELINES:
-            1. Strengths must be SPECIFIC to this person's CV - cite actual experiences, skills, or achievements
-            2. Weaknesses must be IDENTIFIED from what's MISSING or WEAK in the CV - not generic suggestions
-            3. Provide DETAILED descriptions with evidence from the CV text
-            4. Make recommendations ACTIONABLE and SPECIFIC
-            5. Base everything on the actual CV content, not assumptions
-            
-            CV Text:
-            {text}
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=settings.AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {"role": "system", "content": "You are an expert CV analyzer and career advisor. Analyze CVs deeply and provide detailed, personalized strengths and weaknesses with specific evidence from the CV. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = get_llm_router().chat(
+                self.openai_client,
+                task,
+                messages=self._analysis_messages(text, partial),
                 temperature=0.3,
                 max_tokens=2500
             )
-            
-            content = response.choices[0].message.content
-            print(f"AI Analysis Response: {content[:200]}...")  # Debug log
-            
-            # Try to parse JSON response
-            try:
-                result = json.loads(content)
-                print(f"AI Analysis parsed successfully: {list(result.keys())}")
-                # Normalize the format to ensure detailed structure
-                result = self._normalize_analysis_format(result)
-                return result
-            except json.JSONDecodeError as json_error:
-                print(f"Failed to parse AI response as JSON: {json_error}")
-                print(f"Raw response: {content}")
-                # Try to extract JSON from markdown code blocks
-                import re
-                json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', content, re.DOTALL)
-                if json_match:
-                    try:
-                        result = json.loads(json_match.group(1))
-                        result = self._normalize_analysis_format(result)
-                        return result
-                    except:
-                        pass
-                return self._fallback_analysis(text)
-            
+            return self._parse_analysis_content(response.choices[0].message.content, text, strict)
+        
+        except LLMUnavailableError as e:
+            if strict:
+                raise
+            print(f"LLM unavailable, using fallback analysis: {e}")
+            degrade_if_expired('llm_analysis')
+            return self._llm_fallback(text)
         except Exception as e:
+            if strict:
+                raise
             print(f"Error in AI analysis: {e}")
+            degrade_if_expired('llm_analysis')
             import traceback
             traceback.print_exc()
-            return self._fallback_analysis(text)
+            return self._llm_fallback(text)
+    
+    async def aanalyze_with_ai(self, text: str, partial: bool = False) -> Dict[str, Any]:
+        """Async variant of analyze_with_ai using the shared AsyncAzureOpenAI client"""
+        client = get_async_openai_client()
+        task = analysis_task(text)
+        if not client or not get_llm_router().available(task):
+            return self._llm_fallback(text)
+        if not has_time_for('llm_analysis'):
+            return self._llm_fallback(text)
+        if self._is_long_document(text, partial):
+            return await self.aanalyze_long_document(text)
+        
+        try:
+            response = await get_llm_router().achat(
+                client,
+                task,
+                messages=self._analysis_messages(text, partial),
+                temperature=0.3,
+                max_tokens=2500
+            )
+            return self._parse_analysis_content(response.choices[0].message.content, text)
+        
+        except LLMUnavailableError as e:
+            print(f"LLM unavailable, using fallback analysis: {e}")
+            degrade_if_expired('llm_analysis')
+            return self._llm_fallback(text)
+        except Exception as e:
+            print(f"Error in AI analysis: {e}")
+            degrade_if_expired('llm_analysis')
+            return self._llm_fallback(text)
+    
+    def _analysis_messages(self, text: str, partial: bool = False) -> List[Dict[str, str]]:
+        """Build the chat messages for CV analysis"""
+        partial_guideline = (
+            "6. This text contains ONLY the edited sections of a longer CV. Do not report areas for "
+            "improvement about content that would normally appear in other sections"
+            if partial else ""
+        )
+        prompt = f"""
+        Analyze the following CV text in detail and extract comprehensive, personalized information. 
+        Provide SPECIFIC strengths and weaknesses based on the actual content of this CV.
+        
+        Return a JSON response with the following structure:
+        {{
+            "skills": ["skill1", "skill2", ...],
+            "experience_years": number,
+            "education_level": "Bachelor's/Master's/PhD/etc",
+            "current_role": "current job title",
+            "industries": ["industry1", "industry2", ...],
+            "strengths": [
+                {{
+                    "title": "Specific strength title",
+                    "description": "Detailed explanation of this strength with evidence from the CV",
+                    "evidence": "Specific examples or achievements from CV that demonstrate this strength",
+                    "impact": "How this strength benefits their career"
+                }}
+            ],
+            "areas_for_improvement": [
+                {{
+                    "title": "Specific area that needs improvement",
+                    "description": "Detailed explanation of why this is a gap based on CV content",
+                    "current_state": "What the CV currently shows (or lacks)",
+                    "recommendation": "Specific actionable steps to improve this area",
+                    "priority": "high/medium/low"
+                }}
+            ],
+            "summary": "Comprehensive professional summary highlighting key achievements and background"
+        }}
+        
+        IMPORTANT GUIDELINES:
+        1. Strengths must be SPECIFIC to this person's CV - cite actual experiences, skills, or achievements
+        2. Weaknesses must be IDENTIFIED from what's MISSING or WEAK in the CV - not generic suggestions
+        3. Provide DETAILED descriptions with evidence from the CV text
+        4. Make recommendations ACTIONABLE and SPECIFIC
+        5. Base everything on the actual CV content, not assumptions
+        {partial_guideline}
+        
+        CV Text:
+        {text}
+        """
+        
+        return [
+            {"role": "system", "content": "You are an expert CV analyzer and career advisor. Analyze CVs deeply and provide detailed, personalized strengths and weaknesses with specific evidence from the CV. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _parse_analysis_content(self, content: str, text: str, strict: bool = False) -> Dict[str, Any]:
+        """Parse the model's analysis JSON, falling back to local analysis (raising if strict) if it is unusable"""
+        print(f"AI Analysis Response: {content[:200]}...")  # Debug log
+        
+        # Try to parse JSON response
+        try:
+            result = json.loads(content)
+            print(f"AI Analysis parsed successfully: {list(result.keys())}")
+            # Normalize the format to ensure detailed structure
+            result = self._normalize_analysis_format(result)
+            return result
+        except json.JSONDecodeError as json_error:
+            print(f"Failed to parse AI response as JSON: {json_error}")
+            print(f"Raw response: {content}")
+            # Try to extract JSON from markdown code blocks
+            import re
+            json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', content, re.DOTALL)
+            if json_match:
+                try:
+                    result = json.loads(json_match.group(1))
+                    result = self._normalize_analysis_format(result)
+                    return result
+                except:
+                    pass
+            if strict:
+                raise ValueError("The analysis response is not valid JSON")
+            return self._llm_fallback(text)
+    
+    def _is_long_document(self, text: str, partial: bool = False) -> bool:
+        return not partial and len(text) > getattr(settings, 'CV_LONG_DOCUMENT_CHARS', 24000)
+    
+    def analyze_long_document(self, text: str, strict: bool = False) -> Dict[str, Any]:
+        """Map-reduce analysis of a long CV
+        
+        The text is split into section-aligned chunks that are analyzed
+        concurrently with a short extraction prompt. The partial results are
+        merged deterministically (_reduce_chunk_analyses) and one short
+        synthesis call writes the summary and improvement areas, so latency
+        follows the slowest chunk rather than the length of the CV. A chunk
+        or synthesis that falls back to local analysis makes the result tier
+        "fast"; with strict=True the failure is raised instead.
+        """
+        started = time.monotonic()
+        chunks = chunk_sections(split_sections(text), getattr(settings, 'CV_CHUNK_CHARS', 8000))
+        workers = max(1, min(len(chunks), getattr(settings, 'CV_CHUNK_MAX_WORKERS', 6)))
+        # Each chunk runs in a copy of the request's context, so it sees the request deadline
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cv-chunk') as executor:
+            partials = list(executor.map(
+                lambda item: contexts[item[0]].run(self._analyze_chunk, item[1], item[0], len(chunks), strict),
+                enumerate(chunks)
+            ))
+        merged = self._reduce_chunk_analyses(partials)
+        synthesis = self._synthesize_long_document(merged, strict)
+        return self._finish_long_document(text, merged, synthesis, partials, started)
+    
+    async def aanalyze_long_document(self, text: str) -> Dict[str, Any]:
+        """Async variant of analyze_long_document"""
+        started = time.monotonic()
+        chunks = chunk_sections(split_sections(text), getattr(settings, 'CV_CHUNK_CHARS', 8000))
+        limit = asyncio.Semaphore(max(1, getattr(settings, 'CV_CHUNK_MAX_WORKERS', 6)))
+        
+        async def analyze(index, chunk):
+            async with limit:
+                return await self._aanalyze_chunk(chunk, index, len(chunks))
+        
+        partials = list(await asyncio.gather(*(analyze(index, chunk) for index, chunk in enumerate(chunks))))
+        merged = self._reduce_chunk_analyses(partials)
+        synthesis = await self._asynthesize_long_document(merged)
+        return self._finish_long_document(text, merged, synthesis, partials, started)
+    
+    def _analyze_chunk(self, chunk: str, index: int, total: int, strict: bool = False) -> Dict[str, Any]:
+        """Extract the facts of one chunk, falling back to local extraction (raising if strict)"""
+        messages = build_cv_chunk_messages(chunk, index, total)
+        started = time.monotonic()
+        try:
+            response = get_llm_router().chat(
+                self.openai_client, 'cv_chunk', messages=messages, temperature=0.2, max_tokens=CV_CHUNK_MAX_TOKENS
+            )
+            record_prompt_usage('cv_chunk', messages, response)
+            partial = self._parse_chunk_content(response.choices[0].message.content)
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Chunk {index + 1}/{total} analysis failed, using local extraction: {e}")
+            metrics.incr('analysis.long_document.chunk_fallback')
+            degrade_if_expired('llm_analysis')
+            partial = self._local_chunk_analysis(chunk)
+        metrics.observe('analysis.long_document.chunk_latency', time.monotonic() - started)
+        return partial
+    
+    async def _aanalyze_chunk(self, chunk: str, index: int, total: int) -> Dict[str, Any]:
+        """Async variant of _analyze_chunk"""
+        messages = build_cv_chunk_messages(chunk, index, total)
+        started = time.monotonic()
+        try:
+            response = await get_llm_router().achat(
+                get_async_openai_client(), 'cv_chunk', messages=messages, temperature=0.2, max_tokens=CV_CHUNK_MAX_TOKENS
+            )
+            record_prompt_usage('cv_chunk', messages, response)
+            partial = self._parse_chunk_content(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Chunk {index + 1}/{total} analysis failed, using local extraction: {e}")
+            metrics.incr('analysis.long_document.chunk_fallback')
+            degrade_if_expired('llm_analysis')
+            partial = self._local_chunk_analysis(chunk)
+        metrics.observe('analysis.long_document.chunk_latency', time.monotonic() - started)
+        return partial
+    
+    def _parse_chunk_content(self, content: str) -> Dict[str, Any]:
+        json_match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', content, re.DOTALL)
+        result = json.loads(json_match.group(1) if json_match else content)
+        if not isinstance(result, dict):
+            raise ValueError('Chunk analysis is not a JSON object')
+        return result
+    
+    def _local_chunk_analysis(self, chunk: str) -> Dict[str, Any]:
+        local = self._fallback_analysis(chunk)
+        return {
+            'skills': local['skills'],
+            'experience_years': local['experience_years'] or None,
+            'local': True,
+        }
+    
+    def _reduce_chunk_analyses(self, partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-chunk facts deterministically
+        
+        List values are de-duplicated case-insensitively and ordered by the
+        number of chunks mentioning them, then by first appearance; scalar
+        facts take the highest education level, the longest stated or
+        role-derived experience and the most recent role.
+        """
+        def ranked(values):
+            counts, first, spelling = {}, {}, {}
+            for position, value in enumerate(values):
+                if not isinstance(value, str) or not value.strip():
+                    continue
+                key = value.strip().lower()
+                counts[key] = counts.get(key, 0) + 1
+                first.setdefault(key, position)
+                spelling.setdefault(key, value.strip())
+            return [spelling[key] for key in sorted(counts, key=lambda key: (-counts[key], first[key]))]
+        
+        strengths = {}
+        for partial in partials:
+            for item in partial.get('strengths') or []:
+                title = (item.get('title') if isinstance(item, dict) else item) or ''
+                if not isinstance(title, str) or not title.strip():
+                    continue
+                evidence = str(item.get('evidence') or '') if isinstance(item, dict) else ''
+                entry = strengths.setdefault(title.strip().lower(), {
+                    'title': title.strip(), 'evidence': evidence, 'count': 0, 'order': len(strengths)
+                })
+                entry['count'] += 1
+                if len(evidence) > len(entry['evidence']):
+                    entry['evidence'] = evidence
+        
+        roles = []
+        seen_roles = set()
+        for partial in partials:
+            for role in partial.get('roles') or []:
+                if not isinstance(role, dict) or not str(role.get('title') or '').strip():
+                    continue
+                start, end = self._year(role.get('start_year')), self._year(role.get('end_year'))
+                key = (str(role['title']).strip().lower(), start)
+                if key not in seen_roles:
+                    seen_roles.add(key)
+                    roles.append({'title': str(role['title']).strip(), 'start_year': start, 'end_year': end})
+        
+        current_year = timezone.now().year
+        stated_years = [
+            int(partial['experience_years']) for partial in partials
+            if isinstance(partial.get('experience_years'), (int, float)) and partial['experience_years'] > 0
+        ]
+        starts = [role['start_year'] for role in roles if role['start_year']]
+        if starts:
+            ends = [role['end_year'] or current_year for role in roles if role['start_year']]
+            stated_years.append(max(ends) - min(starts))
+        
+        # The current role has no end year; otherwise the latest one
+        current_role = None
+        if roles:
+            current_role = max(
+                roles, key=lambda role: (role['end_year'] is None, role['end_year'] or 0, role['start_year'] or 0)
+            )['title']
+        
+        levels = [self._education_rank(partial.get('education_level')) for partial in partials]
+        best_level = min((level for level in levels if level is not None), default=None)
+        
+        return {
+            'skills': ranked(skill for partial in partials for skill in partial.get('skills') or []),
+            'industries': ranked(industry for partial in partials for industry in partial.get('industries') or []),
+            'roles': roles,
+            'experience_years': max(stated_years) if stated_years else 0,
+            'education_level': EDUCATION_LEVELS[best_level][0] if best_level is not None else 'Unknown',
+            'current_role': current_role or 'Unknown',
+            'strengths': [
+                {'title': entry['title'], 'evidence': entry['evidence']}
+                for entry in sorted(strengths.values(), key=lambda entry: (-entry['count'], entry['order']))
+            ][:LONG_DOCUMENT_MAX_STRENGTHS],
+            'highlights': ranked(item for partial in partials for item in partial.get('highlights') or []),
+        }
+    
+    def _year(self, value) -> Optional[int]:
+        try:
+            year = int(str(value).strip()[:4])
+        except (TypeError, ValueError):
+            return None
+        return year if 1950 <= year <= 2100 else None
+    
+    def _education_rank(self, level) -> Optional[int]:
+        """Index of an education level in EDUCATION_LEVELS, or None if unknown"""
+        text = str(level or '').lower()
+        for rank, (_, keywords) in enumerate(EDUCATION_LEVELS):
+            if any(keyword in text for keyword in keywords):
+                return rank
+        return None
+    
+    def _synthesize_long_document(self, merged: Dict[str, Any], strict: bool = False) -> Dict[str, Any]:
+        """One short call for the summary and improvement areas of a long CV ({} on failure, raising if strict)"""
+        messages = build_cv_synthesis_messages(merged)
+        try:
+            response = get_llm_router().chat(
+                self.openai_client, 'cv_synthesis', messages=messages, temperature=0.3, max_tokens=CV_SYNTHESIS_MAX_TOKENS
+            )
+            record_prompt_usage('cv_synthesis', messages, response)
+            return self._parse_chunk_content(response.choices[0].message.content)
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Long CV synthesis failed, using merged facts only: {e}")
+            metrics.incr('analysis.long_document.synthesis_fallback')
+            degrade_if_expired('llm_analysis')
+            return {}
+    
+    async def _asynthesize_long_document(self, merged: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of _synthesize_long_document"""
+        messages = build_cv_synthesis_messages(merged)
+        try:
+            response = await get_llm_router().achat(
+                get_async_openai_client(), 'cv_synthesis', messages=messages, temperature=0.3, max_tokens=CV_SYNTHESIS_MAX_TOKENS
+            )
+            record_prompt_usage('cv_synthesis', messages, response)
+            return self._parse_chunk_content(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Long CV synthesis failed, using merged facts only: {e}")
+            metrics.incr('analysis.long_document.synthesis_fallback')
+            degrade_if_expired('llm_analysis')
+            return {}
+    
+    def _finish_long_document(self, text: str, merged: Dict[str, Any], synthesis: Dict[str, Any],
+                              partials: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+        """Build the analysis of a long CV from its merged facts and synthesis"""
+        chunk_count = len(partials)
+        areas = synthesis.get('areas_for_improvement')
+        if not isinstance(areas, list) or not areas:
+            areas = self._fallback_analysis(text)['areas_for_improvement']
+        summary = synthesis.get('summary') if isinstance(synthesis.get('summary'), str) else ''
+        analysis = {
+            'skills': merged['skills'],
+            'experience_years': merged['experience_years'],
+            'education_level': merged['education_level'],
+            'current_role': merged['current_role'],
+            'industries': merged['industries'],
+            'strengths': [
+                {
+                    'title': strength['title'],
+                    'description': strength['evidence'] or strength['title'],
+                    'evidence': strength['evidence'] or 'Based on CV analysis',
+                }
+                for strength in merged['strengths']
+            ],
+            'areas_for_improvement': areas,
+            'summary': summary or '; '.join(merged['highlights'][:3]) or text[:200],
+            'long_document': {'chunks': chunk_count, 'synthesized': bool(synthesis)},
+        }
+        
+        elapsed = time.monotonic() - started
+        metrics.incr('analysis.long_document.runs')
+        metrics.incr('analysis.long_document.chunks', chunk_count)
+        metrics.observe('analysis.long_document.latency', elapsed)
+        print(f"Long CV analysis: {len(text)} chars in {chunk_count} chunks, {elapsed:.2f}s")
+        analysis = self._normalize_analysis_format(analysis)
+        if not synthesis or any(partial.get('local') for partial in partials):
+            # Partly local: stored for enrichment to redo rather than as a full analysis
+            analysis['tier'] = 'fast'
+        return analysis
+    
+    def _llm_fallback(self, text: str) -> Dict[str, Any]:
+        """The local analysis returned when the LLM could not analyze the CV, marked with tier 'fast'"""
+        return {**self._fallback_analysis(text), 'tier': 'fast'}
     
     def _fallback_analysis(self, text: str) -> Dict[str, Any]:
         """Fallback analysis using regex patterns when AI is not available"""
@@ -402,19 +856,237 @@ class CVAnalysisService:
         
         return analysis
     
-    def analyze_cv(self, file_path: str) -> Dict[str, Any]:
-        """Main method to analyze a CV file"""
+    def analyze_cv(self, file_path: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Main method to analyze a CV file
+        
+        user_id is the CV's owner; only that user's earlier analyses are reused
+        for a near-duplicate, and anonymous analyses never reuse one.
+        """
         # Extract text
         text = self.extract_text(file_path)
         if not text:
             raise ValueError("Could not extract text from the file")
         
-        # Analyze with AI
-        analysis = self.analyze_with_ai(text)
+        # Reuse the analysis of a near-identical CV if one exists, otherwise analyze with AI
+        analysis = self._reuse_near_duplicate_analysis(text, user_id) or self.analyze_with_ai(text)
+        
+        return self._full_result(text, analysis)
+    
+    async def aanalyze_cv(self, file_path: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of analyze_cv: blocking extraction and DB lookups run in worker threads"""
+        text = await sync_to_async(self.extract_text, thread_sensitive=False)(file_path)
+        if not text:
+            raise ValueError("Could not extract text from the file")
+        
+        analysis = await sync_to_async(self._reuse_near_duplicate_analysis)(text, user_id)
+        if not analysis:
+            analysis = await self.aanalyze_with_ai(text)
+        
+        return self._full_result(text, analysis)
+    
+    def _full_result(self, text: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """The result of analyze_cv; stages cut short by the request deadline are listed as degraded"""
+        result = {
+            "text": text,
+            **analysis,
+            "tier": analysis.get("tier", "full"),
+            "section_hashes": section_hashes(split_sections(text))
+        }
+        stages = degraded_stages()
+        if stages:
+            result["degraded"] = stages
+        return result
+    
+    def _reuse_near_duplicate_analysis(self, text: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Adapt the stored analysis of a near-duplicate CV instead of calling the LLM
+        
+        Only the user's own CVs whose LLM analysis completed are reused, so no
+        personal analysis crosses users and no local fallback is copied;
+        without a user_id nothing is reused. Skills and experience detected
+        locally in this text are merged in, so small edits such as an added
+        skill or a changed year are still reflected.
+        """
+        if user_id is None or not getattr(settings, 'CV_NEAR_DUPLICATE_REUSE', True):
+            return {}
+        from .models import CVUpload
+        
+        matches = find_near_duplicates(
+            text, queryset=CVUpload.objects.filter(
+                user_id=user_id, analysis_tier='full', analysis_status='complete', analysis_blob__isnull=False
+            )
+        )
+        if not matches:
+            return {}
+        
+        match, similarity = matches[0]
+        source = CVUpload.objects.get(id=match.id)
+        analysis = {
+            key: value for key, value in source.ai_analysis.items()
+            if key not in ('tier', 'section_hashes', 'incremental', 'near_duplicate_of')
+        }
+        local = self._fallback_analysis(text)
+        known = {str(skill).lower() for skill in analysis.get('skills', [])}
+        analysis['skills'] = list(analysis.get('skills', [])) + [
+            skill for skill in local['skills'] if skill.lower() not in known
+        ]
+        if local['experience_years']:
+            analysis['experience_years'] = local['experience_years']
+        analysis['near_duplicate_of'] = {'cv_id': source.id, 'similarity': round(similarity, 3)}
+        
+        metrics.incr('analysis.near_duplicate_reused')
+        print(f"Reusing analysis of near-duplicate CV {source.id} (similarity {similarity:.2f})")
+        return analysis
+    
+    def analyze_cv_incremental(self, file_path: str, previous) -> Dict[str, Any]:
+        """Analyze a re-uploaded CV by re-analyzing only the sections that changed
+        
+        `previous` is the user's previous fully analyzed CVUpload. Unchanged
+        sections keep their prior analysis; changed and added sections are sent
+        to the LLM on their own and the partial result is merged into the prior
+        ai_analysis. Falls back to a full analysis when there is nothing to diff
+        against or most of the CV changed.
+        """
+        text = self.extract_text(file_path)
+        if not text:
+            raise ValueError("Could not extract text from the file")
+        
+        plan = self._plan_incremental_analysis(text, previous)
+        if plan['full']:
+            return {"text": text, "tier": "full", **self.analyze_with_ai(text), "section_hashes": plan['hashes']}
+        partial = self.analyze_with_ai(plan['changed_text'], partial=True) if plan['to_analyze'] else {}
+        return self._finish_incremental_analysis(text, previous, plan, partial)
+    
+    async def aanalyze_cv_incremental(self, file_path: str, previous) -> Dict[str, Any]:
+        """Async variant of analyze_cv_incremental"""
+        text = await sync_to_async(self.extract_text, thread_sensitive=False)(file_path)
+        if not text:
+            raise ValueError("Could not extract text from the file")
+        
+        # previous.ai_analysis / extracted_text may load their blobs from the database
+        plan = await sync_to_async(self._plan_incremental_analysis)(text, previous)
+        if plan['full']:
+            return {"text": text, "tier": "full", **(await self.aanalyze_with_ai(text)), "section_hashes": plan['hashes']}
+        partial = await self.aanalyze_with_ai(plan['changed_text'], partial=True) if plan['to_analyze'] else {}
+        return await sync_to_async(self._finish_incremental_analysis)(text, previous, plan, partial)
+    
+    def _plan_incremental_analysis(self, text: str, previous) -> Dict[str, Any]:
+        """Diff the sections of `text` against `previous` and decide what to re-analyze"""
+        sections = split_sections(text)
+        hashes = section_hashes(sections)
+        previous_hashes = previous.section_hashes if previous else None
+        if not previous_hashes or not previous.ai_analysis:
+            return {'full': True, 'hashes': hashes}
+        
+        diff = diff_section_hashes(previous_hashes, hashes)
+        to_analyze = set(diff['changed']) | set(diff['added'])
+        changed_text = "\n\n".join(
+            f"{name.upper()}\n{body}" for name, body in sections if name in to_analyze
+        )
+        changed_ratio = len(changed_text) / max(len(text), 1)
+        max_ratio = getattr(settings, 'CV_INCREMENTAL_MAX_CHANGED_RATIO', 0.6)
+        
+        if changed_ratio > max_ratio:
+            metrics.incr('analysis.incremental.full_reanalysis')
+            return {'full': True, 'hashes': hashes}
+        return {
+            'full': False,
+            'hashes': hashes,
+            'diff': diff,
+            'to_analyze': to_analyze,
+            'changed_text': changed_text,
+            'changed_ratio': changed_ratio,
+        }
+    
+    def _finish_incremental_analysis(self, text: str, previous, plan: Dict[str, Any],
+                                     partial: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge the analysis of the re-analyzed sections into the previous analysis"""
+        diff = plan['diff']
+        to_analyze = plan['to_analyze']
+        previous_analysis = {
+            key: value for key, value in previous.ai_analysis.items()
+            if key not in ('tier', 'section_hashes', 'incremental')
+        }
+        if to_analyze or diff['removed']:
+            previous_sections = dict(split_sections(previous.extracted_text or ''))
+            stale_text = "\n".join(
+                previous_sections.get(name, '') for name in diff['changed'] + diff['removed']
+            )
+            analysis = self._merge_partial_analysis(previous_analysis, partial, to_analyze, stale_text, text)
+        else:
+            analysis = previous_analysis
+        
+        metrics.incr('analysis.incremental.runs')
+        metrics.incr('analysis.incremental.reused_chars', len(text) - len(plan['changed_text']))
+        print(f"Incremental CV analysis: re-analyzed {sorted(to_analyze)}, "
+              f"reused {len(diff['unchanged'])} sections ({1 - plan['changed_ratio']:.0%} of text)")
+        
+        return {
+            "text": text,
+            **analysis,
+            "tier": partial.get("tier", "full"),
+            "section_hashes": plan['hashes'],
+            "incremental": {
+                "reanalyzed_sections": sorted(to_analyze),
+                "reused_sections": diff['unchanged'],
+                "removed_sections": diff['removed'],
+            }
+        }
+    
+    def _merge_partial_analysis(self, previous: Dict[str, Any], partial: Dict[str, Any],
+                                analyzed_sections: set, stale_text: str, text: str) -> Dict[str, Any]:
+        """Merge the analysis of changed sections into the previous analysis"""
+        merged = dict(previous)
+        analyzed = {base_section_name(name) for name in analyzed_sections}
+        stale_lower = stale_text.lower()
+        text_lower = text.lower()
+        
+        # Drop skills that were only mentioned in text that has since been edited away
+        skills = [
+            skill for skill in previous.get('skills', [])
+            if not (str(skill).lower() in stale_lower and str(skill).lower() not in text_lower)
+        ]
+        seen = {str(skill).lower() for skill in skills}
+        for skill in partial.get('skills', []):
+            if str(skill).lower() not in seen:
+                skills.append(skill)
+                seen.add(str(skill).lower())
+        merged['skills'] = skills
+        
+        merged['industries'] = list(dict.fromkeys(previous.get('industries', []) + partial.get('industries', [])))
+        
+        # Scalar fields come from the section that determines them
+        if analyzed & {'experience', 'header', 'summary'}:
+            if partial.get('experience_years'):
+                merged['experience_years'] = partial['experience_years']
+            if partial.get('current_role') not in (None, '', 'Unknown'):
+                merged['current_role'] = partial['current_role']
+        if 'education' in analyzed and partial.get('education_level') not in (None, '', 'Unknown'):
+            merged['education_level'] = partial['education_level']
+        if 'summary' in analyzed and partial.get('summary'):
+            merged['summary'] = partial['summary']
+        
+        # New strengths/improvement areas replace prior ones with the same title
+        for key in ('strengths', 'areas_for_improvement'):
+            items = list(partial.get(key, []))
+            titles = {str(item.get('title', '')).lower() for item in items if isinstance(item, dict)}
+            for item in previous.get(key, []):
+                if not (isinstance(item, dict) and str(item.get('title', '')).lower() in titles):
+                    items.append(item)
+            merged[key] = items
+        
+        return self._normalize_analysis_format(merged)
+    
+    def analyze_cv_fast(self, file_path: str) -> Dict[str, Any]:
+        """Analyze a CV file with local patterns only, without calling the LLM"""
+        text = self.extract_text(file_path)
+        if not text:
+            raise ValueError("Could not extract text from the file")
         
         return {
             "text": text,
-            **analysis
+            **self._fallback_analysis(text),
+            "tier": "fast",
+            "section_hashes": section_hashes(split_sections(text))
         }
 
 
@@ -425,204 +1097,302 @@ class AIAnalysisService:
         self.openai_client = self._setup_openai_client()
     
     def _setup_openai_client(self):
-        """Setup OpenAI client with Azure configuration"""
+        """Return the shared Azure OpenAI client"""
+        return get_openai_client()
+    
+    def search_and_recommend_courses(self, cv_analysis: Dict, target_job: str,
+                                     task: str = 'course_search') -> List[Dict]:
+        """Use AI to search and recommend courses based on CV analysis
+        
+        task is the LLM route; job profiles pass 'job_profile_courses' because
+        their course list is cached and shared rather than personalized.
+        """
+        if not self.openai_client or not get_llm_router().available(task):
+            print("OpenAI client not available, using fallback")
+            return []
+        if not has_time_for('course_search'):
+            return []
+        
         try:
-            if not settings.AZURE_OPENAI_API_KEY or not settings.AZURE_OPENAI_ENDPOINT:
-                print("Azure OpenAI credentials not configured")
-                return None
-            
-            if not openai:
-                print("OpenAI library not available")
-                return None
-            
-            api_version = getattr(settings, 'AZURE_OPENAI_API_VERSION', '2024-12-01-preview')
-            
-            client = openai.AzureOpenAI(
-                api_key=settings.AZURE_OPENAI_API_KEY,
-                api_version=api_version,
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT
+            response = get_llm_router().chat(
+                self.openai_client,
+                task,
+                messages=self._course_search_messages(cv_analysis, target_job),
+                temperature=0.7,
+                max_tokens=COURSE_SEARCH_MAX_TOKENS
             )
-            return client
+            return self._parse_course_content(response.choices[0].message.content)
+            
+        except LLMUnavailableError as e:
+            print(f"LLM unavailable, skipping AI course search: {e}")
+            degrade_if_expired('course_search')
+            return []
         except Exception as e:
-            print(f"Error setting up OpenAI client: {e}")
-            return None
+            print(f"Error in AI course search: {e}")
+            degrade_if_expired('course_search')
+            import traceback
+            traceback.print_exc()
+            return []
     
-    def search_and_recommend_courses(self, cv_analysis: Dict, target_job: str) -> List[Dict]:
-        """Use AI to search and recommend courses based on CV analysis"""
-        if not self.openai_client:
+    async def asearch_and_recommend_courses(self, cv_analysis: Dict, target_job: str,
+                                            task: str = 'course_search') -> List[Dict]:
+        """Async variant of search_and_recommend_courses"""
+        client = get_async_openai_client()
+        if not client or not get_llm_router().available(task):
             print("OpenAI client not available, using fallback")
             return []
+        if not has_time_for('course_search'):
+            return []
         
         try:
-            # Extract key information for course search
-            skills = cv_analysis.get('skills', [])
-            strengths = cv_analysis.get('strengths', [])
-            improvement_areas = cv_analysis.get('areas_for_improvement', [])
-            current_role = cv_analysis.get('current_role', '')
-            experience_years = cv_analysis.get('experience_years', 0)
-            
-            prompt = f"""
-            You are a career advisor helping someone transition to the role of "{target_job}".
-            
-            CV Analysis:
-            - Current Role: {current_role}
-            - Experience: {experience_years} years
-            - Existing Skills: {', '.join(skills[:15]) if skills else 'Not specified'}
-            - Strengths: {', '.join(strengths[:5]) if strengths else 'Not specified'}
-            - Areas for Improvement: {', '.join(improvement_areas[:5]) if improvement_areas else 'Not specified'}
-            - TARGET POSITION: {target_job}
-            
-            CRITICAL: Recommend 10-15 SPECIFIC online courses that are ESSENTIAL for the "{target_job}" role.
-            These courses must directly prepare the candidate for this specific position.
-            
-            Research and recommend REAL courses from platforms like:
-            - Coursera (including professional certificates)
-            - Udemy
-            - edX
-            - Pluralsight
-            - LinkedIn Learning
-            - Google Career Certificates
-            - AWS/Azure training
-            - Other reputable platforms
-            
-            Focus on:
-            1. Core skills REQUIRED for "{target_job}" role
-            2. Skills that bridge gaps between current role and target role
-            3. Industry-standard certifications and credentials for this position
-            4. Practical, hands-on courses that build job-ready skills
-            5. Courses that address the specific improvement areas identified
-            
-            Return a JSON array with this EXACT structure (no markdown, pure JSON):
-            [
-                {{
-                    "id": "course-1",
-                    "title": "Exact Course Title",
-                    "provider": "Platform Name",
-                    "url": "https://actual-course-url.com",
-                    "skills": ["specific", "job-relevant", "skills"],
-                    "level": "Beginner" or "Intermediate" or "Advanced",
-                    "duration": "Xh" or "X weeks",
-                    "rating": 4.5,
-                    "price": "$XX.XX" or "Free",
-                    "isFree": true or false,
-                    "description": "How this course helps achieve the {target_job} role"
-                }}
-            ]
-            
-            Requirements:
-            - ALL courses must be directly relevant to "{target_job}"
-            - Include courses for core competencies of this role
-            - Prioritize courses that address skill gaps
-            - Mix foundational and advanced courses
-            - Include certification prep courses if relevant
-            - Return ONLY valid JSON array, no explanations or markdown
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model=settings.AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {"role": "system", "content": "You are an expert career advisor. Recommend real online courses from popular platforms. Return only valid JSON arrays."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await get_llm_router().achat(
+                client,
+                task,
+                messages=self._course_search_messages(cv_analysis, target_job),
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=COURSE_SEARCH_MAX_TOKENS
             )
+            return self._parse_course_content(response.choices[0].message.content)
             
-            content = response.choices[0].message.content.strip()
-            print(f"AI Course Search Response: {content[:200]}...")
+        except LLMUnavailableError as e:
+            print(f"LLM unavailable, skipping AI course search: {e}")
+            degrade_if_expired('course_search')
+            return []
+        except Exception as e:
+            print(f"Error in AI course search: {e}")
+            degrade_if_expired('course_search')
+            return []
+    
+    def _course_search_messages(self, cv_analysis: Dict, target_job: str) -> List[Dict[str, str]]:
+        """Build the chat messages for the AI course search"""
+        # Extract key information for course search
+        skills = cv_analysis.get('skills', [])
+        # Strengths and improvement areas are normalized to dicts; only their titles go in the prompt
+        strengths = [item.get('title', '') if isinstance(item, dict) else str(item) for item in cv_analysis.get('strengths', [])]
+        improvement_areas = [item.get('title', '') if isinstance(item, dict) else str(item) for item in cv_analysis.get('areas_for_improvement', [])]
+        current_role = cv_analysis.get('current_role', '')
+        experience_years = cv_analysis.get('experience_years', 0)
+        
+        prompt = f"""
+        You are a career advisor helping someone transition to the role of "{target_job}".
+        
+        CV Analysis:
+        - Current Role: {current_role}
+        - Experience: {experience_years} years
+        - Existing Skills: {', '.join(skills[:15]) if skills else 'Not specified'}
+        - Strengths: {', '.join(strengths[:5]) if strengths else 'Not specified'}
+        - Areas for Improvement: {', '.join(improvement_areas[:5]) if improvement_areas else 'Not specified'}
+        - TARGET POSITION: {target_job}
+        
+        CRITICAL: Recommend 10-15 SPECIFIC online courses that are ESSENTIAL for the "{target_job}" role.
+        These courses must directly prepare the candidate for this specific position.
+        
+        Research and recommend REAL courses from platforms like:
+        - Coursera (including professional certificates)
+        - Udemy
+        - edX
+        - Pluralsight
+        - LinkedIn Learning
+        - Google Career Certificates
+        - AWS/Azure training
+        - Other reputable platforms
+        
+        Focus on:
+        1. Core skills REQUIRED for "{target_job}" role
+        2. Skills that bridge gaps between current role and target role
+        3. Industry-standard certifications and credentials for this position
+        4. Practical, hands-on courses that build job-ready skills
+        5. Courses that address the specific improvement areas identified
+        
+        Return a JSON array with this EXACT structure (no markdown, pure JSON):
+        [
+            {{
+                "id": "course-1",
+                "title": "Exact Course Title",
+                "provider": "Platform Name",
+                "url": "https://actual-course-url.com",
+                "skills": ["specific", "job-relevant", "skills"],
+                "level": "Beginner" or "Intermediate" or "Advanced",
+                "duration": "Xh" or "X weeks",
+                "rating": 4.5,
+                "price": "$XX.XX" or "Free",
+                "isFree": true or false,
+                "description": "How this course helps achieve the {target_job} role"
+            }}
+        ]
+        
+        Requirements:
+        - ALL courses must be directly relevant to "{target_job}"
+        - Include courses for core competencies of this role
+        - Prioritize courses that address skill gaps
+        - Mix foundational and advanced courses
+        - Include certification prep courses if relevant
+        - Return ONLY valid JSON array, no explanations or markdown
+        """
+        
+        return [
+            {"role": "system", "content": "You are an expert career advisor. Recommend real online courses from popular platforms. Return only valid JSON arrays."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _parse_course_content(self, content: str) -> List[Dict]:
+        """Parse the model's course list, returning [] if it is unusable"""
+        content = content.strip()
+        print(f"AI Course Search Response: {content[:200]}...")
+        
+        # Try to parse JSON response
+        try:
+            # Remove markdown code blocks if present
+            import re
+            json_match = re.search(r'```(?:json)?\s*(\[.*\])\s*```', content, re.DOTALL)
+            if json_match:
+                content = json_match.group(1)
             
-            # Try to parse JSON response
-            try:
-                # Remove markdown code blocks if present
-                import re
-                json_match = re.search(r'```(?:json)?\s*(\[.*\])\s*```', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group(1)
-                
-                courses = json.loads(content)
-                if isinstance(courses, list) and len(courses) > 0:
-                    print(f"Successfully parsed {len(courses)} courses from AI")
-                    return courses
-                else:
-                    print("AI returned empty or invalid course list")
-                    return []
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse AI course recommendations as JSON: {e}")
-                print(f"Raw response: {content}")
+            courses = json.loads(content)
+            if isinstance(courses, list) and len(courses) > 0:
+                print(f"Successfully parsed {len(courses)} courses from AI")
+                return courses
+            else:
+                print("AI returned empty or invalid course list")
                 return []
-            
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse AI course recommendations as JSON: {e}")
+            print(f"Raw response: {content}")
+            return []
+    
+    def rerank_courses(self, cv_analysis: Dict, target_job: str, courses: List[Dict]) -> List[Dict]:
+        """Re-rank a catalog shortlist with the LLM, keeping the original order on failure"""
+        if not self.openai_client or not get_llm_router().available('course_rerank') or not has_time_for('course_rerank'):
+            return courses
+        
+        try:
+            messages = build_course_rerank_messages(cv_analysis, target_job, courses)
+            response = get_llm_router().chat(
+                self.openai_client,
+                'course_rerank',
+                messages=messages,
+                temperature=0,
+                max_tokens=COURSE_RERANK_MAX_TOKENS
+            )
+            record_prompt_usage('course_rerank', messages, response)
+            return self._apply_course_ranking(courses, response.choices[0].message.content)
         except Exception as e:
-            print(f"Error in AI course search: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error re-ranking courses: {e}")
+            return courses
+    
+    async def arerank_courses(self, cv_analysis: Dict, target_job: str, courses: List[Dict]) -> List[Dict]:
+        """Async variant of rerank_courses"""
+        client = get_async_openai_client()
+        if not client or not get_llm_router().available('course_rerank') or not has_time_for('course_rerank'):
+            return courses
+        
+        try:
+            messages = build_course_rerank_messages(cv_analysis, target_job, courses)
+            response = await get_llm_router().achat(
+                client,
+                'course_rerank',
+                messages=messages,
+                temperature=0,
+                max_tokens=COURSE_RERANK_MAX_TOKENS
+            )
+            record_prompt_usage('course_rerank', messages, response)
+            return self._apply_course_ranking(courses, response.choices[0].message.content)
+        except Exception as e:
+            print(f"Error re-ranking courses: {e}")
+            return courses
+    
+    def _apply_course_ranking(self, courses: List[Dict], content: str) -> List[Dict]:
+        """Order courses by the ids the model returned; unranked courses keep their order at the end"""
+        match = re.search(r'\[.*\]', content or '', re.DOTALL)
+        ranking = json.loads(match.group(0)) if match else []
+        by_id = {str(course['id']): course for course in courses}
+        ranked = []
+        for course_id in ranking:
+            course = by_id.pop(str(course_id), None)
+            if course:
+                ranked.append(course)
+        metrics.incr('course_search.reranked')
+        return ranked + [course for course in courses if str(course['id']) in by_id]
+    
+    def job_required_skills(self, job_title: str) -> List[str]:
+        """Ask the LLM for the skills a job title requires; [] if unavailable"""
+        if not self.openai_client or not get_llm_router().available('job_profile'):
+            return []
+        
+        try:
+            messages = build_job_profile_messages(job_title)
+            response = get_llm_router().chat(
+                self.openai_client,
+                'job_profile',
+                messages=messages,
+                temperature=0,
+                max_tokens=COURSE_RERANK_MAX_TOKENS
+            )
+            record_prompt_usage('job_profile', messages, response)
+            match = re.search(r'\[.*\]', response.choices[0].message.content or '', re.DOTALL)
+            skills = json.loads(match.group(0)) if match else []
+            return [str(skill).strip().lower() for skill in skills if str(skill).strip()]
+        except Exception as e:
+            print(f"Error listing skills for {job_title}: {e}")
             return []
     
     def generate_career_plan(self, cv_analysis: Dict, user_responses: List[Dict]) -> Dict[str, Any]:
-        """Generate a personalized career plan based on CV analysis and user responses"""
-        if not self.openai_client:
+        """Generate a personalized career plan based on CV analysis and user responses
+        
+        With CAREER_PLAN_MODE 'local' the local planner's plan is returned
+        without calling the LLM; with 'refine' the LLM improves that plan
+        instead of writing one from scratch.
+        """
+        mode = career_plan_mode()
+        if mode == 'local' or not self.openai_client or not get_llm_router().available('career_plan'):
             return self._fallback_career_plan(cv_analysis, user_responses)
+        draft = build_local_career_plan(cv_analysis, user_responses) if mode == 'refine' else None
         
         try:
-            prompt = f"""
-            Based on the following CV analysis and user responses, create a comprehensive career development plan.
+            messages = build_career_plan_messages(cv_analysis, user_responses, draft)
             
-            CV Analysis:
-            {json.dumps(cv_analysis, indent=2)}
+            response = get_llm_router().chat(
+                self.openai_client,
+                'career_plan',
+                messages=messages,
+                temperature=0.7,
+                max_tokens=2000
+            )
+            record_prompt_usage('career_plan', messages, response)
             
-            User Responses:
-            {json.dumps(user_responses, indent=2)}
+            result = json.loads(response.choices[0].message.content)
+            return result
             
-            Return a JSON response with this structure:
-            {{
-                "career_goals": ["goal1", "goal2", ...],
-                "skill_gaps": [
-                    {{"skill": "skill_name", "current_level": "beginner/intermediate/advanced", "target_level": "intermediate/advanced/expert", "priority": "high/medium/low"}}
-                ],
-                "learning_path": [
-                    {{"title": "Learning item", "type": "course/certification/practice", "duration": "X weeks", "priority": "high/medium/low", "description": "..."}}
-                ],
-                "timeline": {{
-                    "short_term": ["action1", "action2", ...],
-                    "medium_term": ["action1", "action2", ...],
-                    "long_term": ["action1", "action2", ...]
-                }},
-                "recommendations": ["recommendation1", "recommendation2", ...]
-            }}
-            """
+        except Exception as e:
+            print(f"Error generating career plan: {e}")
+            return draft or self._fallback_career_plan(cv_analysis, user_responses)
+    
+    async def agenerate_career_plan(self, cv_analysis: Dict, user_responses: List[Dict]) -> Dict[str, Any]:
+        """Async variant of generate_career_plan"""
+        client = get_async_openai_client()
+        mode = career_plan_mode()
+        if mode == 'local' or not client or not get_llm_router().available('career_plan'):
+            return await sync_to_async(self._fallback_career_plan)(cv_analysis, user_responses)
+        draft = await sync_to_async(build_local_career_plan)(cv_analysis, user_responses) if mode == 'refine' else None
+        
+        try:
+            messages = build_career_plan_messages(cv_analysis, user_responses, draft)
             
-            response = self.openai_client.chat.completions.create(
-                model=settings.AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {"role": "system", "content": "You are an expert career counselor. Create detailed, actionable career development plans."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await get_llm_router().achat(
+                client,
+                'career_plan',
+                messages=messages,
                 temperature=0.7,
                 max_tokens=2000
             )
+            record_prompt_usage('career_plan', messages, response)
             
-            result = json.loads(response.choices[0].message.content)
-            return result
+            return json.loads(response.choices[0].message.content)
             
         except Exception as e:
             print(f"Error generating career plan: {e}")
-            return self._fallback_career_plan(cv_analysis, user_responses)
+            return draft or await sync_to_async(self._fallback_career_plan)(cv_analysis, user_responses)
     
     def _fallback_career_plan(self, cv_analysis: Dict, user_responses: List[Dict]) -> Dict[str, Any]:
-        """Fallback career plan when AI is not available"""
-        return {
-            "career_goals": ["Advance in current field", "Develop new skills", "Increase marketability"],
-            "skill_gaps": [
-                {"skill": "Communication", "current_level": "intermediate", "target_level": "advanced", "priority": "high"},
-                {"skill": "Leadership", "current_level": "beginner", "target_level": "intermediate", "priority": "medium"}
-            ],
-            "learning_path": [
-                {"title": "Communication Skills Course", "type": "course", "duration": "4 weeks", "priority": "high", "description": "Improve verbal and written communication"},
-                {"title": "Leadership Workshop", "type": "course", "duration": "6 weeks", "priority": "medium", "description": "Develop leadership and management skills"}
-            ],
-            "timeline": {
-                "short_term": ["Complete communication course", "Update LinkedIn profile"],
-                "medium_term": ["Take on leadership role", "Network with industry professionals"],
-                "long_term": ["Apply for senior positions", "Consider advanced certifications"]
-            },
-            "recommendations": ["Focus on skill development", "Build professional network", "Stay updated with industry trends"]
-        }
+        """Career plan from the local planner when AI is not available (see career_planner.py)"""
+        return build_local_career_plan(cv_analysis, user_responses)
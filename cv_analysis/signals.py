@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import CVUpload
+from .near_duplicates import index_cv_upload
+
+
+@receiver(post_save, sender=CVUpload)
+def update_near_duplicate_index(sender, instance, **kwargs):
+    """Keep the MinHash/LSH index in step with the CV's extracted text
+    
+    Only saves that change the text blob reindex: status, tier and analysis
+    updates would otherwise recompute the signature of an unchanged text.
+    """
+    if kwargs.get('raw'):
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'text_blob' not in update_fields:
+        return
+    if instance.text_blob_id == getattr(instance, '_indexed_text_blob_id', object()):
+        return
+    index_cv_upload(instance)
+    instance._indexed_text_blob_id = instance.text_blob_id
@@ -0,0 +1,218 @@
+"""
+Single-flight coalescing of identical in-flight computations.
+
+Concurrent calls with the same key share one computation: within a process
+the followers wait on the leader's result, and across gunicorn workers a
+per-key file lock serializes the callers while the leader publishes its
+result to a short-lived result file that the waiting workers read instead
+of recomputing. Results must be JSON-serializable.
+
+The async variant (ado) coalesces callers within one event loop only.
+
+A caller that waits for another's computation gives up after `timeout`
+seconds (e.g. what is left of its request deadline) with
+SingleFlightTimeout; the computation itself goes on for the others.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+from django.conf import settings
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .metrics import metrics
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Waiting for an identical in-flight computation took longer than the caller's timeout"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key"""
+
+    def __init__(self, directory: Optional[str] = None, result_ttl: float = 30.0, wait_timeout: float = 120.0):
+        self.directory = directory
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a key from the content hash and request parameters"""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _wait_limit(self, timeout: Optional[float]) -> float:
+        if timeout is None:
+            return self.wait_timeout
+        return max(0.0, min(timeout, self.wait_timeout))
+
+    def _timed_out(self) -> SingleFlightTimeout:
+        metrics.incr('singleflight.wait_timeout')
+        return SingleFlightTimeout("Timed out waiting for an identical in-flight request")
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn once per key among concurrent callers and return its result to all of them
+
+        Waiting for another caller's computation takes at most timeout
+        seconds (wait_timeout without one), then raises SingleFlightTimeout.
+        """
+        wait_limit = self._wait_limit(timeout)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.incr('singleflight.coalesced_local')
+            if not call.done.wait(wait_limit):
+                raise self._timed_out()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_across_workers(key, fn, wait_limit)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.done.set()
+            with self._lock:
+                self._calls.pop(key, None)
+        return call.result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Async variant of do(): await fn() once per key among concurrent callers in this event loop"""
+        future = self._async_calls.get(key)
+        if future is not None:
+            metrics.incr('singleflight.coalesced_local')
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self._wait_limit(timeout))
+            except asyncio.TimeoutError:
+                raise self._timed_out()
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = future
+        metrics.incr('singleflight.leader')
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no follower is waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._async_calls.pop(key, None)
+
+    def _directory(self) -> str:
+        directory = self.directory or os.path.join(tempfile.gettempdir(), 'careercoach-singleflight')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _paths(self, key: str):
+        directory = self._directory()
+        return os.path.join(directory, f'{key}.lock'), os.path.join(directory, f'{key}.json')
+
+    def _read_fresh_result(self, result_path: str):
+        try:
+            if time.time() - os.path.getmtime(result_path) > self.result_ttl:
+                os.unlink(result_path)
+                return None
+            with open(result_path, 'r', encoding='utf-8') as result_file:
+                return json.load(result_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, result_path: str, result: Any) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(result_path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump({'result': result}, tmp_file)
+            os.replace(tmp_path, result_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Single-flight could not publish result: {e}")
+
+    def cleanup(self, max_age: float = 3600.0) -> int:
+        """Remove lock and result files untouched for max_age seconds; returns the number removed"""
+        directory = self._directory()
+        removed = 0
+        cutoff = time.time() - max_age
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _do_across_workers(self, key: str, fn: Callable[[], Any], wait_limit: float) -> Any:
+        if fcntl is None:
+            metrics.incr('singleflight.leader')
+            return fn()
+
+        lock_path, result_path = self._paths(key)
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Another worker is computing this key: wait for it to finish
+                deadline = time.monotonic() + wait_limit
+                while True:
+                    try:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        if time.monotonic() >= deadline:
+                            raise self._timed_out()
+                        time.sleep(0.1)
+            try:
+                published = self._read_fresh_result(result_path)
+                if published is not None:
+                    metrics.incr('singleflight.coalesced_remote')
+                    return published['result']
+                metrics.incr('singleflight.leader')
+                result = fn()
+                self._write_result(result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(
+            directory=getattr(settings, 'SINGLE_FLIGHT_DIR', None),
+            result_ttl=getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 30.0),
+        )
+    return _single_flight
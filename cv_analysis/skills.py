@@ -0,0 +1,211 @@
+"""
+Canonical skill dimension.
+
+Free-text skill names from CV analyses, course catalog entries and career
+plan skill gaps are normalized and resolved through SkillAlias to one Skill
+row, then linked with the CVSkill / CourseSkill through-tables and the
+SkillGap.skill foreign key. Questions such as "which users have Kubernetes"
+or "most common skill gaps" are then indexed joins on skill ids instead of
+scans over JSON lists.
+"""
+import re
+from typing import Any, Dict, Iterable, List
+from django.db.models import Count, F
+
+from .metrics import metrics
+
+
+# Known spellings of a skill -> canonical name; other names are their own canonical form
+SKILL_ALIASES = {
+    'k8s': 'kubernetes',
+    'js': 'javascript',
+    'ecmascript': 'javascript',
+    'ts': 'typescript',
+    'py': 'python',
+    'python3': 'python',
+    'golang': 'go',
+    'postgres': 'postgresql',
+    'psql': 'postgresql',
+    'mongo': 'mongodb',
+    'node': 'node.js',
+    'nodejs': 'node.js',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'amazon web services': 'aws',
+    'gcp': 'google cloud',
+    'google cloud platform': 'google cloud',
+    'ms azure': 'azure',
+    'microsoft azure': 'azure',
+    'ml': 'machine learning',
+    'dl': 'deep learning',
+    'ai': 'artificial intelligence',
+    'nlp': 'natural language processing',
+    'ci cd': 'ci/cd',
+    'cicd': 'ci/cd',
+    'continuous integration': 'ci/cd',
+    'ms excel': 'excel',
+    'microsoft excel': 'excel',
+    'c sharp': 'c#',
+    'cpp': 'c++',
+    'html5': 'html',
+    'css3': 'css',
+    'rest': 'apis',
+    'rest apis': 'apis',
+    'restful apis': 'apis',
+    'api': 'apis',
+}
+
+MAX_SKILL_LENGTH = 100
+
+
+def normalize_skill_name(name: str) -> str:
+    """Lower-case and collapse a skill name ("  React.JS " -> "react.js")"""
+    text = re.sub(r'\s+', ' ', str(name or '').strip().lower())
+    return text.strip(' .,;:-')[:MAX_SKILL_LENGTH]
+
+
+def canonical_skill_name(name: str) -> str:
+    """Canonical name of a skill without touching the database"""
+    normalized = normalize_skill_name(name)
+    return SKILL_ALIASES.get(normalized, normalized)
+
+
+def skill_names(values: Iterable[Any]) -> List[str]:
+    """Skill names from an analysis skill list (strings or {'name'|'skill'|'title': ...} dicts)"""
+    names = []
+    for value in values or []:
+        if isinstance(value, dict):
+            value = value.get('name') or value.get('skill') or value.get('title') or ''
+        if isinstance(value, str) and value.strip():
+            names.append(value.strip())
+    return names
+
+
+def resolve_skills(names: Iterable[str], create: bool = True) -> Dict[str, Any]:
+    """Map normalized skill names to Skill rows, creating unknown skills and aliases
+
+    Returns {normalized name: Skill}; with create=False unknown names are left out.
+    """
+    from .models import Skill, SkillAlias
+
+    originals = {}
+    for name in names:
+        normalized = normalize_skill_name(name)
+        if normalized:
+            originals.setdefault(normalized, name.strip())
+    if not originals:
+        return {}
+
+    resolved = {
+        link.alias: link.skill
+        for link in SkillAlias.objects.filter(alias__in=list(originals)).select_related('skill')
+    }
+    missing = [normalized for normalized in originals if normalized not in resolved]
+    if missing and create:
+        canonical = {normalized: SKILL_ALIASES.get(normalized, normalized) for normalized in missing}
+        # ignore_conflicts keeps concurrent resolution of the same new skill safe
+        Skill.objects.bulk_create(
+            [Skill(name=name, display_name=(originals[normalized] if name == normalized else name)[:MAX_SKILL_LENGTH])
+             for normalized, name in canonical.items()],
+            ignore_conflicts=True,
+        )
+        skills = Skill.objects.in_bulk(set(canonical.values()), field_name='name')
+        aliases = {(normalized, name) for normalized, name in canonical.items()}
+        aliases.update((name, name) for name in canonical.values())
+        SkillAlias.objects.bulk_create(
+            [SkillAlias(alias=alias, skill=skills[name]) for alias, name in aliases],
+            ignore_conflicts=True,
+        )
+        metrics.incr('skills.created', len(missing))
+        for normalized, name in canonical.items():
+            resolved[normalized] = skills[name]
+    return resolved
+
+
+def resolve_skill(name: str):
+    """Return the Skill for one name, or None for an empty name"""
+    normalized = normalize_skill_name(name)
+    return resolve_skills([name]).get(normalized) if normalized else None
+
+
+def skill_ids(names: Iterable[str]) -> List[int]:
+    """Ids of the known skills among names, for joins in recommenders and analytics"""
+    return sorted({skill.id for skill in resolve_skills(names, create=False).values()})
+
+
+def link_cv_skills(cv_upload) -> int:
+    """Replace the CVSkill links of a CV with the skills of its analysis"""
+    from .models import CVSkill
+
+    ids = {skill.id for skill in resolve_skills(skill_names(cv_upload.skills)).values()}
+    CVSkill.objects.filter(cv_upload=cv_upload).exclude(skill_id__in=ids).delete()
+    CVSkill.objects.bulk_create(
+        [CVSkill(cv_upload=cv_upload, skill_id=skill_id) for skill_id in ids],
+        ignore_conflicts=True,
+    )
+    return len(ids)
+
+
+def link_course_skills(courses) -> int:
+    """Replace the CourseSkill links of catalog courses with their listed skills"""
+    from .models import CourseSkill
+
+    courses = list(courses)
+    resolved = resolve_skills(name for course in courses for name in skill_names(course.skills))
+    links = []
+    for course in courses:
+        for name in skill_names(course.skills):
+            links.append(CourseSkill(course_id=course.id, skill=resolved[normalize_skill_name(name)]))
+    CourseSkill.objects.filter(course__in=[course.id for course in courses]).delete()
+    CourseSkill.objects.bulk_create(links, ignore_conflicts=True)
+    return len(links)
+
+
+def users_with_skill(name: str):
+    """Users with at least one analyzed CV listing the skill"""
+    from django.contrib.auth.models import User
+
+    ids = skill_ids([name])
+    if not ids:
+        return User.objects.none()
+    return User.objects.filter(cv_uploads__skill_links__skill_id__in=ids).distinct()
+
+
+def most_common_skills(limit: int = 20) -> List[Dict[str, Any]]:
+    """Skills found in the most users' CVs"""
+    from .models import Skill
+
+    return list(
+        Skill.objects.annotate(users=Count('cv_links__cv_upload__user', distinct=True))
+        .filter(users__gt=0)
+        .order_by('-users', 'name')
+        .values('id', 'name', 'display_name', 'users')[:limit]
+    )
+
+
+def most_common_gaps(limit: int = 20) -> List[Dict[str, Any]]:
+    """Skills that appear most often as career plan skill gaps"""
+    from .models import Skill
+
+    return list(
+        Skill.objects.annotate(gaps=Count('skill_gaps'))
+        .filter(gaps__gt=0)
+        .order_by('-gaps', 'name')
+        .values('id', 'name', 'display_name', 'gaps')[:limit]
+    )
+
+
+def courses_for_skills(ids: Iterable[int], limit: int = 10):
+    """Active catalog courses teaching the most of the given skills"""
+    from .models import Course
+
+    ids = list(ids)
+    if not ids:
+        return []
+    return list(
+        Course.objects.filter(is_active=True, skill_links__skill_id__in=ids)
+        .annotate(matched_skills=Count('skill_links', distinct=True))
+        .order_by('-matched_skills', F('rating').desc(nulls_last=True), 'title')[:limit]
+    )
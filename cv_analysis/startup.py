@@ -0,0 +1,139 @@
+"""
+Worker startup prewarming and readiness.
+
+Importing the document parsers and the openai package, creating the LLM
+client and loading the course index take a second or more. prewarm() does
+that work once per process, before the worker takes traffic:
+
+* under gunicorn the post_worker_init hook (gunicorn.conf.py,
+  gunicorn_asgi.conf.py) runs it before the worker accepts connections;
+* under other servers (runserver, plain uvicorn) the first readiness probe
+  starts it in a background thread and /readyz reports 503 until it is done.
+
+The time from worker start to ready is recorded as the startup.cold_start
+timing. Once ready, the worker starts exporting its metrics for /metrics/
+(see metrics_export.py).
+"""
+import importlib
+import threading
+import time
+from typing import Any, Dict, Optional
+from django.db import connections
+
+from .metrics import metrics
+from .metrics_export import start_metrics_export
+
+
+PROCESS_STARTED = time.monotonic()
+
+_lock = threading.Lock()
+_background = None
+_state = {
+    'ready': False,
+    'cold_start_seconds': None,
+    'steps': {},
+    'errors': {},
+}
+
+
+def _warm_parsers() -> None:
+    from . import word_text  # noqa: F401
+
+    try:
+        importlib.import_module('PyPDF2')
+    except ImportError:
+        print("Prewarm: PyPDF2 is not installed")
+
+
+def _warm_llm_clients() -> None:
+    from django.conf import settings
+    from .llm_gateway import get_llm_gateway
+    from .services import get_async_openai_client, get_openai_client
+
+    for name in getattr(settings, 'LLM_DEPLOYMENTS', {}) or [None]:
+        get_llm_gateway(name)
+    get_openai_client()
+    get_async_openai_client()
+
+
+def _warm_skill_taxonomy() -> None:
+    from .job_profiles import normalize_job_title
+    from .skills import canonical_skill_name
+
+    normalize_job_title('Senior Software Engineer')
+    canonical_skill_name('k8s')
+
+
+def _warm_course_index() -> None:
+    from .course_catalog import get_course_index
+
+    index = get_course_index()
+    if index is not None:
+        index.warm()
+
+
+PREWARM_STEPS = [
+    ('parsers', _warm_parsers),
+    ('llm_client', _warm_llm_clients),
+    ('skill_taxonomy', _warm_skill_taxonomy),
+    ('course_index', _warm_course_index),
+]
+
+
+def prewarm(started: Optional[float] = None) -> Dict[str, Any]:
+    """Run the prewarm steps once per process and mark it ready
+
+    started is the monotonic time the worker process started (defaults to
+    the import time of this module).
+    """
+    with _lock:
+        if _state['ready']:
+            return startup_status()
+
+        began = time.monotonic()
+        for name, step in PREWARM_STEPS:
+            step_started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                # A failed step only means its work happens on the first request instead
+                _state['errors'][name] = str(e)
+                print(f"Prewarm step {name} failed: {e}")
+            elapsed = time.monotonic() - step_started
+            _state['steps'][name] = round(elapsed, 4)
+            metrics.observe(f'startup.prewarm.{name}', elapsed)
+        # Connections opened here belong to the startup thread, not to a request
+        connections.close_all()
+        start_metrics_export()
+
+        cold_start = time.monotonic() - (started if started is not None else PROCESS_STARTED)
+        metrics.observe('startup.prewarm', time.monotonic() - began)
+        metrics.observe('startup.cold_start', cold_start)
+        _state['cold_start_seconds'] = round(cold_start, 4)
+        _state['ready'] = True
+        print(f"Worker ready in {cold_start:.2f}s (prewarm {time.monotonic() - began:.2f}s)")
+    return startup_status()
+
+
+def start_background_prewarm() -> None:
+    """Prewarm in a background thread unless it already ran or is running"""
+    global _background
+    with _lock:
+        if _state['ready'] or (_background is not None and _background.is_alive()):
+            return
+        _background = threading.Thread(target=prewarm, name='prewarm', daemon=True)
+        _background.start()
+
+
+def is_ready() -> bool:
+    return _state['ready']
+
+
+def startup_status() -> Dict[str, Any]:
+    return {
+        'ready': _state['ready'],
+        'uptime_seconds': round(time.monotonic() - PROCESS_STARTED, 1),
+        'cold_start_seconds': _state['cold_start_seconds'],
+        'prewarm_steps': dict(_state['steps']),
+        'prewarm_errors': dict(_state['errors']),
+    }
@@ -0,0 +1,586 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .analysis_sessions import hash_uploaded_file
+from .cv_packing import analyze_packed
+from .enrichment import enrich_cv_upload, save_analysis
+from .llm_gateway import AdaptiveConcurrencyLimiter, LLMUnavailableError, reset_llm_gateways
+from . import llm_hedging, near_duplicates
+from .metrics import metrics
+from .models import CVUpload
+from .sections import section_hashes, split_sections
+from .services import CVAnalysisService
+from .singleflight import SingleFlight, get_single_flight
+from .word_text import extract_docx_text
+
+
+CV_TEXT = "Jane Doe\nEXPERIENCE\nBackend engineer, 5 years\nSKILLS\nPython, Docker, SQL\n"
+LLM_ANALYSIS = {
+    'skills': ['Python', 'Docker', 'SQL'], 'experience_years': 5, 'education_level': 'Unknown',
+    'current_role': 'Backend engineer', 'industries': ['Software'], 'strengths': [],
+    'areas_for_improvement': [], 'summary': 'Backend engineer with five years of experience',
+}
+
+
+def llm_response(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def llm_router(content=None, error=None):
+    """A router whose routes are available and answer with content, or raise error"""
+    router = mock.Mock()
+    router.available.return_value = True
+    router.chat.side_effect = error
+    router.chat.return_value = llm_response(content)
+    router.achat = mock.AsyncMock(side_effect=error, return_value=llm_response(content))
+    return router
+
+
+class AsyncAnalyzeReturningUserTests(TransactionTestCase):
+    """The async analysis endpoint diffs a re-upload against the user's previous full analysis"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, AZURE_OPENAI_API_KEY='', CV_NEAR_DUPLICATE_REUSE=False
+        )
+        self.settings_override.enable()
+        reset_llm_gateways()
+        self.user = User.objects.create_user('returning', 'returning@example.com', 'password')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    @mock.patch('cv_analysis.services.get_async_openai_client', return_value=object())
+    @mock.patch('cv_analysis.services.get_llm_router', return_value=llm_router(json.dumps(LLM_ANALYSIS)))
+    async def test_reupload_is_analyzed_incrementally(self, router, client_factory):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+
+        first = await client.post('/api/cv/api/analyze/async/', {
+            'file': SimpleUploadedFile('cv.txt', CV_TEXT.encode('utf-8'))
+        })
+        self.assertEqual(first.status_code, 200, first.content)
+
+        edited = CV_TEXT.replace('Docker', 'Kubernetes')
+        second = await client.post('/api/cv/api/analyze/async/', {
+            'file': SimpleUploadedFile('cv.txt', edited.encode('utf-8'))
+        })
+        self.assertEqual(second.status_code, 200, second.content)
+        self.assertTrue(second.json()['success'])
+        self.assertEqual(await CVUpload.objects.filter(user=self.user, analysis_tier='full').acount(), 2)
+
+
+@override_settings(CV_UPLOAD_MAX_BYTES=64 * 1024)
+class UploadFormSizeLimitTests(TestCase):
+    """Oversized uploads to the CSRF-protected form are reported by the view, not rejected by CSRF"""
+
+    def test_oversized_upload_shows_size_error(self):
+        user = User.objects.create_user('uploader', 'uploader@example.com', 'password')
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user)
+        client.get('/upload-cv/')
+        token = client.cookies['csrftoken'].value
+
+        oversized = SimpleUploadedFile('cv.txt', b'x' * (256 * 1024))
+        response = client.post('/upload-cv/', {'cv_file': oversized, 'csrfmiddlewaretoken': token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'File too large')
+        self.assertFalse(CVUpload.objects.filter(user=user).exists())
+
+
+@override_settings(CV_UPLOAD_MAX_BYTES=64 * 1024)
+class UploadValidationHandlerTests(TestCase):
+    """API uploads are rejected while streaming, before any analysis runs"""
+
+    def _post(self, upload):
+        with mock.patch('cv_analysis.views.analyze_uploaded_file') as analyze:
+            response = Client().post('/api/cv/public/analyze/', {'file': upload})
+        analyze.assert_not_called()
+        return response
+
+    def test_oversized_upload_is_rejected(self):
+        response = self._post(SimpleUploadedFile('cv.txt', b'x' * (256 * 1024)))
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('File too large', response.json()['error'])
+
+    def test_content_not_matching_the_extension_is_rejected(self):
+        response = self._post(SimpleUploadedFile('cv.pdf', CV_TEXT.encode('utf-8')))
+        self.assertEqual(response.status_code, 415)
+        self.assertIn('Unsupported file type', response.json()['error'])
+
+
+@override_settings(AZURE_OPENAI_API_KEY='', CV_NEAR_DUPLICATE_REUSE=False)
+class EnrichmentWithoutLLMTests(TestCase):
+    """Enrichment must not store the local fallback as the full analysis"""
+
+    def test_unavailable_llm_leaves_record_pending(self):
+        reset_llm_gateways()
+        user = User.objects.create_user('fast', 'fast@example.com', 'password')
+        cv_upload = CVUpload.objects.create(user=user, file='cvs/cv.txt', original_filename='cv.txt')
+        save_analysis(cv_upload, {'text': CV_TEXT, **CVAnalysisService()._fallback_analysis(CV_TEXT)}, tier='fast')
+
+        enrich_cv_upload(cv_upload.id)
+
+        cv_upload.refresh_from_db()
+        self.assertEqual(cv_upload.analysis_tier, 'fast')
+        self.assertEqual(cv_upload.analysis_status, 'pending')
+
+
+@override_settings(CV_NEAR_DUPLICATE_REUSE=False, CV_LONG_DOCUMENT_CHARS=200, CV_CHUNK_CHARS=100)
+class FallbackAnalysisTierTests(TestCase):
+    """Analyses the LLM did not produce are stored as the fast tier, not as full analyses"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user('fallback', 'fallback@example.com', 'password')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _analyze(self, router):
+        from .views import analyze_and_save
+        cv_upload = CVUpload.objects.create(
+            user=self.user, file=SimpleUploadedFile('cv.txt', CV_TEXT.encode('utf-8')), original_filename='cv.txt'
+        )
+        with mock.patch('cv_analysis.services.get_openai_client', return_value=object()), \
+                mock.patch('cv_analysis.services.get_llm_router', return_value=router), \
+                self.captureOnCommitCallbacks() as callbacks:
+            result = analyze_and_save(cv_upload)
+        cv_upload.refresh_from_db()
+        return result, cv_upload, callbacks
+
+    def test_llm_analysis_is_stored_as_full(self):
+        result, cv_upload, callbacks = self._analyze(llm_router(json.dumps(LLM_ANALYSIS)))
+        self.assertEqual(result['tier'], 'full')
+        self.assertEqual((cv_upload.analysis_tier, cv_upload.analysis_status), ('full', 'complete'))
+        self.assertEqual(callbacks, [])
+
+    def test_invalid_llm_answer_is_stored_as_fast_and_enriched(self):
+        result, cv_upload, callbacks = self._analyze(llm_router('not json'))
+        self.assertEqual(result['tier'], 'fast')
+        self.assertEqual((cv_upload.analysis_tier, cv_upload.analysis_status), ('fast', 'pending'))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_long_document_honours_strict(self):
+        service = CVAnalysisService()
+        service.openai_client = object()
+        long_text = CV_TEXT * 10
+        router = llm_router(error=LLMUnavailableError('down'))
+        with mock.patch('cv_analysis.services.get_llm_router', return_value=router):
+            self.assertEqual(service.analyze_with_ai(long_text)['tier'], 'fast')
+            with self.assertRaises(LLMUnavailableError):
+                service.analyze_with_ai(long_text, strict=True)
+
+
+class IncrementalAnalysisTests(TestCase):
+    """A re-uploaded CV only sends its edited sections to the LLM"""
+
+    def setUp(self):
+        user = User.objects.create_user('editor', 'editor@example.com', 'password')
+        self.previous = CVUpload.objects.create(user=user, file='cvs/cv.txt', original_filename='cv.txt')
+        save_analysis(self.previous, {
+            'text': CV_TEXT, **LLM_ANALYSIS, 'section_hashes': section_hashes(split_sections(CV_TEXT))
+        }, tier='full')
+        handle, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(handle, 'w') as cv_file:
+            cv_file.write(CV_TEXT.replace('Docker', 'Kubernetes'))
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_only_the_edited_section_is_reanalyzed_and_merged(self):
+        service = CVAnalysisService()
+        with mock.patch.object(service, 'analyze_with_ai',
+                               return_value={'skills': ['Python', 'Kubernetes', 'SQL']}) as analyze:
+            result = service.analyze_cv_incremental(self.path, self.previous)
+
+        analyze.assert_called_once()
+        sent_text = analyze.call_args.args[0]
+        self.assertTrue(analyze.call_args.kwargs['partial'])
+        self.assertIn('Kubernetes', sent_text)
+        self.assertNotIn('Backend engineer', sent_text)
+        self.assertEqual(result['tier'], 'full')
+        self.assertEqual(result['incremental']['reanalyzed_sections'], ['skills'])
+        self.assertIn('Kubernetes', result['skills'])
+        self.assertNotIn('Docker', result['skills'])
+        self.assertEqual(result['summary'], LLM_ANALYSIS['summary'])
+
+    def test_most_of_the_cv_changed_gets_a_full_analysis(self):
+        with open(self.path, 'w') as cv_file:
+            cv_file.write("John Roe\nEXPERIENCE\nData scientist at a bank for 7 years\nSKILLS\nR, Spark, Statistics\n")
+        service = CVAnalysisService()
+        with mock.patch.object(service, 'analyze_with_ai', return_value=dict(LLM_ANALYSIS)) as analyze:
+            result = service.analyze_cv_incremental(self.path, self.previous)
+
+        self.assertFalse(analyze.call_args.kwargs.get('partial', False))
+        self.assertNotIn('incremental', result)
+
+
+@override_settings(CV_LONG_DOCUMENT_CHARS=200, CV_CHUNK_CHARS=120)
+class LongDocumentAnalysisTests(SimpleTestCase):
+    """Long CVs are analyzed chunk by chunk, merged, and summarized by one synthesis call"""
+
+    def chat(self, client, task, messages, **kwargs):
+        if task == 'cv_synthesis':
+            return llm_response(json.dumps({
+                'summary': 'Engineer who moved from support to platform work',
+                'areas_for_improvement': [{'title': 'Certifications'}],
+            }))
+        excerpt = messages[-1]['content']
+        if 'Platform engineer' in excerpt:
+            facts = {'skills': ['Kubernetes', 'Go'], 'roles': [{'title': 'Platform engineer', 'start_year': 2020}]}
+        elif 'Support engineer' in excerpt:
+            facts = {'skills': ['Linux', 'go'], 'roles': [{'title': 'Support engineer', 'start_year': 2014,
+                                                           'end_year': 2020}]}
+        else:
+            facts = {'education_level': "Master's"}
+        return llm_response(json.dumps(facts))
+
+    def test_chunks_are_merged_and_synthesized(self):
+        text = (
+            "EXPERIENCE\n" + "Platform engineer at Acme since 2020, running clusters. " * 2
+            + "\nPREVIOUS EXPERIENCE\n" + "Support engineer at Initech 2014-2020, on call. " * 2
+            + "\nEDUCATION\nMaster of Science in Computer Science\n"
+        )
+        router = llm_router()
+        router.chat.side_effect = self.chat
+        service = CVAnalysisService()
+        service.openai_client = object()
+        with mock.patch('cv_analysis.services.get_llm_router', return_value=router):
+            result = service.analyze_with_ai(text)
+
+        tasks = [call.args[1] for call in router.chat.call_args_list]
+        self.assertGreater(tasks.count('cv_chunk'), 1)
+        self.assertEqual(tasks.count('cv_synthesis'), 1)
+        self.assertNotIn('tier', result)
+        self.assertEqual(result['skills'][0], 'Go')
+        self.assertEqual({'Kubernetes', 'Linux'} - set(result['skills']), set())
+        self.assertEqual(result['current_role'], 'Platform engineer')
+        self.assertEqual(result['education_level'], "Master's")
+        self.assertEqual(result['summary'], 'Engineer who moved from support to platform work')
+        self.assertTrue(result['long_document']['synthesized'])
+
+
+@override_settings(CV_PACK_SIZE=5, CV_NEAR_DUPLICATE_REUSE=False)
+class PackedAnalysisTests(SimpleTestCase):
+    """Each slice of a packed answer goes back to the CV it was sent for"""
+
+    @staticmethod
+    def analysis(name):
+        return {**LLM_ANALYSIS, 'current_role': f'{name} role', 'summary': f'Summary of {name}'}
+
+    def chat(self, client, task, messages, **kwargs):
+        if task == 'cv_analysis_packed':
+            # Out of order, with an unusable slice for the second CV
+            return llm_response(json.dumps({
+                'cv3': self.analysis('Carol'), 'cv1': self.analysis('Alice'), 'cv2': {'skills': 'Go'},
+            }))
+        self.assertIn('Bob', messages[-1]['content'])
+        return llm_response(json.dumps(self.analysis('Bob')))
+
+    def test_slices_are_mapped_by_cv_id_and_invalid_ones_retried(self):
+        texts = [f"{name}\nEXPERIENCE\nEngineer, 3 years\nSKILLS\nPython\n" for name in ('Alice', 'Bob', 'Carol')]
+        router = llm_router()
+        router.chat.side_effect = self.chat
+        service = CVAnalysisService()
+        service.openai_client = object()
+        with mock.patch('cv_analysis.cv_packing.get_llm_router', return_value=router), \
+                mock.patch('cv_analysis.services.get_llm_router', return_value=router):
+            analyses, stats = analyze_packed(service, texts)
+
+        self.assertEqual([analysis['summary'] for analysis in analyses],
+                         ['Summary of Alice', 'Summary of Bob', 'Summary of Carol'])
+        self.assertEqual(analyses[2]['current_role'], 'Carol role')
+        self.assertEqual((stats['packs'], stats['packed_cvs'], stats['retried_cvs']), (1, 3, 1))
+        self.assertEqual(router.chat.call_count, 2)
+
+
+def wordml(body):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+class DocxTextExtractionTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.docx')
+        os.close(handle)
+        row = '<w:tr><w:tc>{}</w:tc><w:tc>{}</w:tc></w:tr>'
+        document = (
+            paragraph('EXPERIENCE')
+            + '<w:tbl>' + row.format(paragraph('2019-2024'), paragraph('Backend engineer'))
+            + row.format(paragraph('2015-2019'), paragraph('Developer')) + '</w:tbl>'
+            + paragraph('SKILLS')
+        )
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr('word/document.xml', wordml(document))
+            archive.writestr('word/header1.xml', wordml(paragraph('Jane Doe')))
+            archive.writestr('word/footer1.xml', wordml(paragraph('Page 1')))
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_headers_tables_and_footers_in_document_order(self):
+        self.assertEqual(extract_docx_text(self.path, 10000).split('\n'), [
+            'Jane Doe', 'EXPERIENCE', '2019-2024 | Backend engineer', '2015-2019 | Developer', 'SKILLS', 'Page 1'
+        ])
+
+    def test_stops_at_the_character_limit(self):
+        self.assertEqual(extract_docx_text(self.path, 20), 'Jane Doe\nEXPERIENCE')
+
+
+class AdaptiveConcurrencyLimiterTests(SimpleTestCase):
+    def test_release_without_latency_keeps_the_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=16, latency_target=10.0)
+        for _ in range(10):
+            self.assertTrue(limiter.try_acquire())
+            limiter.release()
+        self.assertEqual(limiter.limit, 4.0)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_fast_success_increases_and_overload_decreases(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=16, latency_target=10.0)
+        limiter.try_acquire()
+        limiter.release(0.5)
+        self.assertGreater(limiter.limit, 4.0)
+        limiter.try_acquire()
+        limiter.release(0.5, overloaded=True)
+        self.assertLess(limiter.limit, 4.0)
+
+
+@override_settings(LLM_HEDGING={'ENABLED': True, 'MIN_DELAY': 0.01, 'MAX_DELAY': 0.05})
+class HedgedCallTests(SimpleTestCase):
+    def setUp(self):
+        llm_hedging.reset_hedge_policies()
+
+    def test_late_primary_is_reported_as_the_loser(self):
+        release = threading.Event()
+        abandoned = []
+
+        def slow_primary():
+            release.wait(5)
+            return 'primary'
+
+        result = llm_hedging.hedged_call(
+            'cv_analysis', slow_primary, lambda: 'hedge',
+            on_abandoned=lambda is_hedge, response: abandoned.append((is_hedge, response))
+        )
+        release.set()
+        for _ in range(100):
+            if abandoned:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(result, 'hedge')
+        self.assertEqual(abandoned, [(False, 'primary')])
+
+    @override_settings(LLM_DEPLOYMENTS={'full': {'MAX_CONCURRENCY': 64}, 'fast': {'MAX_CONCURRENCY': 96}})
+    def test_pool_is_sized_from_the_gateway_limits(self):
+        self.assertEqual(llm_hedging.executor_threads(), 160)
+
+
+class MetricsEndpointTests(TestCase):
+    """/metrics/ reports the snapshots exported by every worker of the host"""
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(METRICS_EXPORT_DIR=self.export_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.export_dir, ignore_errors=True)
+
+    def _write_worker(self, name, exported_at, counters):
+        with open(os.path.join(self.export_dir, f'{name}.json'), 'w') as handle:
+            json.dump({'worker': name, 'pid': 1, 'exported_at': exported_at,
+                       'counters': counters, 'timings': {}}, handle)
+
+    def test_staff_sees_every_live_worker_and_totals(self):
+        metrics.incr('test.metrics_endpoint', 2)
+        self._write_worker('other-host-1', time.time(), {'test.metrics_endpoint': 3})
+        self._write_worker('exited-host-2', time.time() - 3600, {'test.metrics_endpoint': 100})
+        staff = User.objects.create_user('ops', 'ops@example.com', 'password', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+
+        data = client.get('/metrics/').json()
+
+        workers = {worker['worker'] for worker in data['workers']}
+        self.assertIn('other-host-1', workers)
+        self.assertNotIn('exited-host-2', workers)
+        self.assertEqual(len(workers), 2)
+        own = next(worker for worker in data['workers'] if worker['worker'] != 'other-host-1')
+        self.assertEqual(
+            data['totals']['counters']['test.metrics_endpoint'], own['counters']['test.metrics_endpoint'] + 3
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.export_dir, 'exited-host-2.json')))
+
+    def test_requires_staff(self):
+        user = User.objects.create_user('member', 'member@example.com', 'password')
+        client = Client()
+        client.force_login(user)
+        self.assertEqual(client.get('/metrics/').status_code, 403)
+
+
+class ReadinessProbeTests(TestCase):
+    def test_reports_only_check_outcomes(self):
+        with mock.patch('cv_analysis.health_views.is_ready', return_value=True):
+            response = Client().get('/readyz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'ready': True, 'checks': {'prewarm': 'ok', 'database': 'ok'}})
+
+
+class NearDuplicateIndexSignalTests(TestCase):
+    """Only saves that change a CV's text recompute its MinHash signature"""
+
+    def test_status_saves_do_not_reindex(self):
+        user = User.objects.create_user('indexed', 'indexed@example.com', 'password')
+        with mock.patch.object(near_duplicates, 'minhash_signature', wraps=near_duplicates.minhash_signature) as signature:
+            cv_upload = CVUpload.objects.create(user=user, file='cvs/cv.txt', original_filename='cv.txt')
+            cv_upload.extracted_text = CV_TEXT
+            cv_upload.save()
+            self.assertIsNotNone(cv_upload.minhash_signature)
+            calls = signature.call_count
+
+            cv_upload.analysis_status = 'complete'
+            cv_upload.save(update_fields=['analysis_status'])
+            cv_upload.analysis_tier = 'full'
+            cv_upload.save()
+            reloaded = CVUpload.objects.get(pk=cv_upload.pk)
+            reloaded.skills = ['python']
+            reloaded.save()
+            self.assertEqual(signature.call_count, calls)
+
+            reloaded.extracted_text = CV_TEXT + "Go\n"
+            reloaded.save()
+            self.assertEqual(signature.call_count, calls + 1)
+
+
+@override_settings(CV_NEAR_DUPLICATE_REUSE=True)
+class NearDuplicateReuseTests(TestCase):
+    """Only the owner's completed LLM analyses are reused for a near-duplicate CV"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cv_upload = CVUpload.objects.create(user=self.owner, file='cvs/cv.txt', original_filename='cv.txt')
+        save_analysis(cv_upload, {'text': CV_TEXT, **LLM_ANALYSIS}, tier='full')
+
+    def test_owner_reuses_own_analysis(self):
+        reused = CVAnalysisService()._reuse_near_duplicate_analysis(CV_TEXT, self.owner.id)
+        self.assertEqual(reused['summary'], LLM_ANALYSIS['summary'])
+
+    def test_other_users_and_anonymous_requests_do_not(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.assertEqual(CVAnalysisService()._reuse_near_duplicate_analysis(CV_TEXT, other.id), {})
+        self.assertEqual(CVAnalysisService()._reuse_near_duplicate_analysis(CV_TEXT), {})
+
+    def test_fallback_analyses_are_not_reused(self):
+        CVUpload.objects.filter(user=self.owner).update(analysis_tier='fast', analysis_status='pending')
+        self.assertEqual(CVAnalysisService()._reuse_near_duplicate_analysis(CV_TEXT, self.owner.id), {})
+
+
+class PublicAnalysisSessionTests(TestCase):
+    def test_expired_session_asks_for_the_file(self):
+        response = Client().post('/api/cv/public/analyze/', {'session_id': '00000000-0000-0000-0000-000000000000'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['session_expired'])
+
+        response = Client().post('/api/cv/public/analyze/', {})
+        self.assertFalse(response.json()['session_expired'])
+
+
+class PublicAnalysisCoalescingDeadlineTests(TestCase):
+    """A request coalesced onto an identical in-flight analysis stops waiting at its deadline"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(SINGLE_FLIGHT_DIR=self.directory)
+        self.settings_override.enable()
+        self.single_flight = mock.patch('cv_analysis.singleflight._single_flight', None)
+        self.single_flight.start()
+
+    def tearDown(self):
+        self.single_flight.stop()
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_follower_answers_with_the_fast_tier(self):
+        upload = SimpleUploadedFile('cv.txt', CV_TEXT.encode('utf-8'))
+        key = SingleFlight.make_key('public_analyze', hash_uploaded_file(upload))
+        release = threading.Event()
+        leader = threading.Thread(target=get_single_flight().do, args=(key, lambda: release.wait(10)))
+        leader.start()
+        try:
+            started = time.monotonic()
+            response = Client().post('/api/cv/public/analyze/', {
+                'file': SimpleUploadedFile('cv.txt', CV_TEXT.encode('utf-8')), 'include': 'analysis'
+            }, HTTP_X_REQUEST_BUDGET='1')
+            elapsed = time.monotonic() - started
+        finally:
+            release.set()
+            leader.join()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 5)
+        data = response.json()
+        self.assertIn('Python', data['analysis']['skills'])
+        self.assertIn('llm_analysis', data['degraded_stages'])
+
+
+@override_settings(CV_UPLOAD_MAX_BYTES=64 * 1024, AZURE_OPENAI_API_KEY='', CV_NEAR_DUPLICATE_REUSE=False)
+class BatchAnalysisEndpointTests(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        # Results published by earlier runs must not be read back from the shared single-flight directory
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, SINGLE_FLIGHT_DIR=os.path.join(self.media_root, 'singleflight')
+        )
+        self.settings_override.enable()
+        self.single_flight = mock.patch('cv_analysis.singleflight._single_flight', None)
+        self.single_flight.start()
+        reset_llm_gateways()
+
+    def tearDown(self):
+        self.single_flight.stop()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_requires_authentication(self):
+        response = Client().post('/api/cv/api/analyze/batch/', {})
+        self.assertEqual(response.status_code, 403)
+
+    def test_streams_a_batch_larger_than_one_file_limit(self):
+        user = User.objects.create_user('batch', 'batch@example.com', 'password')
+        client = Client()
+        client.force_login(user)
+        body = (CV_TEXT * 600)[:48 * 1024].encode('utf-8')
+        files = [SimpleUploadedFile(f'cv{index}.txt', body) for index in range(3)]
+
+        response = client.post('/api/cv/api/analyze/batch/', {'files': files})
+
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.streaming_content]
+        self.assertEqual(lines[-1]['succeeded'], 3)
@@ -0,0 +1,154 @@
+"""
+Streaming validation of uploaded CV files.
+
+CVUploadValidationHandler runs first in FILE_UPLOAD_HANDLERS. On csrf-exempt
+(API) views it rejects a request whose Content-Length exceeds the upload
+limit before the body is read; CSRF-protected form views still parse the
+body, so the csrfmiddlewaretoken field is kept and the view can report the
+error. It sniffs the file type from the magic bytes of the first chunk and
+stops a file as soon as the streamed size passes the limit. Rejected files
+are skipped (their remaining bytes are discarded, never buffered) and the
+reason is stored on the request for the view to report with
+upload_rejection().
+
+Views marked with @batch_upload accept up to CV_BATCH_MAX_FILES files in one
+request: the request size limit scales with the file count, each file is
+still checked on its own, and every rejected file is listed by
+upload_rejections() so the rest of the batch can go ahead.
+"""
+import os
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from .metrics import metrics
+
+
+# Extensions accepted for each sniffed file type
+ALLOWED_EXTENSIONS = {
+    'pdf': {'.pdf'},
+    'docx': {'.docx'},
+    'doc': {'.doc'},
+    'text': {'.txt', '.md', '.rtf', ''},
+}
+_OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+# Allowance for the multipart boundaries and form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def max_upload_bytes() -> int:
+    return getattr(settings, 'CV_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def _format_size(limit: int) -> str:
+    if limit >= 1024 * 1024:
+        return f'{limit / (1024 * 1024):g} MB'
+    return f'{limit // 1024} KB'
+
+
+def _too_large(limit: int) -> str:
+    return f'File too large: the maximum upload size is {_format_size(limit)}'
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """Detect the file type from the first bytes of a file"""
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return 'docx'
+    if head.startswith(_OLE_MAGIC):
+        return 'doc'
+    if b'\x00' in head:
+        return None
+    # The chunk may end inside a multi-byte character
+    for trim in range(4):
+        try:
+            head[:len(head) - trim].decode('utf-8')
+            return 'text'
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def max_batch_files() -> int:
+    return getattr(settings, 'CV_BATCH_MAX_FILES', 50)
+
+
+def batch_upload(view):
+    """Mark a view as accepting a batch of CV files in one request"""
+    view.cv_batch_upload = True
+    return view
+
+
+def _is_batch_request(request) -> bool:
+    match = getattr(request, 'resolver_match', None)
+    return bool(match and getattr(match.func, 'cv_batch_upload', False))
+
+
+def _is_csrf_exempt_request(request) -> bool:
+    match = getattr(request, 'resolver_match', None)
+    return bool(match and getattr(match.func, 'csrf_exempt', False))
+
+
+def upload_rejection(request) -> Optional[Dict]:
+    """Return {'status', 'error'} if an uploaded file was rejected while streaming, else None"""
+    return getattr(request, 'upload_rejection', None)
+
+
+def upload_rejections(request) -> List[Dict]:
+    """Every file rejected while streaming, as {'file_name', 'status', 'error'}"""
+    return list(getattr(request, 'upload_rejections', []))
+
+
+class CVUploadValidationHandler(FileUploadHandler):
+    """Reject oversized and unsupported uploads while they stream in"""
+
+    def _reject(self, status: int, error: str) -> None:
+        if getattr(self.request, 'upload_rejection', None) is None:
+            self.request.upload_rejection = {'status': status, 'error': error}
+        if not hasattr(self.request, 'upload_rejections'):
+            self.request.upload_rejections = []
+        self.request.upload_rejections.append(
+            {'file_name': getattr(self, 'file_name', None), 'status': status, 'error': error}
+        )
+        metrics.incr(f'upload.rejected.{status}')
+        print(f"Rejected upload: {error}")
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        limit = max_upload_bytes()
+        files = max_batch_files() if _is_batch_request(self.request) else 1
+        if content_length and content_length > limit * files + MULTIPART_OVERHEAD:
+            self._reject(413, _too_large(limit) if files == 1 else
+                         f'Batch too large: at most {files} files of up to {_format_size(limit)} each')
+            if _is_csrf_exempt_request(self.request):
+                # Parsing is skipped entirely, so the body is never read
+                return QueryDict(encoding=encoding), MultiValueDict()
+            # CsrfViewMiddleware needs the form's token: parse the fields, the
+            # oversized file is skipped below as it streams past the limit
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.extension = os.path.splitext(file_name or '')[1].lower()
+        limit = max_upload_bytes()
+        if content_length and content_length > limit:
+            self._reject(413, _too_large(limit))
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            file_type = sniff_file_type(raw_data[:4096])
+            if file_type is None or self.extension not in ALLOWED_EXTENSIONS[file_type]:
+                self._reject(415, 'Unsupported file type: upload a PDF, DOCX, DOC or plain text CV')
+                raise SkipFile()
+        limit = max_upload_bytes()
+        if start + len(raw_data) > limit:
+            self._reject(413, _too_large(limit))
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        # The following handlers build the uploaded file object
+        return None
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views, batch_views
 
 urlpatterns = [
     # Web views
@@ -9,9 +9,16 @@ urlpatterns = [
     
     # API endpoints
     path('api/analyze/', views.analyze_cv_api, name='analyze_cv_api'),
+    path('api/analysis/<int:cv_id>/', views.analysis_status_api, name='analysis_status_api'),
+    path('api/analyze/batch/', batch_views.analyze_cv_batch, name='analyze_cv_batch'),
     path('api/questions/', views.get_career_questions_api, name='get_questions_api'),
     path('api/responses/', views.submit_responses_api, name='submit_responses_api'),
     
     # Public API endpoints (no authentication required)
     path('public/analyze/', views.public_analyze_cv_api, name='public_analyze_cv_api'),
+    path('public/plan/', views.public_generate_career_plan_api, name='public_generate_career_plan_api'),
+    
+    # Async (ASGI) endpoints
+    path('api/analyze/async/', async_views.analyze_cv_async, name='analyze_cv_async'),
+    path('public/analyze/async/', async_views.public_analyze_cv_async, name='public_analyze_cv_async'),
 ]
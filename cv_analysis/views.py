@@ -1,4 +1,4 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
@@ -10,11 +10,58 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
 import json
 import os
 import tempfile
-from .models import CVUpload, CareerQuestion, UserResponse
+import time
+from contextlib import contextmanager
+from .models import CVUpload, CareerQuestion, UserResponse, AnalysisSession
 from .services import CVAnalysisService, AIAnalysisService
+from .course_catalog import DEFAULT_COURSES, recommend_catalog_courses
+from .job_profiles import get_job_profile, personalize_courses
+from .analysis_sessions import create_session, get_session, hash_uploaded_file
+from .deadlines import current_deadline, degraded_stages, remaining_time, with_request_deadline
+from .enrichment import save_analysis, schedule_enrichment
+from .idempotency import idempotent
+from .metrics import metrics
+from .singleflight import SingleFlight, SingleFlightTimeout, get_single_flight
+from .upload_validation import upload_rejection
+
+# Output sections of public_analyze_cv_api selectable with the `include` parameter
+PUBLIC_ANALYSIS_SECTIONS = ('analysis', 'recommendations', 'summary')
+PUBLIC_ANALYSIS_DEFAULT_SECTIONS = ('analysis', 'recommendations')
+
+# Upper bound for long-polling the analysis status endpoint
+ANALYSIS_STATUS_MAX_WAIT = 25
+
+
+def analyze_and_save(cv_upload, mode: str = 'full') -> dict:
+    """Analyze an uploaded CV and store the result on the record
+    
+    In "tiered" mode the fast local analysis is stored and returned right away
+    and the LLM analysis is scheduled to upgrade the record in the background.
+    Otherwise the LLM analysis is stored, or, when the LLM could not produce
+    it, the local fallback is stored as the fast tier and enrichment retries.
+    """
+    analysis_service = CVAnalysisService()
+    if mode == 'tiered':
+        analysis_result = analysis_service.analyze_cv_fast(cv_upload.file.path)
+        save_analysis(cv_upload, analysis_result, tier='fast')
+        schedule_enrichment(cv_upload.id)
+    else:
+        # Re-uploads are diffed against the user's previous CV section by section
+        previous = CVUpload.objects.filter(
+            user=cv_upload.user, analysis_tier='full'
+        ).exclude(id=cv_upload.id).order_by('-uploaded_at').first()
+        if previous:
+            analysis_result = analysis_service.analyze_cv_incremental(cv_upload.file.path, previous)
+        else:
+            analysis_result = analysis_service.analyze_cv(cv_upload.file.path, cv_upload.user_id)
+        save_analysis(cv_upload, analysis_result, tier=analysis_result['tier'])
+        if analysis_result['tier'] == 'fast':
+            schedule_enrichment(cv_upload.id)
+    return analysis_result
 
 
 def home(request):
@@ -27,7 +74,10 @@ def upload_cv(request):
     """CV upload page"""
     if request.method == 'POST':
         file = request.FILES.get('cv_file')
-        if file:
+        rejection = upload_rejection(request)
+        if rejection:
+            messages.error(request, rejection['error'])
+        elif file:
             # Save the file
             cv_upload = CVUpload.objects.create(
                 user=request.user,
@@ -36,18 +86,8 @@ def upload_cv(request):
             )
             
             # Process the CV
-            analysis_service = CVAnalysisService()
             try:
-                analysis_result = analysis_service.analyze_cv(cv_upload.file.path)
-                
-                # Update the CV upload with analysis results
-                cv_upload.extracted_text = analysis_result.get('text', '')
-                cv_upload.skills = analysis_result.get('skills', [])
-                cv_upload.experience_years = analysis_result.get('experience_years')
-                cv_upload.education_level = analysis_result.get('education_level')
-                cv_upload.current_role = analysis_result.get('current_role')
-                cv_upload.industries = analysis_result.get('industries', [])
-                cv_upload.save()
+                analyze_and_save(cv_upload, settings.CV_ANALYSIS_MODE)
                 
                 messages.success(request, 'CV uploaded and analyzed successfully!')
                 return redirect('career_questions')
@@ -87,10 +127,14 @@ def career_questions(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def analyze_cv_api(request):
     """API endpoint for CV analysis"""
     try:
         file = request.FILES.get('file')
+        rejection = upload_rejection(request)
+        if rejection:
+            return Response({'success': False, 'error': rejection['error']}, status=rejection['status'])
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -101,23 +145,16 @@ def analyze_cv_api(request):
             original_filename=file.name
         )
         
-        # Analyze the CV
-        analysis_service = CVAnalysisService()
-        analysis_result = analysis_service.analyze_cv(cv_upload.file.path)
-        
-        # Update the CV upload with results
-        cv_upload.extracted_text = analysis_result.get('text', '')
-        cv_upload.skills = analysis_result.get('skills', [])
-        cv_upload.experience_years = analysis_result.get('experience_years')
-        cv_upload.education_level = analysis_result.get('education_level')
-        cv_upload.current_role = analysis_result.get('current_role')
-        cv_upload.industries = analysis_result.get('industries', [])
-        cv_upload.save()
+        # Analyze the CV ("tiered" returns the fast local result and enriches in the background)
+        mode = request.data.get('mode') or request.query_params.get('mode') or settings.CV_ANALYSIS_MODE
+        analysis_result = analyze_and_save(cv_upload, mode)
         
         return Response({
             'success': True,
             'analysis': analysis_result,
-            'cv_id': cv_upload.id
+            'cv_id': cv_upload.id,
+            'tier': cv_upload.analysis_tier,
+            'status': cv_upload.analysis_status,
         })
     
     except Exception as e:
@@ -127,6 +164,33 @@ def analyze_cv_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analysis_status_api(request, cv_id):
+    """API endpoint to poll the analysis tier of an uploaded CV
+    
+    Pass ?wait=<seconds> to long-poll until the full analysis is available.
+    """
+    cv_upload = get_object_or_404(CVUpload, id=cv_id, user=request.user)
+    
+    try:
+        wait = min(float(request.query_params.get('wait', 0)), ANALYSIS_STATUS_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    deadline = time.monotonic() + wait
+    while cv_upload.analysis_status in ('pending', 'enriching') and time.monotonic() < deadline:
+        time.sleep(0.5)
+        cv_upload.refresh_from_db()
+    
+    return Response({
+        'cv_id': cv_upload.id,
+        'tier': cv_upload.analysis_tier,
+        'status': cv_upload.analysis_status,
+        'analyzed_at': cv_upload.analyzed_at,
+        'analysis': cv_upload.ai_analysis,
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_career_questions_api(request):
@@ -176,57 +240,126 @@ def submit_responses_api(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @csrf_exempt
+@idempotent
+@with_request_deadline
 def public_analyze_cv_api(request):
-    """Public API endpoint for CV analysis and course recommendations (no auth required)"""
+    """Public API endpoint for CV analysis and course recommendations (no auth required)
+    
+    The optional `include` parameter (comma-separated, any of analysis,
+    recommendations, summary) selects the output sections; stages whose
+    output was not requested are skipped. Defaults to analysis and
+    recommendations.
+    
+    Every response carries a `session_id`. Passing it back (with no file, or
+    with the same file) reuses the stored analysis instead of re-analyzing;
+    an unknown or expired session_id without a file gets a 400 with
+    `session_expired: true`, telling the client to send the file again.
+    
+    The request runs under a deadline (X-Request-Budget header in seconds, or
+    REQUEST_DEADLINE_SECONDS). Stages that ran short of time use cheaper
+    variants; the response then has `degraded: true` and `degraded_stages`.
+    A request waiting on an identical in-flight upload stops waiting when its
+    deadline passes and answers with the fast tier analysis.
+    
+    Retries sent with the same Idempotency-Key header get the first
+    attempt's response (see idempotency.py).
+    """
     try:
         file = request.FILES.get('file')
+        rejection = upload_rejection(request)
+        if rejection:
+            return Response({'success': False, 'error': rejection['error']}, status=rejection['status'])
         target_job = request.data.get('target_job', '')
+        session = get_session(request.data.get('session_id'))
         
-        if not file:
+        if not file and not session:
             return Response({
                 'success': False,
-                'error': 'No file provided'
+                'error': 'No file or valid session_id provided',
+                # Clients that sent only a session_id re-send the file
+                'session_expired': bool(request.data.get('session_id')),
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.name)[1]) as tmp_file:
-            for chunk in file.chunks():
-                tmp_file.write(chunk)
-            tmp_file_path = tmp_file.name
+        include = parse_include_param(request)
+        unknown = include - set(PUBLIC_ANALYSIS_SECTIONS)
+        if unknown:
+            return Response({
+                'success': False,
+                'error': f"Unknown sections in include: {', '.join(sorted(unknown))}. "
+                         f"Allowed: {', '.join(PUBLIC_ANALYSIS_SECTIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            # Analyze the CV
-            analysis_service = CVAnalysisService()
-            analysis_result = analysis_service.analyze_cv(tmp_file_path)
-            
-            # Generate course recommendations using AI web search
-            ai_service = AIAnalysisService()
-            recommendations = ai_service.search_and_recommend_courses(
-                analysis_result, 
-                target_job
-            )
-            
-            # Fallback to static recommendations if AI search fails
-            if not recommendations or len(recommendations) == 0:
-                recommendations = generate_course_recommendations(analysis_result, target_job)
-            
+        if file:
+            content_hash = hash_uploaded_file(file)
+            if session and (session.content_hash != content_hash or session.analysis.get('degraded')):
+                # A different CV was uploaded, or the stored analysis was cut short: start a new session
+                session = None
+        
+        if not session:
+            # Identical uploads in flight at the same time share one analysis and session
+            try:
+                session_id = get_single_flight().do(
+                    SingleFlight.make_key('public_analyze', content_hash),
+                    lambda: str(create_session(content_hash, file.name, analyze_uploaded_file(file)).id),
+                    timeout=remaining_time()
+                )
+            except SingleFlightTimeout:
+                session_id = str(create_session(content_hash, file.name, deadline_fallback_analysis(file)).id)
+            session = AnalysisSession.objects.get(id=session_id)
+        analysis_result = session.analysis
+        response_data = public_analysis_payload(session, include)
+        
+        if 'recommendations' in include:
+            started = time.monotonic()
+            try:
+                response_data['recommendations'] = get_single_flight().do(
+                    SingleFlight.make_key('public_recommend', session.content_hash, target_job),
+                    lambda: recommend_courses(analysis_result, target_job),
+                    timeout=remaining_time()
+                )
+            except SingleFlightTimeout:
+                response_data['recommendations'] = deadline_fallback_recommendations(analysis_result, target_job)
+            metrics.observe('public_analyze.recommendations_latency', time.monotonic() - started)
+        else:
+            log_skipped_recommendations()
+        
+        mark_degraded(response_data, analysis_result)
+        return Response(response_data)
+    
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@csrf_exempt
+@idempotent
+def public_generate_career_plan_api(request):
+    """Public API endpoint to generate a career plan from an analysis session (no auth required)"""
+    try:
+        session = get_session(request.data.get('session_id'))
+        if not session:
             return Response({
-                'success': True,
-                'analysis': {
-                    'skills': analysis_result.get('skills', []),
-                    'strengths': analysis_result.get('strengths', []),
-                    'areas_for_improvement': analysis_result.get('areas_for_improvement', []),
-                    'experience_years': analysis_result.get('experience_years'),
-                    'current_role': analysis_result.get('current_role'),
-                    'summary': analysis_result.get('summary', ''),
-                },
-                'recommendations': recommendations
-            })
+                'success': False,
+                'error': 'No valid session_id provided',
+                'session_expired': bool(request.data.get('session_id')),
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+        responses = request.data.get('responses', [])
+        if not isinstance(responses, list):
+            responses = []
+        
+        ai_service = AIAnalysisService()
+        plan = ai_service.generate_career_plan(session.analysis, responses)
+        
+        return Response({
+            'success': True,
+            'session_id': str(session.id),
+            'plan': plan
+        })
     
     except Exception as e:
         return Response({
@@ -235,141 +368,139 @@ def public_analyze_cv_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def recommend_courses(analysis_result: dict, target_job: str) -> list:
+    """Recommend courses for a CV and target job
+    
+    With a target job, the cached job profile's courses are personalized for
+    the CV. Otherwise courses come from the catalog by embedding similarity,
+    falling back to the AI course search and then the static list while no
+    catalog has been loaded (see the load_courses command).
+    """
+    profile = get_job_profile(target_job) if target_job else None
+    if profile and profile['courses']:
+        return personalize_courses(profile, analysis_result)
+    
+    recommendations = recommend_catalog_courses(analysis_result, target_job)
+    if recommendations:
+        return recommendations
+    
+    # Generate course recommendations using AI web search
+    ai_service = AIAnalysisService()
+    recommendations = ai_service.search_and_recommend_courses(
+        analysis_result, 
+        target_job
+    )
+    
+    # Fallback to static recommendations if AI search fails
+    if not recommendations or len(recommendations) == 0:
+        recommendations = generate_course_recommendations(analysis_result, target_job)
+    return recommendations
+
+
+@contextmanager
+def uploaded_temp_file(file):
+    """Write an uploaded file to a temporary file and yield its path"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.name)[1]) as tmp_file:
+        for chunk in file.chunks():
+            tmp_file.write(chunk)
+        tmp_file_path = tmp_file.name
+    
+    try:
+        yield tmp_file_path
+    finally:
+        # Clean up temporary file
+        if os.path.exists(tmp_file_path):
+            os.unlink(tmp_file_path)
+
+
+def analyze_uploaded_file(file) -> dict:
+    """Analyze an uploaded CV from a temporary file"""
+    with uploaded_temp_file(file) as tmp_file_path:
+        analysis_service = CVAnalysisService()
+        return analysis_service.analyze_cv(tmp_file_path)
+
+
+def deadline_fallback_analysis(file) -> dict:
+    """The fast tier analysis of an upload whose identical in-flight analysis outlasted the request deadline"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.degrade('llm_analysis')
+    with uploaded_temp_file(file) as tmp_file_path:
+        analysis = CVAnalysisService().analyze_cv_fast(tmp_file_path)
+    # Stored as degraded, so a later request for the same CV analyzes it again
+    analysis['degraded'] = degraded_stages()
+    return analysis
+
+
+def deadline_fallback_recommendations(analysis_result: dict, target_job: str) -> list:
+    """Static course recommendations when identical in-flight ones outlasted the request deadline"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.degrade('course_search')
+    return generate_course_recommendations(analysis_result, target_job)
+
+
+def public_analysis_payload(session, include: set) -> dict:
+    """Build the public analysis response for a session, without recommendations"""
+    analysis_result = session.analysis
+    response_data = {
+        'success': True,
+        'session_id': str(session.id),
+        'session_expires_at': session.expires_at,
+    }
+    if 'analysis' in include:
+        response_data['analysis'] = {
+            'skills': analysis_result.get('skills', []),
+            'strengths': analysis_result.get('strengths', []),
+            'areas_for_improvement': analysis_result.get('areas_for_improvement', []),
+            'experience_years': analysis_result.get('experience_years'),
+            'current_role': analysis_result.get('current_role'),
+            'summary': analysis_result.get('summary', ''),
+        }
+    if 'summary' in include:
+        response_data['summary'] = analysis_result.get('summary', '')
+    return response_data
+
+
+def mark_degraded(response_data: dict, analysis_result: dict) -> None:
+    """Flag a response whose stages (now or in the stored analysis) were cut short by a deadline"""
+    stages = list(analysis_result.get('degraded', []))
+    stages.extend(stage for stage in degraded_stages() if stage not in stages)
+    response_data['degraded'] = bool(stages)
+    if stages:
+        response_data['degraded_stages'] = stages
+
+
+def parse_include_param(request) -> set:
+    """Read the requested output sections from the body or query string"""
+    values = []
+    # DRF requests expose data/query_params; plain (async) Django requests POST/GET
+    if hasattr(request, 'data'):
+        sources = (request.data, request.query_params)
+    else:
+        sources = (request.POST, request.GET)
+    for source in sources:
+        if hasattr(source, 'getlist'):
+            values.extend(source.getlist('include'))
+        elif source.get('include'):
+            raw = source.get('include')
+            values.extend(raw if isinstance(raw, list) else [raw])
+    sections = {part.strip().lower() for value in values for part in str(value).split(',') if part.strip()}
+    return sections or set(PUBLIC_ANALYSIS_DEFAULT_SECTIONS)
+
+
+def log_skipped_recommendations():
+    """Record the course-search work saved because recommendations were not requested"""
+    metrics.incr('public_analyze.skipped.course_search')
+    timings = metrics.snapshot()['timings'].get('public_analyze.recommendations_latency')
+    saved = f"~{timings['avg']:.1f}s" if timings else "unknown time"
+    print(f"public_analyze_cv_api: skipped course recommendations, saving {saved}")
+
+
 def generate_course_recommendations(analysis: dict, target_job: str) -> list:
     """Generate course recommendations based on CV analysis"""
     # Course catalog with skills mapping
-    course_catalog = [
-        {
-            'id': '1',
-            'title': 'React for Beginners',
-            'provider': 'Coursera',
-            'url': 'https://coursera.org',
-            'skills': ['react', 'javascript', 'frontend', 'hooks'],
-            'level': 'Beginner',
-            'duration': '12h',
-            'rating': 4.8,
-            'price': 'Free',
-            'isFree': True,
-            'description': 'Learn React from scratch with hands-on projects and real-world examples.'
-        },
-        {
-            'id': '2',
-            'title': 'Advanced React Patterns',
-            'provider': 'Udemy',
-            'url': 'https://udemy.com',
-            'skills': ['react', 'hooks', 'performance', 'patterns'],
-            'level': 'Advanced',
-            'duration': '15h',
-            'rating': 4.9,
-            'price': '$89.99',
-            'isFree': False,
-            'description': 'Master advanced React patterns and optimization techniques.'
-        },
-        {
-            'id': '3',
-            'title': 'Data Structures in Python',
-            'provider': 'edX',
-            'url': 'https://edx.org',
-            'skills': ['python', 'algorithms', 'data structures'],
-            'level': 'Intermediate',
-            'duration': '8h',
-            'rating': 4.7,
-            'price': 'Free',
-            'isFree': True,
-            'description': 'Comprehensive guide to data structures and algorithms in Python.'
-        },
-        {
-            'id': '4',
-            'title': 'Machine Learning Foundations',
-            'provider': 'Coursera',
-            'url': 'https://coursera.org',
-            'skills': ['ml', 'python', 'machine learning'],
-            'level': 'Beginner',
-            'duration': '20h',
-            'rating': 4.6,
-            'price': '$49.99',
-            'isFree': False,
-            'description': 'Introduction to machine learning concepts and applications.'
-        },
-        {
-            'id': '5',
-            'title': 'DevOps Essentials',
-            'provider': 'Udacity',
-            'url': 'https://udacity.com',
-            'skills': ['devops', 'ci/cd', 'docker', 'deployment'],
-            'level': 'Intermediate',
-            'duration': '16h',
-            'rating': 4.5,
-            'price': 'Free',
-            'isFree': True,
-            'description': 'Learn DevOps practices and tools for modern software development.'
-        },
-        {
-            'id': '6',
-            'title': 'AWS Cloud Practitioner',
-            'provider': 'AWS Training',
-            'url': 'https://aws.amazon.com',
-            'skills': ['aws', 'cloud', 'certification', 'infrastructure'],
-            'level': 'Beginner',
-            'duration': '10h',
-            'rating': 4.8,
-            'price': 'Free',
-            'isFree': True,
-            'description': 'Prepare for the AWS Cloud Practitioner certification exam.'
-        },
-        {
-            'id': '7',
-            'title': 'JavaScript Mastery',
-            'provider': 'Udemy',
-            'url': 'https://udemy.com',
-            'skills': ['javascript', 'es6', 'async', 'programming'],
-            'level': 'Intermediate',
-            'duration': '18h',
-            'rating': 4.9,
-            'price': '$79.99',
-            'isFree': False,
-            'description': 'Master modern JavaScript including ES6+, async/await, and advanced patterns.'
-        },
-        {
-            'id': '8',
-            'title': 'TypeScript Fundamentals',
-            'provider': 'Pluralsight',
-            'url': 'https://pluralsight.com',
-            'skills': ['typescript', 'javascript', 'type safety'],
-            'level': 'Intermediate',
-            'duration': '10h',
-            'rating': 4.7,
-            'price': 'Free',
-            'isFree': True,
-            'description': 'Learn TypeScript from the ground up with practical examples.'
-        },
-        {
-            'id': '9',
-            'title': 'Node.js Backend Development',
-            'provider': 'Coursera',
-            'url': 'https://coursera.org',
-            'skills': ['node.js', 'backend', 'api', 'server'],
-            'level': 'Advanced',
-            'duration': '25h',
-            'rating': 4.8,
-            'price': '$99.99',
-            'isFree': False,
-            'description': 'Build scalable backend applications with Node.js and Express.'
-        },
-        {
-            'id': '10',
-            'title': 'Docker & Kubernetes',
-            'provider': 'Udemy',
-            'url': 'https://udemy.com',
-            'skills': ['docker', 'kubernetes', 'devops', 'containers'],
-            'level': 'Intermediate',
-            'duration': '14h',
-            'rating': 4.6,
-            'price': '$69.99',
-            'isFree': False,
-            'description': 'Master containerization and orchestration with Docker and Kubernetes.'
-        },
-    ]
+    course_catalog = DEFAULT_COURSES
     
     # Extract improvement areas and skills from analysis
     # Handle both dict format (new) and string format (old)
@@ -0,0 +1,183 @@
+"""
+Text extraction from Word CVs.
+
+DOCX files are read straight from the OOXML zip: the headers, the main
+document and the footers are streamed through an incremental XML parser
+(iterparse) in one pass, and parsed elements are discarded as soon as their
+text is taken, so memory stays bounded by one top-level block rather than
+the whole document tree. Paragraphs, table rows (cells joined with " | ")
+and text boxes are emitted in document order, which python-docx's
+Document.paragraphs misses for tables and text boxes.
+
+Legacy binary .doc files are converted with antiword when it is installed;
+otherwise their text runs are recovered with a best-effort byte scan.
+"""
+import re
+import shutil
+import subprocess
+import zipfile
+from typing import List
+from xml.etree.ElementTree import iterparse
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+
+_P, _R, _T, _TAB, _BR, _CR = (_W + tag for tag in ('p', 'r', 't', 'tab', 'br', 'cr'))
+_TR, _TC = _W + 'tr', _W + 'tc'
+_FALLBACK = _MC + 'Fallback'
+# Containers whose finished children are discarded while streaming
+_CONTAINERS = {_W + 'body', _W + 'hdr', _W + 'ftr'}
+
+_PART_NUMBER = re.compile(r'(\d+)\.xml$')
+
+ANTIWORD_TIMEOUT = 20
+
+
+class _TextLimitReached(Exception):
+    pass
+
+
+class _DocxTextWriter:
+    """Collects extracted blocks up to a character limit"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.blocks = []
+        self.length = 0
+
+    def emit(self, text: str) -> None:
+        if not text:
+            return
+        self.blocks.append(text)
+        self.length += len(text) + 1
+        if self.length >= self.max_chars:
+            raise _TextLimitReached()
+
+    def text(self) -> str:
+        return "\n".join(self.blocks)[:self.max_chars]
+
+
+def _stream_part(source, writer: _DocxTextWriter) -> None:
+    """Emit the paragraphs and table rows of one WordprocessingML part"""
+    path = []
+    paragraphs = []  # text boxes nest paragraphs inside paragraphs
+    rows = []
+    cells = []
+    run_depth = 0
+    fallback_depth = 0
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            path.append(elem)
+            if tag == _P:
+                paragraphs.append([])
+            elif tag == _R:
+                run_depth += 1
+            elif tag == _TR:
+                rows.append([])
+            elif tag == _TC:
+                cells.append([])
+            elif tag == _FALLBACK:
+                # Fallback repeats the text of the preceding mc:Choice (e.g. a text box)
+                fallback_depth += 1
+            continue
+
+        path.pop()
+        if tag == _T:
+            if run_depth and not fallback_depth and paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == _TAB:
+            if run_depth and not fallback_depth and paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (_BR, _CR):
+            if run_depth and not fallback_depth and paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == _R:
+            run_depth -= 1
+        elif tag == _P:
+            text = ''.join(paragraphs.pop()).strip()
+            if cells:
+                if text:
+                    cells[-1].append(text)
+            else:
+                writer.emit(text)
+        elif tag == _TC:
+            cell_text = ' '.join(cells.pop())
+            if rows:
+                rows[-1].append(cell_text)
+        elif tag == _TR:
+            row_text = ' | '.join(cell for cell in rows.pop() if cell)
+            if cells:
+                # Nested table: the row belongs to the enclosing cell
+                if row_text:
+                    cells[-1].append(row_text)
+            else:
+                writer.emit(row_text)
+        elif tag == _FALLBACK:
+            fallback_depth -= 1
+
+        if path and path[-1].tag in _CONTAINERS:
+            path[-1].clear()
+
+
+def _part_order(name: str) -> int:
+    match = _PART_NUMBER.search(name)
+    return int(match.group(1)) if match else 0
+
+
+def docx_parts(names: List[str]) -> List[str]:
+    """Headers, the main document and footers of a DOCX, in reading order"""
+    headers = sorted((n for n in names if n.startswith('word/header') and n.endswith('.xml')), key=_part_order)
+    footers = sorted((n for n in names if n.startswith('word/footer') and n.endswith('.xml')), key=_part_order)
+    return headers + [n for n in ('word/document.xml',) if n in names] + footers
+
+
+def extract_docx_text(file_path: str, max_chars: int) -> str:
+    """Extract up to max_chars characters of text from a DOCX file"""
+    writer = _DocxTextWriter(max_chars)
+    with zipfile.ZipFile(file_path) as archive:
+        for name in docx_parts(archive.namelist()):
+            with archive.open(name) as source:
+                try:
+                    _stream_part(source, writer)
+                except _TextLimitReached:
+                    break
+    return writer.text()
+
+
+# Printable Latin-1 runs: UTF-16LE (Word 97+ Unicode text) and 8-bit (compressed text pieces)
+_UTF16_RUN = re.compile(rb'(?:[\x09\x0d\x20-\x7e\xa0-\xff]\x00){4,}')
+_BYTE_RUN = re.compile(rb'[\x09\x0d\x20-\x7e\xa0-\xff]{8,}')
+
+
+def extract_doc_text(file_path: str, max_chars: int) -> str:
+    """Extract up to max_chars characters of text from a legacy binary .doc file"""
+    antiword = shutil.which('antiword')
+    if antiword:
+        try:
+            result = subprocess.run(
+                [antiword, file_path], capture_output=True, timeout=ANTIWORD_TIMEOUT, check=True
+            )
+            return result.stdout.decode('utf-8', errors='replace')[:max_chars]
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"antiword failed, scanning .doc text runs instead: {e}")
+
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    runs = [match.group().decode('utf-16-le') for match in _UTF16_RUN.finditer(data)]
+    if sum(len(run) for run in runs) < 200:
+        # Documents saved with 8-bit text pieces
+        runs.extend(match.group().decode('cp1252', errors='replace') for match in _BYTE_RUN.finditer(data))
+    lines = []
+    length = 0
+    for run in runs:
+        for line in run.replace('\r', '\n').split('\n'):
+            line = line.strip()
+            if len(line) >= 2:
+                lines.append(line)
+                length += len(line) + 1
+        if length >= max_chars:
+            break
+    return "\n".join(lines)[:max_chars]
@@ -171,7 +171,11 @@ export default function CareerPathPlanner() {
     try {
       const formData = new FormData();
       formData.append('file', file);
+      // Reuse the server-side analysis session if this CV was already analyzed
+      const sessionId = localStorage.getItem('analysis_session_id');
+      if (sessionId) formData.append('session_id', sessionId);
       formData.append('target_job', '');
+      formData.append('include', 'analysis'); // Skip course recommendations on the backend
 
       const response = await fetch(`${API_BASE_URL}/analyze/`, {
         method: 'POST',
@@ -180,6 +184,7 @@ export default function CareerPathPlanner() {
 
       if (response.ok) {
         const data = await response.json();
+        if (data.session_id) localStorage.setItem('analysis_session_id', data.session_id);
         if (data.success && data.analysis) {
           const analysis = {
             skills: data.analysis.skills || [],
@@ -236,6 +236,9 @@ export default function CourseRecommendations() {
     try {
       const formData = new FormData();
       formData.append('file', uploadedCV);
+      // Reuse the server-side analysis session if this CV was already analyzed
+      const sessionId = localStorage.getItem('analysis_session_id');
+      if (sessionId) formData.append('session_id', sessionId);
       formData.append('target_job', targetJob);
 
       const response = await fetch(`${API_BASE_URL}/analyze/`, {
@@ -245,6 +248,7 @@ export default function CourseRecommendations() {
 
       if (response.ok) {
         const data = await response.json();
+        if (data.session_id) localStorage.setItem('analysis_session_id', data.session_id);
         console.log('API Response:', data); // Debug log
         
         if (data.success && data.analysis) {
@@ -217,7 +217,11 @@ export default function JobMarketInsights() {
     try {
       const formData = new FormData();
       formData.append('file', file);
+      // Reuse the server-side analysis session if this CV was already analyzed
+      const sessionId = localStorage.getItem('analysis_session_id');
+      if (sessionId) formData.append('session_id', sessionId);
       formData.append('target_job', ''); // Not needed for market insights
+      formData.append('include', 'analysis'); // Skip course recommendations on the backend
 
       const response = await fetch(`${API_BASE_URL}/analyze/`, {
         method: 'POST',
@@ -226,6 +230,7 @@ export default function JobMarketInsights() {
 
       if (response.ok) {
         const data = await response.json();
+        if (data.session_id) localStorage.setItem('analysis_session_id', data.session_id);
         if (data.success && data.analysis) {
           const analysis = {
             skills: data.analysis.skills || [],
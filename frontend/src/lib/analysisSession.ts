@@ -0,0 +1,64 @@
+/**
+ * Reuse of server-side CV analysis sessions.
+ *
+ * The public analyze endpoint returns a session_id for every analyzed CV. It
+ * is stored with a fingerprint of the file (name, size, last modified), so a
+ * later request for the same file sends only the session_id instead of
+ * uploading the CV again. When the server reports that the session expired,
+ * the request is sent again with the file.
+ */
+const STORAGE_KEY = 'analysis_session';
+
+interface StoredSession {
+  id: string;
+  file: string;
+}
+
+const fileFingerprint = (file: File) => `${file.name}:${file.size}:${file.lastModified}`;
+
+function storedSessionId(file: File): string | null {
+  try {
+    const stored: StoredSession | null = JSON.parse(localStorage.getItem(STORAGE_KEY) || 'null');
+    return stored && stored.file === fileFingerprint(file) ? stored.id : null;
+  } catch {
+    return null;
+  }
+}
+
+function rememberSession(file: File, id: string) {
+  const stored: StoredSession = { id, file: fileFingerprint(file) };
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(stored));
+}
+
+/**
+ * POST a CV to a public analysis endpoint, sending only the stored session_id
+ * when this file was analyzed before. `fields` are the other form fields.
+ */
+export async function postCVAnalysis(url: string, file: File, fields: Record<string, string>): Promise<Response> {
+  const send = (sessionId: string | null) => {
+    const formData = new FormData();
+    if (sessionId) {
+      formData.append('session_id', sessionId);
+    } else {
+      formData.append('file', file);
+    }
+    Object.entries(fields).forEach(([name, value]) => formData.append(name, value));
+    return fetch(url, { method: 'POST', body: formData });
+  };
+
+  const sessionId = storedSessionId(file);
+  let response = await send(sessionId);
+  if (sessionId && response.status === 400) {
+    const data = await response.clone().json().catch(() => null);
+    if (data?.session_expired) {
+      localStorage.removeItem(STORAGE_KEY);
+      response = await send(null);
+    }
+  }
+
+  if (response.ok) {
+    const data = await response.clone().json().catch(() => null);
+    if (data?.session_id) rememberSession(file, data.session_id);
+  }
+  return response;
+}
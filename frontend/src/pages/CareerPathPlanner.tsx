@@ -4,6 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
+import { postCVAnalysis } from "@/lib/analysisSession";
 import { 
   Map, 
   Plus, 
@@ -169,13 +170,10 @@ export default function CareerPathPlanner() {
     setIsAnalyzing(true);
 
     try {
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('target_job', '');
-
-      const response = await fetch(`${API_BASE_URL}/analyze/`, {
-        method: 'POST',
-        body: formData,
+      // Sends only the stored session_id when this CV was already analyzed
+      const response = await postCVAnalysis(`${API_BASE_URL}/analyze/`, file, {
+        target_job: '',
+        include: 'analysis', // Skip course recommendations on the backend
       });
 
       if (response.ok) {
@@ -4,6 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
+import { postCVAnalysis } from "@/lib/analysisSession";
 import { 
   Select, 
   SelectContent, 
@@ -249,13 +250,9 @@ export default function CourseRecommendations() {
     setRecommendedCourses([]);
 
     try {
-      const formData = new FormData();
-      formData.append('file', uploadedCV);
-      formData.append('target_job', targetJob);
-
-      const response = await fetch(`${API_BASE_URL}/analyze/`, {
-        method: 'POST',
-        body: formData,
+      // Sends only the stored session_id when this CV was already analyzed
+      const response = await postCVAnalysis(`${API_BASE_URL}/analyze/`, uploadedCV, {
+        target_job: targetJob,
       });
 
       if (response.ok) {
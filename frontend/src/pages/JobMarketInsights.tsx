@@ -4,6 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
+import { postCVAnalysis } from "@/lib/analysisSession";
 import { 
   TrendingUp, 
   DollarSign, 
@@ -215,13 +216,10 @@ export default function JobMarketInsights() {
     setAnalysisError(null);
 
     try {
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('target_job', ''); // Not needed for market insights
-
-      const response = await fetch(`${API_BASE_URL}/analyze/`, {
-        method: 'POST',
-        body: formData,
+      // Sends only the stored session_id when this CV was already analyzed
+      const response = await postCVAnalysis(`${API_BASE_URL}/analyze/`, file, {
+        target_job: '', // Not needed for market insights
+        include: 'analysis', // Skip course recommendations on the backend
       });
 
       if (response.ok) {
@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Progress } from "@/components/ui/progress";
+import { postCVAnalysis } from "@/lib/analysisSession";
 import { Badge } from "@/components/ui/badge";
 import { 
   Brain, 
@@ -188,13 +189,10 @@ export default function SkillsAssessment() {
     setIsAnalyzing(true);
 
     try {
-      const formData = new FormData();
-      formData.append('file', file);
-      formData.append('target_job', '');
-
-      const response = await fetch(`${API_BASE_URL}/analyze/`, {
-        method: 'POST',
-        body: formData,
+      // Sends only the stored session_id when this CV was already analyzed
+      const response = await postCVAnalysis(`${API_BASE_URL}/analyze/`, file, {
+        target_job: '',
+        include: 'analysis', // Skip course recommendations on the backend
       });
 
       if (response.ok) {
@@ -0,0 +1,30 @@
+"""
+Gunicorn run profile for the WSGI application.
+
+    gunicorn -c gunicorn.conf.py career_growth_app.wsgi:application
+
+Each worker prewarms (document parsers, LLM client, skill taxonomy, course
+index) in post_worker_init, before it accepts connections, so the first
+request a worker serves does not pay that start-up cost. See
+cv_analysis/startup.py.
+"""
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+# LLM calls can take tens of seconds; keep the worker timeout above LLM_TIMEOUT x retries
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+
+
+def post_worker_init(worker):
+    # The application (and Django) is loaded at this point
+    from cv_analysis.startup import prewarm
+    prewarm(started=getattr(worker, 'boot_started', None))
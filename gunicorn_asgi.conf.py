@@ -0,0 +1,40 @@
+"""
+Gunicorn run profile for the ASGI application (uvicorn workers).
+
+    gunicorn -c gunicorn_asgi.conf.py career_growth_app.asgi:application
+
+Each uvicorn worker runs one event loop, so requests waiting on the LLM in
+the async endpoints (/api/cv/api/analyze/async/, /api/cv/public/analyze/async/,
+/api/career/api/generate/async/) hold no thread. The LLM gateway limits of
+the full and the fast deployment are raised accordingly; sync views still
+run in the worker's thread pool.
+Workers prewarm before accepting connections, as in gunicorn.conf.py.
+"""
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+# LLM calls can take tens of seconds; keep the worker timeout above LLM_TIMEOUT x retries
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Concurrency of LLM calls per process and across the workers of this host
+os.environ.setdefault('LLM_MAX_CONCURRENCY', '64')
+os.environ.setdefault('LLM_INITIAL_CONCURRENCY', '16')
+os.environ.setdefault('LLM_WORKER_SLOTS', '128')
+os.environ.setdefault('LLM_QUEUE_TIMEOUT', '30')
+# The fast deployment has its own limits; keep them at twice the shared ones, as in settings.py
+for _limit in ('MAX_CONCURRENCY', 'INITIAL_CONCURRENCY', 'WORKER_SLOTS'):
+    os.environ.setdefault(f'LLM_FAST_{_limit}', str(2 * int(os.environ[f'LLM_{_limit}'])))
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.monotonic()
+
+
+def post_worker_init(worker):
+    from cv_analysis.startup import prewarm
+    prewarm(started=getattr(worker, 'boot_started', None))